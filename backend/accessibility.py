@@ -0,0 +1,225 @@
+import bisect
+import logging
+import threading
+from db import get_conn
+from config import ACCESSIBILITY_CONFIG
+from data_version import current_version, on_refresh
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# NEAREST SANITATION FACILITY PER HOUSEHOLD PLOT
+# ============================================================
+# One KD-tree per institution_category (plus ALL) is built over the
+# institutions in mv_map_institutions that have sanitation, and every
+# household point in mv_map_households is queried against each in one
+# batch. Points are placed on the unit sphere so the tree's Euclidean
+# (chord) distance converts exactly to great-circle metres. Per-plot
+# distances and per-ward distributions are computed up front and replaced
+# in the background when either MV is refreshed.
+#
+# NumPy and SciPy are imported where they are used, so importing this
+# module (as maps.py does) costs nothing until the index is built.
+
+INDEX_VIEWS = ["mv_map_households", "mv_map_institutions"]
+
+ALL = "ALL"
+
+EARTH_RADIUS_M = 6371008.8
+
+
+def unit_vectors(lat, lon):
+    """(n, 3) unit-sphere coordinates for lat/lon arrays in degrees."""
+    import numpy as np
+
+    lat = np.radians(lat)
+    lon = np.radians(lon)
+    cos_lat = np.cos(lat)
+    return np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+
+def chord_to_metres(chord):
+    import numpy as np
+
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.clip(chord / 2, 0, 1))
+
+
+def distance_summary(distances):
+    """Distribution of a distance array in metres (empty -> count 0)."""
+    import numpy as np
+
+    n = len(distances)
+    if not n:
+        return {"plots": 0}
+    p50, p75, p90 = np.percentile(distances, [50, 75, 90])
+    return {
+        "plots": n,
+        "mean_m": round(float(distances.mean()), 1),
+        "median_m": round(float(p50), 1),
+        "p75_m": round(float(p75), 1),
+        "p90_m": round(float(p90), 1),
+        "max_m": round(float(distances.max()), 1),
+        "within_pct": {
+            str(band): round(100.0 * float((distances <= band).mean()), 1)
+            for band in ACCESSIBILITY_CONFIG["bands_m"]
+        },
+    }
+
+
+class AccessibilityIndex:
+    def __init__(self, households, institutions, version):
+        """
+        households: (plot_id, ward, lat, lon).
+        institutions: (institution_id, institution_name, category, lat, lon)
+        of institutions with sanitation.
+        """
+        import numpy as np
+        from scipy.spatial import cKDTree
+
+        self.version = version
+        # Sorted here rather than in SQL so keyset order never depends on
+        # the database collation.
+        households = sorted(households, key=lambda h: h[0])
+        self.plot_ids = [h[0] for h in households]
+        self.plot_index = {plot_id: i for i, plot_id in enumerate(self.plot_ids)}
+        self.wards = [(h[1] or "").upper() for h in households]
+        self.institutions = institutions
+
+        ward_rows = {}
+        for i, ward in enumerate(self.wards):
+            ward_rows.setdefault(ward, []).append(i)
+        self.ward_rows = {w: np.array(rows, dtype=np.int64) for w, rows in ward_rows.items()}
+
+        points = unit_vectors(
+            np.array([h[2] for h in households], dtype=np.float64),
+            np.array([h[3] for h in households], dtype=np.float64),
+        ).reshape(-1, 3)
+
+        by_category = {ALL: list(range(len(institutions)))}
+        for j, inst in enumerate(institutions):
+            by_category.setdefault(inst[2], []).append(j)
+
+        # category -> (distance_m float32 array, nearest institution index)
+        self.nearest = {}
+        for category, members in by_category.items():
+            members = np.array(members, dtype=np.int64)
+            if not len(members) or not len(points):
+                continue
+            tree = cKDTree(unit_vectors(
+                np.array([institutions[j][3] for j in members], dtype=np.float64),
+                np.array([institutions[j][4] for j in members], dtype=np.float64),
+            ))
+            chord, idx = tree.query(points, k=1, workers=ACCESSIBILITY_CONFIG["workers"])
+            self.nearest[category] = (
+                chord_to_metres(chord).astype(np.float32),
+                members[idx],
+            )
+
+        self.categories = sorted(c for c in self.nearest if c != ALL)
+        self.distributions = {}
+        for category, (distances, _) in self.nearest.items():
+            self.distributions[(ALL, category)] = distance_summary(distances)
+            for ward, rows in self.ward_rows.items():
+                self.distributions[(ward, category)] = distance_summary(distances[rows])
+
+    def distribution(self, ward=None, category=None):
+        """{category: summary} for one ward (or all), one category (or each)."""
+        ward = ward or ALL
+        categories = [category] if category else [ALL] + self.categories
+        return {
+            c: self.distributions[(ward, c)]
+            for c in categories if (ward, c) in self.distributions
+        }
+
+    def plot_distances(self, i, categories=None):
+        out = {}
+        for category in categories or [ALL] + self.categories:
+            if category not in self.nearest:
+                continue
+            distances, nearest = self.nearest[category]
+            inst = self.institutions[nearest[i]]
+            out[category] = {
+                "distance_m": round(float(distances[i]), 1),
+                "institution_id": inst[0],
+                "institution_name": inst[1],
+            }
+        return out
+
+    def plot(self, plot_id):
+        i = self.plot_index.get(plot_id)
+        if i is None:
+            return None
+        return {"plot_id": plot_id, "ward": self.wards[i], "nearest": self.plot_distances(i)}
+
+    def ward_plots(self, ward, category=None, after=None, limit=None):
+        """Per-plot distances in a ward, in plot_id order (keyset by plot_id)."""
+        rows = self.ward_rows.get(ward)
+        if rows is None:
+            return []
+        start = 0
+        if after is not None:
+            start = bisect.bisect_right(rows, after, key=lambda i: self.plot_ids[i])
+        end = len(rows) if limit is None else start + limit
+        categories = [category] if category else None
+        return [
+            {"plot_id": self.plot_ids[i], "nearest": self.plot_distances(i, categories)}
+            for i in rows[start:end].tolist()
+        ]
+
+
+def load_index():
+    version = current_version(INDEX_VIEWS)
+    conn = get_conn(cursor_factory=None)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT plot_id, ward, lat, lon
+                FROM public.mv_map_households
+                WHERE lat IS NOT NULL AND lon IS NOT NULL
+            """)
+            households = cur.fetchall()
+            cur.execute("""
+                SELECT institution_id, institution_name, institution_category, lat, lon
+                FROM public.mv_map_institutions
+                WHERE has_sanitation AND lat IS NOT NULL AND lon IS NOT NULL
+            """)
+            institutions = cur.fetchall()
+    finally:
+        conn.close()
+
+    index = AccessibilityIndex(households, institutions, version)
+    logger.info(
+        f"Built accessibility index v{version}: {len(households)} plots x "
+        f"{len(institutions)} institutions in {len(index.nearest)} trees"
+    )
+    return index
+
+
+_INDEX = None
+_BUILD_LOCK = threading.Lock()
+
+
+def get_index():
+    """Current index, built on first use."""
+    global _INDEX
+    if _INDEX is None:
+        with _BUILD_LOCK:
+            if _INDEX is None:
+                _INDEX = load_index()
+    return _INDEX
+
+
+def _rebuild(views, version):
+    """Build the replacement off the request path; keep serving the old one."""
+    def build():
+        global _INDEX
+        with _BUILD_LOCK:
+            try:
+                _INDEX = load_index()
+            except Exception as e:
+                logger.error(f"Accessibility index rebuild failed: {e}")
+
+    threading.Thread(target=build, name="accessibility-index", daemon=True).start()
+
+
+on_refresh(_rebuild, views=INDEX_VIEWS)
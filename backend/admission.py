@@ -0,0 +1,224 @@
+import time
+import functools
+import threading
+from collections import OrderedDict
+from flask import g, jsonify, make_response, request, current_app
+from psycopg2.extensions import QueryCanceledError
+from config import ADMISSION_CONFIG, STALE_CACHE_MAX_MB, STALE_CACHE_TIMEOUT
+from db import PoolTimeout
+from tracing import span
+from wards import normalized_cache_key
+
+# ============================================================
+# ADMISSION CONTROL PER ENDPOINT CLASS
+# ============================================================
+# Views are grouped into classes (maps / summaries / diagnostics). Each
+# class has its own concurrency limit and bounded wait queue, so a burst
+# of heavy map requests cannot starve the cheap KPI endpoints. Limits are
+# per worker process.
+#
+# Decorate views *below* @cache.cached so cache hits skip admission:
+#
+#     @cache.cached(timeout=300, make_cache_key=normalized_cache_key)
+#     @admit("summaries")
+#     def overview_summary(): ...
+
+
+class Overloaded(Exception):
+    """
+    Raised when a class is saturated. Deliberately not an HTTPException,
+    so Flask-Caching does not store the 503 as the cached response.
+    """
+
+    def __init__(self, endpoint_class):
+        super().__init__(f"endpoint class '{endpoint_class.name}' is saturated")
+        self.endpoint_class = endpoint_class
+
+
+class EndpointClass:
+    def __init__(self, name, max_concurrent, max_queue, queue_timeout,
+                 statement_timeout_ms, retry_after):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.statement_timeout_ms = statement_timeout_ms
+        self.retry_after = retry_after
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self.running = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.shed = 0
+        self.served_stale = 0
+
+    def acquire(self) -> bool:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                if self.waiting >= self.max_queue:
+                    self.shed += 1
+                    return False
+                self.waiting += 1
+            try:
+                acquired = self._slots.acquire(timeout=self.queue_timeout)
+            finally:
+                with self._lock:
+                    self.waiting -= 1
+            if not acquired:
+                with self._lock:
+                    self.shed += 1
+                return False
+
+        with self._lock:
+            self.running += 1
+            self.admitted += 1
+        return True
+
+    def release(self):
+        with self._lock:
+            self.running -= 1
+        self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "running": self.running,
+                "waiting": self.waiting,
+                "admitted": self.admitted,
+                "shed": self.shed,
+                "served_stale": self.served_stale,
+                "statement_timeout_ms": self.statement_timeout_ms,
+            }
+
+
+CLASSES = {
+    name: EndpointClass(name, **settings)
+    for name, settings in ADMISSION_CONFIG.items()
+}
+
+
+# ============================================================
+# STALE COPIES
+# ============================================================
+# The last good response of each URL, served when a request is shed.
+# Kept out of the response cache: there the 24h copies took the entry and
+# byte budget of the fresh responses they are meant to back up. Only GET
+# responses are kept: the key is the URL, and a POST's answer depends on
+# its body (another polygon on /area-stats), so it has no stale copy.
+
+class StaleStore:
+    """LRU of (body, mimetype, stored_at) by URL, bounded by body bytes."""
+
+    def __init__(self, max_bytes, max_age):
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _remove(self, key):
+        body, _, _ = self._entries.pop(key)
+        self._bytes -= len(body)
+
+    def put(self, key, body, mimetype):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            while self._entries and self._bytes + len(body) > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+            self._entries[key] = (body, mimetype, time.time())
+            self._bytes += len(body)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry[2] > self.max_age:
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes, "max_bytes": self.max_bytes}
+
+
+STALE = StaleStore(int(STALE_CACHE_MAX_MB * 1024 * 1024), STALE_CACHE_TIMEOUT)
+
+
+def admit(class_name):
+    endpoint_class = CLASSES[class_name]
+
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            with span("admission.acquire", **{"admission.class": class_name}):
+                admitted = endpoint_class.acquire()
+            if not admitted:
+                raise Overloaded(endpoint_class)
+
+            g.endpoint_class = endpoint_class
+            g.statement_timeout_ms = endpoint_class.statement_timeout_ms
+            try:
+                response = make_response(view(*args, **kwargs))
+            finally:
+                endpoint_class.release()
+
+            # Keep a long-lived copy to fall back on under load (not for
+            # files sent straight from disk).
+            if (request.method == "GET" and response.status_code == 200
+                    and not response.is_streamed and not response.direct_passthrough):
+                STALE.put(normalized_cache_key(), response.get_data(), response.mimetype)
+            return response
+        return wrapper
+    return decorator
+
+
+def shed_response(endpoint_class, reason):
+    """Serve the stale copy if one exists, else 503 with Retry-After."""
+    stale = STALE.get(normalized_cache_key()) if request.method == "GET" else None
+    if stale is not None:
+        body, mimetype, stored_at = stale
+        if endpoint_class is not None:
+            with endpoint_class._lock:
+                endpoint_class.served_stale += 1
+        response = current_app.response_class(body, mimetype=mimetype)
+        response.headers["Warning"] = '110 - "Response is Stale"'
+        response.headers["Age"] = str(int(time.time() - stored_at))
+        return response
+
+    retry_after = endpoint_class.retry_after if endpoint_class else 5
+    response = jsonify({
+        "error": "Service temporarily overloaded",
+        "reason": reason,
+        "endpoint_class": endpoint_class.name if endpoint_class else None,
+    })
+    response.status_code = 503
+    response.headers["Retry-After"] = str(retry_after)
+    return response
+
+
+def init_app(app):
+    @app.errorhandler(Overloaded)
+    def handle_overloaded(e):
+        return shed_response(e.endpoint_class, "saturated")
+
+    @app.errorhandler(QueryCanceledError)
+    def handle_statement_timeout(e):
+        current_app.logger.warning(f"Statement timeout on {request.full_path}: {e}")
+        return shed_response(g.get("endpoint_class"), "statement_timeout")
+
+    @app.errorhandler(PoolTimeout)
+    def handle_pool_timeout(e):
+        current_app.logger.warning(f"Connection pool timeout on {request.full_path}: {e}")
+        return shed_response(g.get("endpoint_class"), "pool_timeout")
+
+
+def admission_stats():
+    return {name: c.stats() for name, c in CLASSES.items()}
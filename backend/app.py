@@ -1,39 +1,153 @@
-# app.py
-from flask import Flask
-from extensions import cache
-from overview import overview_bp
-from demographics import demographics_bp
-from households import households_bp
-from learning_institutions import learning_institutions_bp
-from health_facilities import health_facilities_bp
-from other_institutions import other_institutions_bp
-from institutions_diagnostics import institutions_diagnostics_bp
-from maps import maps_bp
+import importlib
+from flask import Flask, jsonify
 from flask_cors import CORS
+from extensions import cache
+from config import CORS_ORIGINS, ENABLED_BLUEPRINTS
+import db
+import data_version
+import admission
+import tracing
+
+# Blueprint name -> "module:attribute". Modules are only imported when
+# their blueprint is enabled, so e.g. a maps-only node never loads the
+# institutions code.
+BLUEPRINTS = {
+    "overview": "overview:overview_bp",
+    "demographics": "demographics:demographics_bp",
+    "households": "households:households_bp",
+    "learning_institutions": "learning_institutions:learning_institutions_bp",
+    "health_facilities": "health_facilities:health_facilities_bp",
+    "other_institutions": "other_institutions:other_institutions_bp",
+    "maps": "maps:maps_bp",
+    "institutions_diagnostics": "institutions_diagnostics:institutions_diagnostics_bp",
+    "events": "events:events_bp",
+    "debug": "debug:debug_bp",
+}
+
+
+def load_blueprint(name):
+    module_name, attr = BLUEPRINTS[name].split(":")
+    return getattr(importlib.import_module(module_name), attr)
+
+
+def create_app(config=None):
+    """
+    Build the Flask app. Nothing here opens a database connection or
+    reads data files, so it is cheap and safe to call in each worker after
+    fork (see gunicorn.conf.py); warm_up() does the heavy lifting.
+
+    config (optional dict) overrides app settings, e.g.
+    {"BLUEPRINTS": ["maps"], "CACHE_TYPE": "NullCache"}.
+    """
+    app = Flask(__name__)
+
+    app.config["CACHE_TYPE"] = "cache_backend.SizedLRUCache"
+    app.config["CACHE_DEFAULT_TIMEOUT"] = 300
+    app.config["BLUEPRINTS"] = ENABLED_BLUEPRINTS
+    app.config["WARD_BOUNDARIES_PATH"] = None
+    app.config["PHOTO_SOURCE"] = None
+    if config:
+        app.config.update(config)
+
+    tracing.init_app(app)
+    cache.init_app(app)
+    db.init_app(app)
+    admission.init_app(app)
+
+    # CORRECT CORS CONFIG
+    CORS(app, resources={r"/api/*": {"origins": CORS_ORIGINS}})
+
+    enabled = list(BLUEPRINTS) if app.config["BLUEPRINTS"] is None else app.config["BLUEPRINTS"]
+    unknown = set(enabled) - set(BLUEPRINTS)
+    if unknown:
+        raise ValueError(f"Unknown blueprints: {sorted(unknown)}")
+    for name in enabled:
+        app.register_blueprint(load_blueprint(name))
+
+    @app.route("/api/health")
+    def health():
+        return {"status": "ok"}
+
+    @app.route("/api/ready")
+    def ready():
+        """
+        Readiness check: passes only once this worker's connection pool
+        exists and (on nodes serving maps) the ward boundaries are loaded.
+        """
+        checks = {"db_pool": db.pool_ready()}
+        if "maps" in app.blueprints:
+            import maps
+            checks["ward_boundaries"] = bool(
+                maps.WARD_BOUNDARIES_CACHE
+                and maps.WARD_BOUNDARIES_CACHE.get("features")
+            )
+        ok = all(checks.values())
+        return jsonify({
+            "status": "ready" if ok else "starting",
+            "checks": checks,
+            "pool": db.pool_stats(),
+            "admission": admission.admission_stats(),
+            "stale_copies": admission.STALE.stats(),
+        }), 200 if ok else 503
+
+    return app
 
-app = Flask(__name__)
 
-app.config["CACHE_TYPE"] = "SimpleCache"
-app.config["CACHE_DEFAULT_TIMEOUT"] = 300
+def warm_up(app, maxconn=None):
+    """
+    Open the connection pools (or the DuckDB snapshot), start replica
+    health checks and the refresh listener (or snapshot watcher), and load
+    data files and in-memory structures for this process.
+    """
+    try:
+        db.init_pool(maxconn=maxconn)
+    except Exception as e:
+        app.logger.error(f"Could not open connection pool: {e}")
+    db.start_health_checks()
+    if db.BACKEND == "duckdb":
+        import duckdb_backend
+        duckdb_backend.start_watcher()
+    else:
+        data_version.start_listener()
 
-cache.init_app(app)
+    # Every cache key normalizes ?ward= through the registry; load it now
+    # rather than on the first request. A failed load falls back to the
+    # boundary names and is retried by get_registry().
+    import wards
+    with app.app_context():
+        wards.get_registry()
 
-# CORRECT CORS CONFIG
-CORS(app, resources={r"/api/*": {"origins": "http://localhost:8080"}})
+    if "maps" in app.blueprints:
+        import maps
+        with app.app_context():
+            maps.get_cached_ward_boundaries()
+        import area_index
+        try:
+            area_index.get_grid()
+        except Exception as e:
+            app.logger.error(f"Could not build household grid: {e}")
+        import accessibility
+        try:
+            accessibility.get_index()
+        except Exception as e:
+            app.logger.error(f"Could not build accessibility index: {e}")
 
-app.register_blueprint(overview_bp)
-app.register_blueprint(demographics_bp)
-app.register_blueprint(households_bp)
-app.register_blueprint(learning_institutions_bp)
-app.register_blueprint(health_facilities_bp)
-app.register_blueprint(other_institutions_bp)
-app.register_blueprint(maps_bp)
-app.register_blueprint(institutions_diagnostics_bp)
+    if "households" in app.blueprints:
+        import crossfilter
+        try:
+            crossfilter.get_engine()
+        except Exception as e:
+            app.logger.error(f"Could not build household crossfilter: {e}")
 
+    if "institutions_diagnostics" in app.blueprints:
+        import institutions_cube
+        try:
+            institutions_cube.get_cube()
+        except Exception as e:
+            app.logger.error(f"Could not build institutions cube: {e}")
 
-@app.route("/api/health")
-def health():
-    return {"status": "ok"}
 
 if __name__ == "__main__":
+    app = create_app()
+    warm_up(app)
     app.run(debug=True, host="0.0.0.0", port=5000)
@@ -0,0 +1,267 @@
+import math
+import logging
+import threading
+from collections import Counter, defaultdict
+from db import get_conn
+from config import AREA_STATS_CONFIG
+from data_version import current_version, on_refresh
+from geo import geometry_bbox, geometry_polygons, segment_intersects_rect
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# GRID INDEX OVER HOUSEHOLD POINTS FOR CUSTOM-AREA STATISTICS
+# ============================================================
+# mv_map_households is loaded once into a uniform lon/lat grid. Every cell
+# keeps its points and their pre-aggregated totals. For a query polygon
+# only cells in its bounding box are visited: cells wholly inside add their
+# totals, cells wholly outside are skipped, and only the points of cells
+# the polygon boundary passes through get a point-in-polygon test. Rebuilt
+# in the background when refresh.py announces a refresh of INDEX_VIEWS.
+#
+# The polygon's edges are bucketed into the same grid once per query
+# (PolygonCells), so no test walks the whole edge list: a cell centre is
+# located by a ray cast over the edges of its row, and a point by the
+# edges of its own cell crossed on the way from the cell centre.
+
+INDEX_VIEWS = ["mv_map_households"]
+
+
+class AreaStats:
+    """Running totals for a set of household points."""
+
+    __slots__ = (
+        "households", "sanitation_class", "shared", "shared_known",
+        "handwashing", "handwashing_known", "total_persons", "children_under_5",
+    )
+
+    def __init__(self):
+        self.households = 0
+        self.sanitation_class = Counter()
+        self.shared = 0
+        self.shared_known = 0
+        self.handwashing = 0
+        self.handwashing_known = 0
+        self.total_persons = 0
+        self.children_under_5 = 0
+
+    def add(self, point):
+        _, _, sanitation_class, is_shared, has_handwashing, persons, under_5 = point
+        self.households += 1
+        self.sanitation_class[sanitation_class or "Unknown"] += 1
+        if is_shared is not None:
+            self.shared_known += 1
+            self.shared += bool(is_shared)
+        if has_handwashing is not None:
+            self.handwashing_known += 1
+            self.handwashing += bool(has_handwashing)
+        self.total_persons += persons or 0
+        self.children_under_5 += under_5 or 0
+
+    def merge(self, other):
+        self.households += other.households
+        self.sanitation_class.update(other.sanitation_class)
+        self.shared += other.shared
+        self.shared_known += other.shared_known
+        self.handwashing += other.handwashing
+        self.handwashing_known += other.handwashing_known
+        self.total_persons += other.total_persons
+        self.children_under_5 += other.children_under_5
+
+    @staticmethod
+    def _pct(part, whole):
+        return round(100.0 * part / whole, 1) if whole else None
+
+    def to_dict(self):
+        return {
+            "households": self.households,
+            "sanitation_class": dict(self.sanitation_class.most_common()),
+            "shared_facilities_pct": self._pct(self.shared, self.shared_known),
+            "handwashing_available_pct": self._pct(self.handwashing, self.handwashing_known),
+            "total_persons": self.total_persons,
+            "children_under_5": self.children_under_5,
+        }
+
+
+class PolygonCells:
+    """
+    Edges of a Polygon / MultiPolygon bucketed into grid cells and rows.
+
+    Inside-ness is kept as a bitmask with one bit per ring, flipped by
+    every edge of that ring crossed (even-odd rule per ring); a mask is
+    inside when, for some polygon, the exterior bit is set and no hole bit.
+    """
+
+    def __init__(self, geometry, cell_size, keys):
+        self.size = cell_size
+        self.polygons = []      # (exterior bit, holes mask)
+        edges = []              # (x1, y1, x2, y2, ring bit)
+        bit = 1
+        for polygon in geometry_polygons(geometry):
+            exterior, holes = bit, 0
+            for r, ring in enumerate(polygon):
+                if r:
+                    holes |= bit
+                for a, b in zip(ring, ring[1:] + ring[:1]):
+                    if a[0] != b[0] or a[1] != b[1]:
+                        edges.append((a[0], a[1], b[0], b[1], bit))
+                bit <<= 1
+            self.polygons.append((exterior, holes))
+
+        wanted = set(keys)
+        pad = cell_size * 1e-9  # points on a cell border may round either way
+        self.cells = defaultdict(list)
+        self.rows = defaultdict(list)
+        for edge in edges:
+            x1, y1, x2, y2, _ = edge
+            i0, i1 = math.floor(min(x1, x2) / cell_size), math.floor(max(x1, x2) / cell_size)
+            j0, j1 = math.floor(min(y1, y2) / cell_size), math.floor(max(y1, y2) / cell_size)
+            for j in range(j0, j1 + 1):
+                self.rows[j].append(edge)
+                for i in range(i0, i1 + 1):
+                    if (i, j) in wanted and segment_intersects_rect(
+                        x1, y1, x2, y2,
+                        i * cell_size - pad, j * cell_size - pad,
+                        (i + 1) * cell_size + pad, (j + 1) * cell_size + pad,
+                    ):
+                        self.cells[(i, j)].append(edge)
+
+    def contains(self, mask) -> bool:
+        return any(mask & exterior and not mask & holes for exterior, holes in self.polygons)
+
+    def centre_mask(self, i, j):
+        """Ring mask of the centre of cell (i, j): ray cast over its row."""
+        x, y = (i + 0.5) * self.size, (j + 0.5) * self.size
+        mask = 0
+        for x1, y1, x2, y2, bit in self.rows[j]:
+            if (y1 > y) != (y2 > y) and x < (x2 - x1) * (y - y1) / (y2 - y1) + x1:
+                mask ^= bit
+        return mask
+
+    def point_mask(self, edges, centre_mask, i, j, x, y):
+        """
+        Ring mask of (x, y) in cell (i, j) from its centre's: flip for each
+        cell edge crossed along (x, y) -> (cx, y) -> (cx, cy), with the
+        same half-open rule as the ray cast so vertices count once.
+        """
+        cx, cy = (i + 0.5) * self.size, (j + 0.5) * self.size
+        lo_x, hi_x = min(x, cx), max(x, cx)
+        lo_y, hi_y = min(y, cy), max(y, cy)
+        mask = centre_mask
+        for x1, y1, x2, y2, bit in edges:
+            if (y1 > y) != (y2 > y):
+                xc = (x2 - x1) * (y - y1) / (y2 - y1) + x1
+                if lo_x < xc <= hi_x:
+                    mask ^= bit
+            if (x1 > cx) != (x2 > cx):
+                yc = (y2 - y1) * (cx - x1) / (x2 - x1) + y1
+                if lo_y < yc <= hi_y:
+                    mask ^= bit
+        return mask
+
+
+class HouseholdGrid:
+    def __init__(self, points, version, cell_size=None):
+        """points: (lon, lat, sanitation_class, is_shared, has_handwashing,
+        total_persons, children_under_5) tuples."""
+        self.version = version
+        self.cell_size = cell_size or AREA_STATS_CONFIG["cell_size_deg"]
+        self.cells = defaultdict(list)
+        for point in points:
+            self.cells[self._cell(point[0], point[1])].append(point)
+        self.totals = {}
+        for key, cell_points in self.cells.items():
+            stats = AreaStats()
+            for point in cell_points:
+                stats.add(point)
+            self.totals[key] = stats
+        self.size = sum(len(p) for p in self.cells.values())
+
+    def _cell(self, x, y):
+        return math.floor(x / self.cell_size), math.floor(y / self.cell_size)
+
+    def query(self, geometry):
+        """(AreaStats, {"inside": n, "boundary": n, "points_tested": n})."""
+        min_x, min_y, max_x, max_y = geometry_bbox(geometry)
+        (x0, y0), (x1, y1) = self._cell(min_x, min_y), self._cell(max_x, max_y)
+        stats = AreaStats()
+        info = {"inside": 0, "boundary": 0, "points_tested": 0}
+
+        # Walk occupied cells or the bbox range, whichever is smaller.
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(self.cells):
+            keys = [k for k in self.cells if x0 <= k[0] <= x1 and y0 <= k[1] <= y1]
+        else:
+            keys = [
+                (i, j) for i in range(x0, x1 + 1) for j in range(y0, y1 + 1)
+                if (i, j) in self.cells
+            ]
+
+        polygon = PolygonCells(geometry, self.cell_size, keys)
+        for i, j in keys:
+            centre = polygon.centre_mask(i, j)
+            cell_edges = polygon.cells.get((i, j))
+            if not cell_edges:
+                # No edge touches the cell: it lies wholly on one side.
+                if polygon.contains(centre):
+                    info["inside"] += 1
+                    stats.merge(self.totals[(i, j)])
+                continue
+            info["boundary"] += 1
+            for point in self.cells[(i, j)]:
+                info["points_tested"] += 1
+                if polygon.contains(polygon.point_mask(cell_edges, centre, i, j, point[0], point[1])):
+                    stats.add(point)
+        return stats, info
+
+
+def load_grid():
+    version = current_version(INDEX_VIEWS)
+    conn = get_conn(cursor_factory=None)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT lon, lat, sanitation_class, is_shared, has_handwashing,
+                       total_persons, children_under_5
+                FROM public.mv_map_households
+                WHERE lat IS NOT NULL AND lon IS NOT NULL
+            """)
+            points = cur.fetchall()
+    finally:
+        conn.close()
+
+    grid = HouseholdGrid(points, version)
+    logger.info(
+        f"Built household grid v{version}: {grid.size} points in "
+        f"{len(grid.cells)} cells of {grid.cell_size} deg"
+    )
+    return grid
+
+
+_GRID = None
+_BUILD_LOCK = threading.Lock()
+
+
+def get_grid():
+    """Current grid, built on first use."""
+    global _GRID
+    if _GRID is None:
+        with _BUILD_LOCK:
+            if _GRID is None:
+                _GRID = load_grid()
+    return _GRID
+
+
+def _rebuild(views, version):
+    """Build the replacement off the request path; keep serving the old one."""
+    def build():
+        global _GRID
+        with _BUILD_LOCK:
+            try:
+                _GRID = load_grid()
+            except Exception as e:
+                logger.error(f"Household grid rebuild failed: {e}")
+
+    threading.Thread(target=build, name="household-grid", daemon=True).start()
+
+
+on_refresh(_rebuild, views=INDEX_VIEWS)
@@ -0,0 +1,402 @@
+"""
+Benchmark harness for every API endpoint.
+
+Runs each endpoint in overview, demographics, households, institutions,
+diagnostics and maps against the database that config.DB_CONFIG points
+at (a local Postgres seeded with the mv_* relations), with a cold and a
+warm cache, for a single ward and for "ALL", at one or more concurrency
+levels. Results are written as JSON so two runs can be compared:
+
+    python benchmark.py --concurrency 1,8 --requests 200 --output run.json
+    python benchmark.py --compare before.json run.json
+
+By default requests go through the Flask test client in this process, so
+peak RSS is measured too, along with the peak Python heap allocated by a
+single request (tracemalloc). --backend duckdb runs the in-process app
+on the Parquet snapshots instead. With --base-url the same plan is
+replayed over HTTP against a running server instead; its cache cannot
+be cleared from here, so only warm cases run and RSS and allocations are
+not reported.
+"""
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import platform
+import resource
+import threading
+import tracemalloc
+import subprocess
+import contextlib
+import urllib.error
+import urllib.parse
+import urllib.request
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+# ============================================================
+# ENDPOINT PLAN
+# ============================================================
+# (group, path, extra query params). Every entry is run once per ward
+# scope; the ward is passed as ?ward=<ward> or ?ward=ALL. None instead of
+# params means the endpoint takes no ward and runs once.
+ENDPOINTS = [
+    ("overview", "/api/overview/summary", {}),
+    ("overview", "/api/overview/charts", {}),
+    ("overview", "/api/wards", None),
+    ("demographics", "/api/demographics/summary", {}),
+    ("demographics", "/api/demographics/charts", {}),
+    ("households", "/api/households/summary", {}),
+    ("households", "/api/households/charts", {}),
+    ("households", "/api/households/sanitation-safety", {}),
+    ("households", "/api/households/wash-governance", {}),
+    ("institutions", "/api/learning-institutions/summary", {}),
+    ("institutions", "/api/learning-institutions/charts", {}),
+    ("institutions", "/api/health-facilities/summary", {}),
+    ("institutions", "/api/health-facilities/charts", {}),
+    ("institutions", "/api/other-institutions/summary", {}),
+    ("institutions", "/api/other-institutions/charts", {}),
+    ("diagnostics", "/api/institutions/diagnostics/charts", {}),
+    ("diagnostics", "/api/institutions/diagnostics/options", {}),
+    ("diagnostics", "/api/institutions/diagnostics/narrative", {}),
+    ("maps", "/api/maps/households", {}),
+    ("maps", "/api/maps/institutions", {}),
+    ("maps", "/api/maps/wards", None),
+    ("maps", "/api/maps/ward-boundaries", {}),
+    ("maps", "/api/maps/ward-boundaries", {"include_stats": "true"}),
+]
+
+CACHE_MODES = ("cold", "warm")
+
+
+def build_plan(groups, ward):
+    plan = []
+    for group, path, extra in ENDPOINTS:
+        if groups and group not in groups:
+            continue
+        if extra is None:
+            plan.append((group, path, "-", {}))
+            continue
+        for scope in ("ALL", ward):
+            params = dict(extra, ward=scope)
+            plan.append((group, path, "ALL" if scope == "ALL" else "ward", params))
+    return plan
+
+
+def with_query(path, params):
+    if not params:
+        return path
+    return path + "?" + urllib.parse.urlencode(params)
+
+
+# ============================================================
+# CLIENTS
+# ============================================================
+
+class InProcessTarget:
+    """Drives the Flask app through its test client (one per thread)."""
+
+    measures_rss = True
+    can_reset_cache = True
+
+    def __init__(self, backend=None):
+        if backend:
+            import db
+            db.use_backend(backend)
+        from app import create_app, warm_up
+        self.app = create_app()
+        warm_up(self.app)
+        self._local = threading.local()
+
+    def _client(self):
+        client = getattr(self._local, "client", None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        return client
+
+    def get(self, url):
+        resp = self._client().get(url)
+        body = resp.get_data()
+        return resp.status_code, body
+
+    def reset_cache(self):
+        """
+        Empty every per-process result cache: responses, the query memo,
+        ward boundaries / statistics and the choropleth class breaks.
+        """
+        import maps
+        import choropleth
+        from extensions import cache
+        from query_memo import MEMO
+        with self.app.app_context():
+            cache.clear()
+        MEMO.clear()
+        maps.WARD_BOUNDARIES_CACHE = None
+        maps.WARD_STATS_CACHE = None
+        with choropleth._LOCK:
+            choropleth._MEMO.clear()
+
+
+class HttpTarget:
+    """Replays the plan against a running server."""
+
+    measures_rss = False
+    can_reset_cache = False
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip("/")
+
+    def get(self, url):
+        try:
+            with urllib.request.urlopen(self.base_url + url) as resp:
+                return resp.status, resp.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    def reset_cache(self):
+        # A remote server's cache cannot be cleared from here, so only warm
+        # cases are run against it (see run()).
+        pass
+
+
+# ============================================================
+# MEASUREMENT
+# ============================================================
+
+def current_rss_kb():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    # ru_maxrss is KB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+class RssSampler:
+    """Samples RSS in a background thread and keeps the peak."""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak_kb = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_kb = max(self.peak_kb, current_rss_kb())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.peak_kb = current_rss_kb()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_kb = max(self.peak_kb, current_rss_kb())
+
+
+def request_alloc_kb(target, url, cache_mode):
+    """Peak Python heap (KB) allocated while serving one request."""
+    if cache_mode == "cold":
+        target.reset_cache()
+    tracemalloc.start()
+    try:
+        target.get(url)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return round(peak / 1024, 1)
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100.0 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def run_case(target, url, cache_mode, concurrency, n_requests):
+    if cache_mode == "warm":
+        target.reset_cache()
+        target.get(url)
+
+    def one(_):
+        start = time.perf_counter()
+        status, body = target.get(url)
+        return (time.perf_counter() - start) * 1000, status, len(body)
+
+    sampler = RssSampler() if target.measures_rss else None
+    with sampler or contextlib.nullcontext():
+        wall_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            if cache_mode == "cold":
+                # Cleared once before each batch of `concurrency` requests,
+                # never while a request is in flight.
+                samples = []
+                for first in range(0, n_requests, concurrency):
+                    target.reset_cache()
+                    batch = range(first, min(first + concurrency, n_requests))
+                    samples.extend(pool.map(one, batch))
+            else:
+                samples = list(pool.map(one, range(n_requests)))
+        wall = time.perf_counter() - wall_start
+
+    latencies = sorted(s[0] for s in samples)
+    return {
+        "requests": n_requests,
+        "errors": sum(1 for s in samples if s[1] != 200),
+        "response_bytes": samples[-1][2] if samples else 0,
+        "throughput_rps": round(n_requests / wall, 2) if wall else None,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 3),
+            "p95": round(percentile(latencies, 95), 3),
+            "p99": round(percentile(latencies, 99), 3),
+            "mean": round(sum(latencies) / len(latencies), 3),
+            "max": round(latencies[-1], 3),
+        },
+        "peak_rss_kb": sampler.peak_kb if sampler else None,
+        "alloc_peak_kb": request_alloc_kb(target, url, cache_mode) if sampler else None,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL,
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def pick_ward(target):
+    status, body = target.get("/api/wards")
+    if status == 200:
+        wards = json.loads(body)
+        if wards:
+            return wards[0]
+    raise SystemExit("Could not determine a ward to benchmark; pass --ward.")
+
+
+def run(args):
+    cache_modes = args.cache.split(",") if args.cache else CACHE_MODES
+    if not (HttpTarget if args.base_url else InProcessTarget).can_reset_cache:
+        if args.cache and "cold" in cache_modes:
+            raise SystemExit("--cache cold needs the in-process target (its cache can be cleared)")
+        cache_modes = [m for m in cache_modes if m != "cold"]
+    target = HttpTarget(args.base_url) if args.base_url else InProcessTarget(args.backend)
+    ward = args.ward or pick_ward(target)
+    groups = set(args.groups.split(",")) if args.groups else None
+    concurrencies = [int(c) for c in args.concurrency.split(",")]
+
+    results = []
+    for group, path, scope, params in build_plan(groups, ward):
+        url = with_query(path, params)
+        for cache_mode in cache_modes:
+            for concurrency in concurrencies:
+                stats = run_case(target, url, cache_mode, concurrency, args.requests)
+                stats.update({
+                    "group": group,
+                    "endpoint": path,
+                    "url": url,
+                    "scope": scope,
+                    "cache": cache_mode,
+                    "concurrency": concurrency,
+                })
+                results.append(stats)
+                print(
+                    f"{url:<70} {scope:<4} {cache_mode:<4} c={concurrency:<3} "
+                    f"{stats['throughput_rps']:>9} rps  "
+                    f"p50={stats['latency_ms']['p50']:>8} "
+                    f"p95={stats['latency_ms']['p95']:>8} "
+                    f"p99={stats['latency_ms']['p99']:>8} ms  "
+                    f"errors={stats['errors']}",
+                    file=sys.stderr,
+                )
+
+    report = {
+        "meta": {
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "target": args.base_url or "in-process",
+            "backend": None if args.base_url else (args.backend or "config"),
+            "ward": ward,
+            "requests_per_case": args.requests,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}", file=sys.stderr)
+
+
+# ============================================================
+# COMPARISON
+# ============================================================
+
+def case_key(r):
+    return (r["url"], r["cache"], r["concurrency"])
+
+
+def compare(before_path, after_path):
+    with open(before_path) as f:
+        before = {case_key(r): r for r in json.load(f)["results"]}
+    with open(after_path) as f:
+        after = json.load(f)["results"]
+
+    print(
+        f"{'case':<90} {'p95 before':>11} {'p95 after':>10} {'rps Δ%':>8} "
+        f"{'alloc KB before':>16} {'alloc KB after':>15}"
+    )
+    for r in after:
+        old = before.get(case_key(r))
+        if not old:
+            continue
+        rps_delta = (
+            (r["throughput_rps"] - old["throughput_rps"]) / old["throughput_rps"] * 100
+            if old["throughput_rps"] else 0.0
+        )
+        label = f"{r['url']} [{r['cache']}, c={r['concurrency']}]"
+        print(
+            f"{label:<90} {old['latency_ms']['p95']:>11} "
+            f"{r['latency_ms']['p95']:>10} {rps_delta:>7.1f}% "
+            f"{str(old.get('alloc_peak_kb')):>16} {str(r.get('alloc_peak_kb')):>15}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--output", default="benchmark.json")
+    parser.add_argument("--requests", type=int, default=100,
+                        help="requests per endpoint/cache/concurrency case")
+    parser.add_argument("--concurrency", default="1,8",
+                        help="comma-separated concurrency levels")
+    parser.add_argument("--cache", help="comma-separated subset of cold,warm")
+    parser.add_argument("--groups", help="comma-separated subset of endpoint groups")
+    parser.add_argument("--ward", help="ward used for single-ward cases")
+    parser.add_argument("--base-url", help="benchmark a running server over HTTP")
+    parser.add_argument("--backend", choices=("postgres", "duckdb"),
+                        help="data backend of the in-process app (default: config.DATA_BACKEND)")
+    parser.add_argument("--compare", nargs=2, metavar=("BEFORE", "AFTER"),
+                        help="print p95/throughput deltas between two result files")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+    else:
+        run(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+import time
+import threading
+from collections import OrderedDict, defaultdict
+from cachelib.serializers import SimpleSerializer
+from flask import has_request_context, request
+from flask_caching.backends.base import BaseCache
+from config import CACHE_CONFIG
+from tracing import span
+
+# ============================================================
+# SIZE-AWARE LRU CACHE WITH PER-ENDPOINT QUOTAS
+# ============================================================
+# Drop-in Flask-Caching backend (CACHE_TYPE = "cache_backend.SizedLRUCache").
+# Values are pickled as in SimpleCache, which gives each entry an exact
+# size. Entries are charged to the endpoint of the request that stored
+# them; each endpoint has a byte quota (CACHE_CONFIG["quotas_mb"] by
+# endpoint or blueprint name, else default_quota_mb), and the whole cache
+# is bounded by max_mb. Both are enforced by evicting least recently used
+# entries, so a burst of large GeoJSON layers only ever evicts other map
+# layers, never the small KPI summaries.
+
+OTHER = "-"
+
+MB = 1024 * 1024
+
+
+def current_endpoint() -> str:
+    if has_request_context() and request.endpoint:
+        return request.endpoint
+    return OTHER
+
+
+class EndpointStats:
+    __slots__ = ("entries", "bytes", "hits", "misses", "evictions", "expirations", "rejected")
+
+    def __init__(self):
+        self.entries = 0
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.rejected = 0
+
+    def to_dict(self, quota):
+        lookups = self.hits + self.misses
+        return {
+            "entries": self.entries,
+            "bytes": self.bytes,
+            "quota_bytes": quota,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "rejected": self.rejected,
+        }
+
+
+class SizedLRUCache(BaseCache):
+    serializer = SimpleSerializer()
+
+    def __init__(self, default_timeout=300, max_bytes=256 * MB,
+                 default_quota_bytes=8 * MB, quotas=None, **kwargs):
+        super().__init__(default_timeout=default_timeout, **kwargs)
+        self.max_bytes = max_bytes
+        self.default_quota_bytes = default_quota_bytes
+        self.quotas = quotas or {}
+        self._entries = OrderedDict()          # key -> (endpoint, expires, data)
+        self._by_endpoint = defaultdict(OrderedDict)
+        self._stats = defaultdict(EndpointStats)
+        self._bytes = 0
+        self._next_sweep = 0
+        self._lock = threading.RLock()
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        kwargs.update(
+            max_bytes=int(CACHE_CONFIG["max_mb"] * MB),
+            default_quota_bytes=int(CACHE_CONFIG["default_quota_mb"] * MB),
+            quotas={k: int(v * MB) for k, v in CACHE_CONFIG["quotas_mb"].items()},
+        )
+        return cls(*args, **kwargs)
+
+    def quota(self, endpoint: str) -> int:
+        if endpoint in self.quotas:
+            return self.quotas[endpoint]
+        return self.quotas.get(endpoint.split(".")[0], self.default_quota_bytes)
+
+    def _normalize_timeout(self, timeout):
+        timeout = BaseCache._normalize_timeout(self, timeout)
+        return time.time() + timeout if timeout > 0 else 0
+
+    # -- internal helpers (call with the lock held) --
+
+    def _remove(self, key, reason=None):
+        endpoint, _, data = self._entries.pop(key)
+        del self._by_endpoint[endpoint][key]
+        stats = self._stats[endpoint]
+        stats.entries -= 1
+        stats.bytes -= len(data)
+        self._bytes -= len(data)
+        if reason == "evicted":
+            stats.evictions += 1
+        elif reason == "expired":
+            stats.expirations += 1
+
+    def _live(self, key, now):
+        """Entry for key if present and unexpired (expired ones are dropped)."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] and entry[1] <= now:
+            self._remove(key, "expired")
+            return None
+        return entry
+
+    def _sweep(self, now):
+        if now < self._next_sweep:
+            return
+        self._next_sweep = now + CACHE_CONFIG["sweep_interval"]
+        for key in [k for k, e in self._entries.items() if e[1] and e[1] <= now]:
+            self._remove(key, "expired")
+
+    def _store(self, key, data, timeout):
+        """Store already-serialized `data` (pickled outside the lock)."""
+        endpoint = current_endpoint()
+        quota = self.quota(endpoint)
+        now = time.time()
+        self._sweep(now)
+        if key in self._entries:
+            self._remove(key)
+        if len(data) > quota or len(data) > self.max_bytes:
+            self._stats[endpoint].rejected += 1
+            return False
+
+        own = self._by_endpoint[endpoint]
+        while own and self._stats[endpoint].bytes + len(data) > quota:
+            self._remove(next(iter(own)), "evicted")
+        while self._entries and self._bytes + len(data) > self.max_bytes:
+            self._remove(next(iter(self._entries)), "evicted")
+
+        self._entries[key] = (endpoint, self._normalize_timeout(timeout), data)
+        own[key] = None
+        stats = self._stats[endpoint]
+        stats.entries += 1
+        stats.bytes += len(data)
+        self._bytes += len(data)
+        return True
+
+    # -- cache API --
+
+    def get(self, key):
+        with span("cache.get") as s:
+            with self._lock:
+                entry = self._live(key, time.time())
+                stats = self._stats[current_endpoint()]
+                if entry is None:
+                    stats.misses += 1
+                    if s is not None:
+                        s.attributes["cache.hit"] = False
+                    return None
+                stats.hits += 1
+                self._entries.move_to_end(key)
+                self._by_endpoint[entry[0]].move_to_end(key)
+                data = entry[2]
+            if s is not None:
+                s.attributes.update({"cache.hit": True, "cache.bytes": len(data)})
+            return self.serializer.loads(data)
+
+    def set(self, key, value, timeout=None):
+        with span("cache.set"):
+            data = self.serializer.dumps(value)
+            with self._lock:
+                return self._store(key, data, timeout)
+
+    def add(self, key, value, timeout=None):
+        data = self.serializer.dumps(value)
+        with self._lock:
+            if self._live(key, time.time()) is not None:
+                return False
+            return self._store(key, data, timeout)
+
+    def delete(self, key):
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._remove(key)
+            return True
+
+    def has(self, key):
+        with self._lock:
+            return self._live(key, time.time()) is not None
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._by_endpoint.clear()
+            for stats in self._stats.values():
+                stats.entries = 0
+                stats.bytes = 0
+            self._bytes = 0
+            return True
+
+    def inc(self, key, delta=1):
+        with self._lock:
+            return super().inc(key, delta)
+
+    def dec(self, key, delta=1):
+        with self._lock:
+            return super().dec(key, delta)
+
+    def stats(self):
+        with self._lock:
+            endpoints = {
+                name: s.to_dict(self.quota(name))
+                for name, s in sorted(self._stats.items())
+            }
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "endpoints": endpoints,
+            }
@@ -0,0 +1,139 @@
+import bisect
+import threading
+from collections import OrderedDict
+
+# ============================================================
+# CHOROPLETH CLASS BREAKS
+# ============================================================
+# Breaks are k + 1 ascending boundaries [min, b1, ..., max]; class i holds
+# values in (breaks[i], breaks[i + 1]], with the minimum in class 0.
+# Breaks never repeat, except that breaks[1] may equal the minimum (class
+# 0 then holds just the minimum): with fewer distinct values (or tied
+# quantiles) than classes there are fewer classes than asked for, down
+# to a single [v, v] class when every value is the same.
+# Results are memoized per (data version, metric, method, classes), so
+# they are computed once per refresh however often the map is drawn.
+
+METHODS = ("quantile", "equal_interval", "jenks")
+
+
+def distinct_breaks(breaks):
+    """Ascending breaks without the repeats that would make empty classes."""
+    out = breaks[:2]
+    for b in breaks[2:]:
+        if b != out[-1]:
+            out.append(b)
+    return out
+
+
+def quantile_breaks(values, k):
+    data = sorted(values)
+    n = len(data)
+    inner = [data[max(0, -(-n * i // k) - 1)] for i in range(1, k)]
+    return distinct_breaks([data[0]] + inner + [data[-1]])
+
+
+def equal_interval_breaks(values, k):
+    lo, hi = min(values), max(values)
+    step = (hi - lo) / k
+    return distinct_breaks([lo + step * i for i in range(k)] + [hi])
+
+
+def jenks_breaks(values, k):
+    """Fisher-Jenks natural breaks (exact dynamic programme, O(k n^2))."""
+    data = sorted(values)
+    n = len(data)
+    k = min(k, len(set(data)))
+    if k <= 1:
+        return [data[0], data[-1]]
+
+    # lower[i][j]: index (1-based) of the first value of the last class in
+    # the best split of data[:i] into j classes; cost[i][j]: its variance.
+    inf = float("inf")
+    lower = [[0] * (k + 1) for _ in range(n + 1)]
+    cost = [[inf] * (k + 1) for _ in range(n + 1)]
+    for j in range(1, k + 1):
+        lower[1][j] = 1
+        cost[1][j] = 0.0
+
+    for i in range(2, n + 1):
+        s = s2 = w = 0.0
+        for m in range(1, i + 1):
+            start = i - m + 1
+            value = data[start - 1]
+            s += value
+            s2 += value * value
+            w += 1
+            variance = s2 - s * s / w
+            if start > 1:
+                for j in range(2, k + 1):
+                    candidate = variance + cost[start - 1][j - 1]
+                    if cost[i][j] >= candidate:
+                        lower[i][j] = start
+                        cost[i][j] = candidate
+        lower[i][1] = 1
+        cost[i][1] = variance
+
+    breaks = [0.0] * (k + 1)
+    breaks[k] = data[-1]
+    breaks[0] = data[0]
+    i = n
+    for j in range(k, 1, -1):
+        start = lower[i][j]
+        breaks[j - 1] = data[start - 2]
+        i = start - 1
+    return breaks
+
+
+BREAKS = {
+    "quantile": quantile_breaks,
+    "equal_interval": equal_interval_breaks,
+    "jenks": jenks_breaks,
+}
+
+
+def class_index(value, breaks):
+    if value is None:
+        return None
+    k = len(breaks) - 1
+    return max(0, min(k - 1, bisect.bisect_left(breaks, value, 1, k) - 1))
+
+
+def classify(values_by_key, method, k):
+    """
+    values_by_key: {key: number or None}. Returns (breaks, {key: class}).
+    Breaks are None when there is nothing to classify.
+    """
+    values = [v for v in values_by_key.values() if v is not None]
+    if not values:
+        return None, {key: None for key in values_by_key}
+    breaks = distinct_breaks([round(b, 4) for b in BREAKS[method](values, k)])
+    return breaks, {key: class_index(v, breaks) for key, v in values_by_key.items()}
+
+
+_MEMO = OrderedDict()
+_MEMO_SIZE = 64
+_LOCK = threading.Lock()
+
+
+def ward_classes(version, ward_stats, metric, method, k):
+    """
+    classify() of ward_stats[*][metric], memoized per data version.
+    ward_stats: {ward_id: {metric: value}}.
+    """
+    key = (version, metric, method, k)
+    with _LOCK:
+        if key in _MEMO:
+            _MEMO.move_to_end(key)
+            return _MEMO[key]
+
+    values = {
+        ward: (float(stats[metric]) if stats.get(metric) is not None else None)
+        for ward, stats in ward_stats.items()
+    }
+    result = classify(values, method, k)
+    with _LOCK:
+        _MEMO[key] = result
+        while len(_MEMO) > _MEMO_SIZE:
+            _MEMO.popitem(last=False)
+    return result
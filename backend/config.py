@@ -6,3 +6,204 @@ DB_CONFIG = {
     "password": "",
     "port": 5432
 }
+
+# Read replicas for API queries; each entry overrides keys of DB_CONFIG
+# (e.g. {"host": "replica-1.internal"}). Empty: everything hits the primary.
+DB_REPLICAS = []
+
+# Replicas lagging more than max_lag_seconds are skipped; unreachable ones
+# are skipped for retry_after_seconds. Lag is polled every
+# health_check_interval seconds.
+REPLICA_CONFIG = {
+    "max_lag_seconds": 30,
+    "retry_after_seconds": 30,
+    "health_check_interval": 10,
+}
+
+# Per-worker connection pool (one per database node); checkout_timeout is how long a request
+# waits for a free connection before giving up.
+DB_POOL_CONFIG = {
+    "minconn": 1,
+    "maxconn": 10,
+    "checkout_timeout": 5,
+}
+
+# Where API queries run: "postgres" (DB_CONFIG + replicas) or "duckdb"
+# (embedded, read-only, over Parquet snapshots of the mv_* relations
+# written by parquet_snapshot.py; see duckdb_backend.py).
+DATA_BACKEND = "postgres"
+
+# DuckDB backend: parquet_dir (relative to backend/) holds the snapshots;
+# a new one is picked up within poll_seconds. in_memory loads the
+# relations into RAM instead of scanning the Parquet files per query.
+DUCKDB_CONFIG = {
+    "parquet_dir": "data/parquet",
+    "threads": 2,
+    "memory_limit": "1GB",
+    "in_memory": False,
+    "poll_seconds": 30,
+}
+
+# Production serving (gunicorn.conf.py). None means derive from CPU count.
+SERVER_CONFIG = {
+    "bind": "0.0.0.0:5000",
+    "workers": None,
+    "threads": None,
+    "max_requests": 1000,
+    "max_requests_jitter": 100,
+    "timeout": 60,
+}
+
+CORS_ORIGINS = "http://localhost:8080"
+
+# Blueprints registered by create_app(); None registers all of them.
+# A maps-only node would use ["maps"].
+ENABLED_BLUEPRINTS = None
+
+# Admission control per endpoint class (per worker): at most
+# max_concurrent requests run, up to max_queue more wait queue_timeout
+# seconds, the rest get the stale cached copy or 503 + Retry-After.
+# statement_timeout_ms is applied to the class's database queries.
+ADMISSION_CONFIG = {
+    "maps": {
+        "max_concurrent": 4, "max_queue": 8, "queue_timeout": 2,
+        "statement_timeout_ms": 15000, "retry_after": 5,
+    },
+    "summaries": {
+        "max_concurrent": 16, "max_queue": 32, "queue_timeout": 1,
+        "statement_timeout_ms": 3000, "retry_after": 1,
+    },
+    "diagnostics": {
+        "max_concurrent": 6, "max_queue": 12, "queue_timeout": 2,
+        "statement_timeout_ms": 8000, "retry_after": 3,
+    },
+}
+
+# How long the last good response of each URL is kept for serving stale,
+# and the size of that store (per worker, separate from the response cache).
+STALE_CACHE_TIMEOUT = 24 * 3600
+STALE_CACHE_MAX_MB = 64
+
+# Keyset pagination (?limit=&cursor=) on list endpoints.
+PAGINATION_CONFIG = {
+    "default_limit": 500,
+    "max_limit": 5000,
+}
+
+# Map layer delta sync (?since=<version>): how many past versions changes
+# are kept for (recorded on the primary by refresh.py; see map_sync.py).
+MAP_SYNC_CONFIG = {
+    "max_versions": 20,
+}
+
+# Custom-area statistics (POST /api/maps/area-stats): household points
+# are bucketed into a grid of cell_size_deg cells; max_vertices bounds the
+# polygons clients may send.
+AREA_STATS_CONFIG = {
+    "cell_size_deg": 0.01,
+    "max_vertices": 10000,
+}
+
+# Hexbin layer (GET /api/maps/hexbins): hex circumradius is
+# base_size_deg / 2**resolution; computed layers kept per worker.
+HEXBIN_CONFIG = {
+    "base_size_deg": 0.2,
+    "default_resolution": 5,
+    "max_resolution": 9,
+    "max_cached_layers": 64,
+}
+
+# Nearest-sanitation-facility accessibility: distance bands (metres)
+# reported as "within" shares, and threads used for KD-tree queries
+# (-1 = all cores).
+ACCESSIBILITY_CONFIG = {
+    "bands_m": [250, 500, 1000, 2000, 5000],
+    "workers": 1,
+}
+
+# Photo thumbnails (/api/maps/photos/<id>): source is a directory (relative
+# to backend/) or an http(s) base URL the photo columns are relative to;
+# thumbnails are cached in cache_dir up to max_cache_mb. Versioned (?v=)
+# thumbnail URLs are cached by clients for max_age seconds.
+PHOTO_CONFIG = {
+    "source": "data/photos",
+    "cache_dir": "data/thumbnails",
+    "max_cache_mb": 512,
+    "sizes": [64, 128, 256, 512],
+    "default_size": 256,
+    "quality": 80,
+    "fetch_timeout": 10,
+    "max_age": 30 * 24 * 3600,
+}
+
+# Refresh event stream (/api/events). Each open stream holds a server
+# thread, so at most max_subscribers per worker (and never more than the
+# worker's threads - 1 under gunicorn); streams end after
+# max_stream_seconds and EventSource reconnects after retry_ms.
+EVENTS_CONFIG = {
+    "max_subscribers": 4,
+    "queue_size": 32,
+    "heartbeat_seconds": 15,
+    "max_stream_seconds": 300,
+    "retry_ms": 3000,
+}
+
+# Response cache (cache_backend.SizedLRUCache): total size per worker and
+# byte quota per endpoint. quotas_mb keys are endpoint names
+# ("maps.map_households") or blueprint names (applied to each of its
+# endpoints); anything else gets default_quota_mb. Expired entries are
+# swept at most every sweep_interval seconds.
+CACHE_CONFIG = {
+    "max_mb": 256,
+    "default_quota_mb": 8,
+    "quotas_mb": {
+        "maps": 64,
+    },
+    "sweep_interval": 60,
+}
+
+# Query-result memo (query_memo.py): SELECTs on mv_* relations are kept
+# per worker by normalized SQL + parameters + data version, so the same
+# query from different endpoints or URL variants runs once. Results over
+# max_rows are not kept; max_total_rows bounds the whole memo.
+QUERY_MEMO_CONFIG = {
+    "enabled": True,
+    "ttl_seconds": 300,
+    "max_entries": 4096,
+    "max_rows": 5000,
+    "max_total_rows": 200000,
+}
+
+# Request tracing (tracing.py): every request is traced; traces are
+# written for sample_rate of requests (or when an incoming traceparent
+# from one of the trusted_clients addresses is sampled; behind a reverse
+# proxy every client has the proxy's address, so leave it empty unless
+# the proxy strips traceparent from outside requests) and for every
+# request taking at least slow_ms (None: sampled ones only). Each
+# process writes its own file, path (relative to backend/) with the pid
+# before the extension. format is "jsonl" or "otlp" (OTLP/JSON, one
+# ExportTraceServiceRequest per line); files rotate past max_mb.
+TRACING_CONFIG = {
+    "enabled": True,
+    "sample_rate": 0.01,
+    "trusted_clients": [],
+    "slow_ms": 1000,
+    "path": "data/traces.jsonl",
+    "format": "jsonl",
+    "max_mb": 100,
+    "queue_size": 1000,
+    "max_spans": 1000,
+    "service_name": "sanitation-dashboard-api",
+}
+
+# Slow-query log: executes taking at least threshold_ms are recorded
+# (newest max_entries kept per worker) and EXPLAIN (ANALYZE, BUFFERS)
+# is captured for explain_sample_rate of them, in the background (at
+# most explain_queue_size waiting, each cut off after explain_timeout_ms).
+SLOW_QUERY_CONFIG = {
+    "threshold_ms": 500,
+    "explain_sample_rate": 0.1,
+    "explain_queue_size": 16,
+    "explain_timeout_ms": 30000,
+    "max_entries": 200,
+}
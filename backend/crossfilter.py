@@ -0,0 +1,165 @@
+import logging
+import threading
+from array import array
+from db import get_conn
+from data_version import current_version, on_refresh
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# BITMAP CROSS-FILTER OVER HOUSEHOLD PLOTS
+# ============================================================
+# mv_map_households is held as dictionary-encoded columns (one small int
+# code per plot) plus, for every value of every dimension, a bitmap of the
+# plots having it. Bitmaps are plain Python ints, so a filter is an OR of
+# the selected values' bitmaps, filters combine with AND, and a count is
+# int.bit_count(). As in crossfilter.js, each dimension's counts apply all
+# filters except its own, so a chart keeps showing its alternatives.
+# Rebuilt in the background when refresh.py announces a refresh of
+# INDEX_VIEWS.
+
+INDEX_VIEWS = ["mv_map_households"]
+
+DIMENSIONS = [
+    "ward",
+    "sanitation_class",
+    "sanitation_type",
+    "is_shared",
+    "has_handwashing",
+    "solid_waste_mgmt",
+    "financed_by",
+]
+
+
+def value_label(dimension, value):
+    if value is None:
+        return "Unknown"
+    if isinstance(value, bool):
+        return "Yes" if value else "No"
+    if dimension == "ward":
+        return value.upper()
+    return value
+
+
+class Column:
+    """Dictionary-encoded column with one bitmap per distinct value."""
+
+    def __init__(self, name, values):
+        self.name = name
+        self.labels = []
+        self.codes = array("H")
+        index = {}
+        positions = []
+        for i, value in enumerate(values):
+            label = value_label(name, value)
+            code = index.get(label)
+            if code is None:
+                code = index[label] = len(self.labels)
+                self.labels.append(label)
+                positions.append(bytearray((len(values) + 7) // 8))
+            self.codes.append(code)
+            positions[code][i >> 3] |= 1 << (i & 7)
+        self.index = index
+        self.bitmaps = [int.from_bytes(bits, "little") for bits in positions]
+
+    def mask(self, labels):
+        """Bitmap of plots having any of `labels` (unknown labels match none)."""
+        mask = 0
+        for label in labels:
+            code = self.index.get(label)
+            if code is not None:
+                mask |= self.bitmaps[code]
+        return mask
+
+    def counts(self, mask):
+        """[(label, count)] under `mask`, largest first, zeros dropped."""
+        counts = [
+            (label, (bitmap & mask).bit_count())
+            for label, bitmap in zip(self.labels, self.bitmaps)
+        ]
+        return sorted(((l, c) for l, c in counts if c), key=lambda lc: (-lc[1], lc[0]))
+
+
+class CrossfilterEngine:
+    def __init__(self, rows, version):
+        """rows: tuples of the DIMENSIONS columns, in that order."""
+        self.version = version
+        self.size = len(rows)
+        self.all = (1 << self.size) - 1
+        self.columns = {
+            name: Column(name, [row[i] for row in rows])
+            for i, name in enumerate(DIMENSIONS)
+        }
+
+    def query(self, filters):
+        """
+        filters: {dimension: [label, ...]}. Returns (matched, {dimension:
+        [(label, count), ...]}) with each dimension ignoring its own filter.
+        """
+        masks = {
+            name: self.columns[name].mask(labels)
+            for name, labels in filters.items() if labels
+        }
+        matched = self.all
+        for mask in masks.values():
+            matched &= mask
+
+        charts = {}
+        for name, column in self.columns.items():
+            mask = self.all
+            for other, other_mask in masks.items():
+                if other != name:
+                    mask &= other_mask
+            charts[name] = column.counts(mask)
+        return matched.bit_count(), charts
+
+
+def load_engine():
+    version = current_version(INDEX_VIEWS)
+    conn = get_conn(cursor_factory=None)
+    try:
+        with conn.cursor() as cur:
+            cur.execute(f"""
+                SELECT {", ".join(DIMENSIONS)}
+                FROM public.mv_map_households
+            """)
+            rows = cur.fetchall()
+    finally:
+        conn.close()
+
+    engine = CrossfilterEngine(rows, version)
+    logger.info(
+        f"Built household crossfilter v{version}: {engine.size} plots, "
+        + ", ".join(f"{n}={len(c.labels)}" for n, c in engine.columns.items())
+    )
+    return engine
+
+
+_ENGINE = None
+_BUILD_LOCK = threading.Lock()
+
+
+def get_engine():
+    """Current engine, built on first use."""
+    global _ENGINE
+    if _ENGINE is None:
+        with _BUILD_LOCK:
+            if _ENGINE is None:
+                _ENGINE = load_engine()
+    return _ENGINE
+
+
+def _rebuild(views, version):
+    """Build the replacement off the request path; keep serving the old one."""
+    def build():
+        global _ENGINE
+        with _BUILD_LOCK:
+            try:
+                _ENGINE = load_engine()
+            except Exception as e:
+                logger.error(f"Household crossfilter rebuild failed: {e}")
+
+    threading.Thread(target=build, name="household-crossfilter", daemon=True).start()
+
+
+on_refresh(_rebuild, views=INDEX_VIEWS)
@@ -0,0 +1,140 @@
+import json
+import time
+import select
+import logging
+import threading
+import psycopg2
+import psycopg2.extensions
+from config import DB_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# DATA VERSION + REFRESH NOTIFICATIONS
+# ============================================================
+# refresh.py NOTIFYs on CHANNEL after refreshing materialized views, with
+# a JSON payload {"views": [...], "version": "..."}. Each worker process
+# LISTENs on the primary (replicas do not relay notifications), adopts
+# the new version and runs the callbacks registered with on_refresh(),
+# which is how in-memory structures built from the MVs get rebuilt.
+
+CHANNEL = "mv_refresh"
+
+_VERSION = "initial"
+_VIEW_VERSIONS = {}
+_CALLBACKS = []
+_LOCK = threading.Lock()
+
+
+def current_version(views=None) -> str:
+    """
+    Data version of the whole dataset, or of the most recently refreshed
+    of the given views.
+    """
+    if not views:
+        return _VERSION
+    with _LOCK:
+        versions = [_VIEW_VERSIONS[v] for v in views if v in _VIEW_VERSIONS]
+    return max(versions) if versions else "initial"
+
+
+def view_versions() -> dict:
+    """{view: version} of every view refreshed since this process started."""
+    with _LOCK:
+        return dict(_VIEW_VERSIONS)
+
+
+def new_version() -> str:
+    """Sortable version token, e.g. 20261019T101500.123456Z."""
+    now = time.time()
+    return time.strftime("%Y%m%dT%H%M%S", time.gmtime(now)) + f".{int(now % 1 * 1e6):06d}Z"
+
+
+def on_refresh(callback, views=None):
+    """
+    Register callback(views, version), run after a refresh that touched
+    any of `views` (or any refresh, if views is None).
+    """
+    with _LOCK:
+        _CALLBACKS.append((callback, set(views) if views else None))
+
+
+def _adopt(views, version) -> bool:
+    global _VERSION
+    if version <= _VERSION and _VERSION != "initial":
+        return False
+    _VERSION = version
+    for view in views:
+        _VIEW_VERSIONS[view] = version
+    return True
+
+
+def adopt(views, version):
+    """
+    Adopt a version without running callbacks: for a backend that opens
+    already-versioned data before anything has been built from it.
+    """
+    with _LOCK:
+        _adopt(views, version)
+
+
+def publish(views, version):
+    """Adopt a new version in this process and run the matching callbacks."""
+    with _LOCK:
+        if not _adopt(views, version):
+            return
+        callbacks = list(_CALLBACKS)
+
+    touched = set(views)
+    for callback, interest in callbacks:
+        if interest is None or interest & touched:
+            try:
+                callback(list(views), version)
+            except Exception as e:
+                logger.error(f"Refresh callback {callback.__name__} failed: {e}")
+
+
+def notify(cur, views, version):
+    """Announce a refresh to every listening worker (cursor on the primary)."""
+    cur.execute(
+        "SELECT pg_notify(%s, %s)",
+        (CHANNEL, json.dumps({"views": list(views), "version": version})),
+    )
+
+
+# ============================================================
+# LISTENER THREAD
+# ============================================================
+
+_listener = None
+
+
+def _listen_forever():
+    while True:
+        try:
+            conn = psycopg2.connect(**DB_CONFIG)
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cur:
+                cur.execute(f"LISTEN {CHANNEL}")
+            while True:
+                if select.select([conn], [], [], 60) == ([], [], []):
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notification = conn.notifies.pop(0)
+                    payload = json.loads(notification.payload)
+                    publish(payload["views"], payload["version"])
+        except Exception as e:
+            logger.warning(f"Refresh listener disconnected: {e}; retrying in 10s")
+            time.sleep(10)
+
+
+def start_listener():
+    """Start the per-process LISTEN thread (idempotent)."""
+    global _listener
+    if _listener and _listener.is_alive():
+        return
+    _listener = threading.Thread(
+        target=_listen_forever, name="mv-refresh-listener", daemon=True
+    )
+    _listener.start()
@@ -1,10 +1,504 @@
-# db.py
+import time
+import logging
+import itertools
+import threading
 import psycopg2
+import psycopg2.extensions
 from psycopg2.extras import RealDictCursor
-from config import DB_CONFIG
+from flask import g, has_app_context
+from config import DATA_BACKEND, DB_CONFIG, DB_POOL_CONFIG, DB_REPLICAS, REPLICA_CONFIG
+from query_log import TimedConnection
+from tracing import span
 
-def get_conn():
-    return psycopg2.connect(
-        cursor_factory=RealDictCursor,
-        **DB_CONFIG
+logger = logging.getLogger(__name__)
+
+
+class PoolError(Exception):
+    pass
+
+
+class PoolTimeout(PoolError):
+    """No pooled connection became free within the checkout timeout."""
+
+
+# ============================================================
+# MID-QUERY FAILOVER
+# ============================================================
+
+class FailoverCursorMixin:
+    """
+    A read-only statement whose replica connection is lost mid-query (a
+    replica that died after its connection was pooled) marks the replica
+    down and is re-run on a connection to the next available node; the
+    cursor then reads its rows, and runs later statements, there.
+    description is that of the lost cursor.
+    """
+
+    _failover = None
+    _failover_base = None
+
+    def execute(self, query, vars=None):
+        if self._failover is not None:
+            return self._failover.execute(query, vars)
+        try:
+            return super().execute(query, vars)
+        except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+            conn = self.connection
+            node = getattr(conn, "node", None)
+            lost = conn.closed and getattr(conn, "readonly", False)
+            if not lost or node is None or node.is_primary:
+                raise
+            node.mark_down(e)
+        retry = get_conn(cursor_factory=self._failover_base)
+        self._failover = retry.cursor()
+        logger.warning(f"Connection to {self.connection.node.name} lost; statement retried")
+        return self._failover.execute(query, vars)
+
+    def fetchone(self):
+        if self._failover is not None:
+            return self._failover.fetchone()
+        return super().fetchone()
+
+    def fetchmany(self, size=None):
+        cur = self._failover if self._failover is not None else super()
+        return cur.fetchmany(size) if size is not None else cur.fetchmany()
+
+    def fetchall(self):
+        if self._failover is not None:
+            return self._failover.fetchall()
+        return super().fetchall()
+
+    def __iter__(self):
+        if self._failover is not None:
+            return iter(self._failover)
+        return super().__iter__()
+
+    def close(self):
+        failover, self._failover = self._failover, None
+        if failover is not None:
+            failover.close()
+            failover.connection.close()
+        return super().close()
+
+
+_FAILOVER_CURSOR_CLASSES = {}
+
+
+def failover_cursor_class(base):
+    """Return (and memoize) a failover subclass of the given cursor class."""
+    if issubclass(base, FailoverCursorMixin):
+        return base
+    cls = _FAILOVER_CURSOR_CLASSES.get(base)
+    if cls is None:
+        cls = type(f"Failover{base.__name__}", (FailoverCursorMixin, base), {"_failover_base": base})
+        _FAILOVER_CURSOR_CLASSES[base] = cls
+    return cls
+
+
+class NodeConnection(TimedConnection):
+    """Timed connection to one Node (node, readonly are set on checkout)."""
+
+    node = None
+    readonly = False
+
+    def cursor(self, *args, **kwargs):
+        base = (
+            kwargs.get("cursor_factory")
+            or self.cursor_factory
+            or psycopg2.extensions.cursor
+        )
+        kwargs["cursor_factory"] = failover_cursor_class(base)
+        return super().cursor(*args, **kwargs)
+
+
+class PooledConnection(NodeConnection):
+    """
+    Connection that goes back to its pool on close() or at the end of a
+    `with` block, so existing `conn.close()` / `with get_db_conn()` call
+    sites need no changes. Closing it again does nothing: by then it may
+    be idle in the pool or checked out by someone else. Only the pool
+    closes it for real (discard()). lease counts checkouts, so a holder
+    can tell whether the connection is still the one it was handed.
+    """
+
+    pool = None
+    lease = 0
+
+    def close(self):
+        pool, self.pool = self.pool, None
+        if pool is not None:
+            pool.putconn(self)
+
+    def discard(self):
+        self.pool = None
+        super().close()
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            return super().__exit__(exc_type, exc, tb)
+        finally:
+            self.close()
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool that blocks (up to `timeout` seconds) for a free
+    connection instead of failing as soon as `maxconn` are checked out.
+    """
+
+    def __init__(self, minconn, maxconn, timeout, **connect_kwargs):
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.closed = False
+        self._connect_kwargs = connect_kwargs
+        self._idle = []
+        self._size = 0
+        self._cond = threading.Condition()
+        for _ in range(minconn):
+            self._idle.append(self._connect())
+            self._size += 1
+
+    def _connect(self):
+        return psycopg2.connect(
+            connection_factory=PooledConnection, **self._connect_kwargs
+        )
+
+    def getconn(self):
+        deadline = time.monotonic() + self.timeout
+        conn = None
+        with self._cond:
+            while True:
+                if self.closed:
+                    raise PoolError("connection pool is closed")
+                if self._idle:
+                    conn = self._idle.pop()
+                    if conn.closed:
+                        self._size -= 1
+                        conn = None
+                        continue
+                    break
+                if self._size < self.maxconn:
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(
+                        f"no connection free after {self.timeout}s "
+                        f"({self.maxconn} in use)"
+                    )
+                self._cond.wait(remaining)
+
+        if conn is None:
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+
+        conn.pool = self
+        conn.lease += 1
+        return conn
+
+    def putconn(self, conn):
+        if not conn.closed:
+            status = conn.info.transaction_status
+            if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                conn.discard()
+            elif status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    conn.discard()
+
+        with self._cond:
+            if conn.closed or self.closed:
+                self._size -= 1
+                if not conn.closed:
+                    conn.discard()
+            else:
+                self._idle.append(conn)
+            self._cond.notify()
+
+    def closeall(self):
+        with self._cond:
+            self.closed = True
+            for conn in self._idle:
+                conn.discard()
+            self._size -= len(self._idle)
+            self._idle.clear()
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "maxconn": self.maxconn,
+            }
+
+
+# ============================================================
+# NODES: PRIMARY + READ REPLICAS
+# ============================================================
+
+class Node:
+    """One database server plus its health state and (optional) pool."""
+
+    def __init__(self, name, config, is_primary=False):
+        self.name = name
+        self.config = config
+        self.is_primary = is_primary
+        self.pool = None
+        self.lag_seconds = None
+        self.down_until = 0.0
+        self.last_error = None
+        self.last_checked = None
+
+    def available(self) -> bool:
+        if time.monotonic() < self.down_until:
+            return False
+        max_lag = REPLICA_CONFIG["max_lag_seconds"]
+        return self.is_primary or self.lag_seconds is None or self.lag_seconds <= max_lag
+
+    def mark_down(self, error):
+        self.down_until = time.monotonic() + REPLICA_CONFIG["retry_after_seconds"]
+        self.last_error = str(error)
+        logger.warning(f"Database node {self.name} marked down: {error}")
+
+    def connect(self, cursor_factory, readonly=True):
+        if self.pool is not None:
+            conn = self.pool.getconn()
+        else:
+            conn = psycopg2.connect(connection_factory=NodeConnection, **self.config)
+        conn.cursor_factory = cursor_factory
+        conn.node = self
+        conn.readonly = readonly
+        return conn
+
+    def status(self):
+        return {
+            "name": self.name,
+            "primary": self.is_primary,
+            "available": self.available(),
+            "lag_seconds": self.lag_seconds,
+            "last_error": self.last_error,
+            "pool": self.pool.stats() if self.pool is not None else None,
+        }
+
+
+# ============================================================
+# BACKEND SELECTION
+# ============================================================
+# "postgres": the nodes below. "duckdb": embedded DuckDB over Parquet
+# snapshots (duckdb_backend.py, imported only when selected), for edge
+# deployments without a database server. Read-only either way for the API.
+
+BACKENDS = ("postgres", "duckdb")
+BACKEND = DATA_BACKEND
+
+
+def use_backend(name):
+    """Select the data backend; call before the first get_conn()."""
+    global BACKEND
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown data backend {name!r} (expected one of {BACKENDS})")
+    BACKEND = name
+
+
+PRIMARY = Node("primary", DB_CONFIG, is_primary=True)
+REPLICAS = [
+    Node(f"replica-{i}", {**DB_CONFIG, **replica})
+    for i, replica in enumerate(DB_REPLICAS)
+]
+_round_robin = itertools.count()
+
+# ============================================================
+# POOLS
+# ============================================================
+# Created per worker process after fork (see gunicorn.conf.py). Until
+# init_pool() runs, get_conn() falls back to one connection per call.
+
+def init_pool(minconn=None, maxconn=None):
+    if BACKEND == "duckdb":
+        import duckdb_backend
+        return duckdb_backend.open_database()
+    close_pool()
+    for node in [PRIMARY] + REPLICAS:
+        try:
+            node.pool = ConnectionPool(
+                DB_POOL_CONFIG["minconn"] if minconn is None else minconn,
+                maxconn or DB_POOL_CONFIG["maxconn"],
+                DB_POOL_CONFIG["checkout_timeout"],
+                **node.config
+            )
+        except psycopg2.OperationalError as e:
+            if node.is_primary:
+                raise
+            node.mark_down(e)
+    return PRIMARY.pool
+
+
+def close_pool():
+    for node in [PRIMARY] + REPLICAS:
+        if node.pool is not None:
+            node.pool.closeall()
+            node.pool = None
+
+
+def pool_ready() -> bool:
+    if BACKEND == "duckdb":
+        import duckdb_backend
+        return duckdb_backend.ready()
+    return PRIMARY.pool is not None and not PRIMARY.pool.closed
+
+
+def pool_stats():
+    if BACKEND == "duckdb":
+        import duckdb_backend
+        return duckdb_backend.stats()
+    if PRIMARY.pool is None:
+        return None
+    if not REPLICAS:
+        return PRIMARY.pool.stats()
+    return {node.name: node.status() for node in [PRIMARY] + REPLICAS}
+
+
+# ============================================================
+# REPLICA HEALTH CHECKS
+# ============================================================
+
+REPLICA_LAG_SQL = """
+    SELECT CASE
+        WHEN NOT pg_is_in_recovery() THEN 0
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE COALESCE(
+            EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0
+        )
+    END
+"""
+
+
+def check_replica(node):
+    """Measure replication lag on a fresh (unpooled) connection."""
+    try:
+        conn = psycopg2.connect(connect_timeout=3, **node.config)
+        try:
+            with conn.cursor() as cur:
+                cur.execute(REPLICA_LAG_SQL)
+                node.lag_seconds = float(cur.fetchone()[0])
+        finally:
+            conn.close()
+        node.down_until = 0.0
+        node.last_error = None
+    except psycopg2.Error as e:
+        node.mark_down(e)
+    node.last_checked = time.time()
+
+
+_health_thread = None
+
+
+def start_health_checks():
+    """Poll replica lag in a daemon thread (one per worker process)."""
+    global _health_thread
+    if BACKEND != "postgres" or not REPLICAS or (_health_thread and _health_thread.is_alive()):
+        return
+
+    def loop():
+        while True:
+            for node in REPLICAS:
+                check_replica(node)
+            time.sleep(REPLICA_CONFIG["health_check_interval"])
+
+    _health_thread = threading.Thread(
+        target=loop, name="replica-health", daemon=True
     )
+    _health_thread.start()
+
+
+# ============================================================
+# CONNECTIONS
+# ============================================================
+
+def _read_nodes():
+    """Available replicas in round-robin order, then the primary."""
+    healthy = [node for node in REPLICAS if node.available()]
+    if healthy:
+        start = next(_round_robin) % len(healthy)
+        healthy = healthy[start:] + healthy[:start]
+    return healthy + [PRIMARY]
+
+
+def _checkout(cursor_factory, readonly):
+    if BACKEND == "duckdb":
+        if not readonly:
+            raise PoolError("the duckdb backend is read-only")
+        import duckdb_backend
+        return duckdb_backend.connect(cursor_factory)
+
+    if not readonly or not REPLICAS:
+        return PRIMARY.connect(cursor_factory, readonly)
+
+    for node in _read_nodes():
+        if node.is_primary:
+            return node.connect(cursor_factory)
+        try:
+            return node.connect(cursor_factory)
+        except psycopg2.OperationalError as e:
+            node.mark_down(e)
+        except PoolError as e:
+            # Saturated, not broken: try the next node without excluding it.
+            logger.info(f"Skipping {node.name}: {e}")
+
+
+def get_conn(cursor_factory=RealDictCursor, readonly=True):
+    """
+    Connection for API queries. Read-only queries are spread across
+    healthy, non-lagging replicas and fail over to the next one (and
+    finally the primary) if a replica cannot be reached.
+
+    Inside a request the connection is also tracked so it goes back to
+    the pool even if the view raises, and the statement_timeout of the
+    request's admission class (see admission.py) is applied to it.
+
+    With the duckdb backend the connection is a duckdb_backend
+    DuckDBConnection instead, with the same interface.
+    """
+    with span("db.checkout", **{"db.backend": BACKEND, "db.readonly": readonly}):
+        conn = _checkout(cursor_factory, readonly)
+    if has_app_context():
+        g.setdefault("db_conns", []).append((conn, getattr(conn, "lease", None)))
+        timeout_ms = g.get("statement_timeout_ms")
+        if timeout_ms and BACKEND == "duckdb":
+            conn.statement_timeout_ms = int(timeout_ms)
+        elif timeout_ms:
+            # SET LOCAL: scoped to this transaction, so nothing leaks to
+            # the next user of a pooled connection.
+            with span("db.statement_timeout"), \
+                    conn.cursor(cursor_factory=psycopg2.extensions.cursor) as cur:
+                cur.execute("SET LOCAL statement_timeout = %s", (int(timeout_ms),))
+    return conn
+
+
+def get_primary_conn(cursor_factory=RealDictCursor):
+    """Connection pinned to the primary (MV refreshes, writes)."""
+    return get_conn(cursor_factory=cursor_factory, readonly=False)
+
+
+def release_request_conns(exc=None):
+    """Teardown hook: return connections a view left checked out."""
+    for conn, lease in g.pop("db_conns", []):
+        if isinstance(conn, PooledConnection):
+            # Once the view has closed it, the same object may already be
+            # checked out again by another thread (new lease): leave it.
+            if conn.pool is not None and conn.lease == lease:
+                conn.close()
+        elif not conn.closed:
+            conn.close()
+
+
+def init_app(app):
+    app.teardown_appcontext(release_request_conns)
@@ -0,0 +1,67 @@
+import os
+from flask import Blueprint, jsonify, request
+from extensions import cache
+from config import SLOW_QUERY_CONFIG
+from query_log import get_slow_queries, clear_slow_queries
+from query_memo import MEMO
+
+debug_bp = Blueprint("debug", __name__, url_prefix="/api/debug")
+
+# ============================================================
+# SLOW-QUERY LOG
+# ============================================================
+@debug_bp.route("/slow-queries", methods=["GET"])
+def slow_queries():
+    """
+    Debug endpoint listing recent slow queries for this worker process.
+
+    Query params (all optional):
+    - limit: number of entries to return (newest first)
+    - clear: "true" to empty the log after reading it
+    """
+    limit = request.args.get("limit", type=int)
+    entries = get_slow_queries(limit)
+
+    if request.args.get("clear", "false").lower() == "true":
+        clear_slow_queries()
+
+    return jsonify({
+        "pid": os.getpid(),
+        "threshold_ms": SLOW_QUERY_CONFIG["threshold_ms"],
+        "explain_sample_rate": SLOW_QUERY_CONFIG["explain_sample_rate"],
+        "count": len(entries),
+        "queries": entries,
+    })
+
+
+# ============================================================
+# RESPONSE CACHE
+# ============================================================
+@debug_bp.route("/cache", methods=["GET"])
+def cache_stats():
+    """
+    Entries, bytes, quota, hit ratio and evictions per endpoint for this
+    worker's response cache (SizedLRUCache only).
+    """
+    backend = cache.cache
+    if not hasattr(backend, "stats"):
+        return jsonify({
+            "pid": os.getpid(),
+            "error": f"{type(backend).__name__} does not report stats",
+        }), 404
+    return jsonify({"pid": os.getpid(), **backend.stats()})
+
+
+# ============================================================
+# QUERY-RESULT MEMO
+# ============================================================
+@debug_bp.route("/query-memo", methods=["GET"])
+def query_memo_stats():
+    """
+    Entries, rows, hit ratio and evictions of this worker's query-result
+    memo (query_memo.py). ?clear=true empties it after reading.
+    """
+    stats = MEMO.stats()
+    if request.args.get("clear", "false").lower() == "true":
+        MEMO.clear()
+    return jsonify({"pid": os.getpid(), **stats})
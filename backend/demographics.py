@@ -1,6 +1,8 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify
 from db import get_conn
 from extensions import cache
+from admission import admit
+from wards import normalized_cache_key, ward_arg
 from psycopg2.extras import RealDictCursor
 
 demographics_bp = Blueprint("demographics", __name__)
@@ -9,10 +11,10 @@ demographics_bp = Blueprint("demographics", __name__)
 # SUMMARY
 # ============================================================
 @demographics_bp.route("/api/demographics/summary", methods=["GET"])
-@cache.cached(timeout=300, query_string=True)
+@cache.cached(timeout=300, make_cache_key=normalized_cache_key)
+@admit("summaries")
 def demographics_summary():
-    ward = request.args.get("ward")
-    ward = None if not ward or ward.upper() == "ALL" else ward.lower()
+    ward = ward_arg("summary")
 
     conn = get_conn()
     cur = conn.cursor(cursor_factory=RealDictCursor)
@@ -51,10 +53,10 @@ def demographics_summary():
 # CHARTS
 # ============================================================
 @demographics_bp.route("/api/demographics/charts", methods=["GET"])
-@cache.cached(timeout=300, query_string=True)
+@cache.cached(timeout=300, make_cache_key=normalized_cache_key)
+@admit("summaries")
 def demographics_charts():
-    ward = request.args.get("ward")
-    ward = None if not ward or ward.upper() == "ALL" else ward.lower()
+    ward = ward_arg("summary")
 
     sql = """
         SELECT
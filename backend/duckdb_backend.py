@@ -0,0 +1,382 @@
+import os
+import re
+import json
+import time
+import logging
+import threading
+from functools import lru_cache
+
+import duckdb
+from psycopg2.extensions import QueryCanceledError
+from psycopg2.extras import RealDictCursor
+
+from config import DUCKDB_CONFIG
+from data_version import adopt, publish
+from query_memo import memo_cursor_class
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# EMBEDDED DUCKDB BACKEND (PARQUET SNAPSHOTS)
+# ============================================================
+# Selected with DATA_BACKEND = "duckdb": db.get_conn() then hands out
+# DuckDBConnection objects, which speak enough of the psycopg2 API
+# (cursor(cursor_factory=RealDictCursor), %s parameters, fetch*, `with`,
+# close()) that every blueprint runs its SQL unchanged.
+#
+# parquet_snapshot.py writes one directory per data version,
+#
+#     <parquet_dir>/<version>/<relation>.parquet + manifest.json
+#     <parquet_dir>/CURRENT                        (the live version)
+#
+# and each relation is exposed as a view public.<relation> (also visible
+# unqualified). A new CURRENT is picked up by the watcher thread, which
+# swaps databases and publishes the changed relations through
+# data_version, exactly like a Postgres REFRESH + NOTIFY. Old version
+# directories stay on disk until two newer ones exist, so queries still
+# running against the previous database keep their files.
+#
+# Differences from Postgres: the backend is read-only, there is no
+# EXPLAIN capture in the slow-query log, statement timeouts are enforced
+# by interrupting the query, and decimal arithmetic such as
+# SUM(x)::numeric / n yields a double rather than a numeric (ROUND()
+# results are cast back, see SQL TRANSLATION).
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def parquet_dir() -> str:
+    return os.path.join(BASE_DIR, DUCKDB_CONFIG["parquet_dir"])
+
+
+def current_snapshot(root=None):
+    """(version, directory) of the live snapshot, or (None, None)."""
+    root = root or parquet_dir()
+    try:
+        with open(os.path.join(root, "CURRENT"), encoding="utf-8") as f:
+            version = f.read().strip()
+    except OSError:
+        return None, None
+    return version, os.path.join(root, version)
+
+
+def read_manifest(directory) -> dict:
+    with open(os.path.join(directory, "manifest.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+# ============================================================
+# SQL TRANSLATION
+# ============================================================
+# psycopg2 placeholders -> DuckDB ones. `col = any(%s)` needs no rewrite:
+# DuckDB accepts a Python list parameter there too.
+#
+# Postgres only rounds numerics (the MV columns are numeric or integer),
+# so ROUND(x, n) is a numeric of scale n and psycopg2 returns a Decimal,
+# which the API sends as a string ("36.4"). DuckDB's AVG() and decimal
+# division give doubles, so the same ROUND() would be sent as 36.4: each
+# ROUND(x[, n]) with a literal n is cast to DECIMAL(38, n) instead.
+
+_PLACEHOLDER = re.compile(r"%\((\w+)\)s|%s|%%")
+_ROUND = re.compile(r"\bround\s*\(", re.IGNORECASE)
+
+
+def _split_call(query, start):
+    """(top-level comma positions, index after the closing paren) of the call opened before `start`."""
+    depth, commas = 1, []
+    for i in range(start, len(query)):
+        c = query[i]
+        if c == "(":
+            depth += 1
+        elif c == ")":
+            depth -= 1
+            if not depth:
+                return commas, i + 1
+        elif c == "," and depth == 1:
+            commas.append(i)
+    return commas, None
+
+
+def numeric_rounds(query: str) -> str:
+    """'ROUND(AVG(x), 1)' -> 'CAST(ROUND(AVG(x), 1) AS DECIMAL(38,1))', nested ones too."""
+    out, pos = [], 0
+    while True:
+        match = _ROUND.search(query, pos)
+        if match is None:
+            break
+        commas, end = _split_call(query, match.end())
+        if end is None:
+            break
+        if len(commas) > 1:
+            out.append(query[pos:match.end()])
+            pos = match.end()
+            continue
+        arg_end = commas[0] if commas else end - 1
+        arg = numeric_rounds(query[match.end():arg_end])
+        digits = query[arg_end + 1:end - 1].strip() if commas else "0"
+        if digits.isdigit():
+            out.append(query[pos:match.start()])
+            out.append(f"CAST(ROUND({arg}, {digits}) AS DECIMAL(38,{digits}))")
+        else:
+            out.append(query[pos:match.end()] + arg + query[arg_end:end])
+        pos = end
+    out.append(query[pos:])
+    return "".join(out)
+
+
+@lru_cache(maxsize=1024)
+def translate_sql(query: str) -> str:
+    """
+    '... ward = %s' -> '... ward = ?', '%(name)s' -> '$name', '%%' -> '%',
+    and ROUND() results cast to numerics (see numeric_rounds()).
+    """
+    def replace(match):
+        if match.group(1):
+            return f"${match.group(1)}"
+        return "?" if match.group(0) == "%s" else "%"
+    return _PLACEHOLDER.sub(replace, numeric_rounds(query))
+
+
+# ============================================================
+# PSYCOPG2-COMPATIBLE CONNECTION / CURSOR
+# ============================================================
+
+class DuckDBCursor:
+    """
+    Cursor over one DuckDB connection. Rows are tuples, or dicts when
+    created with cursor_factory=RealDictCursor.
+    """
+
+    def __init__(self, connection, dict_rows):
+        self.connection = connection
+        self.dict_rows = dict_rows
+        self.description = None
+        self.rowcount = -1
+        self.closed = False
+        self._cur = connection._con.cursor()
+        self._columns = None
+
+    def memo_shape(self):
+        return "dict" if self.dict_rows else "tuple"
+
+    def execute(self, query, vars=None):
+        if not isinstance(query, str):
+            raise NotImplementedError(
+                "the DuckDB backend only runs SQL strings, not composed psycopg2.sql objects"
+            )
+        timer = None
+        timeout_ms = self.connection.statement_timeout_ms
+        if timeout_ms:
+            timer = threading.Timer(timeout_ms / 1000, self._cur.interrupt)
+            timer.daemon = True
+            timer.start()
+        try:
+            if vars is None:
+                self._cur.execute(translate_sql(query))
+            else:
+                self._cur.execute(translate_sql(query), vars)
+        except duckdb.InterruptException:
+            # Same exception as a Postgres statement_timeout, so admission
+            # control sheds the request the same way.
+            raise QueryCanceledError(
+                f"canceling statement due to statement timeout ({timeout_ms} ms)"
+            )
+        finally:
+            if timer is not None:
+                timer.cancel()
+        self.description = self._cur.description
+        self._columns = [d[0] for d in self.description] if self.description else None
+
+    def _row(self, row):
+        return dict(zip(self._columns, row)) if self.dict_rows else row
+
+    def fetchone(self):
+        row = self._cur.fetchone()
+        return None if row is None else self._row(row)
+
+    def fetchmany(self, size=1):
+        return [self._row(r) for r in self._cur.fetchmany(size)]
+
+    def fetchall(self):
+        rows = self._cur.fetchall()
+        if not self.dict_rows:
+            return rows
+        columns = self._columns
+        return [dict(zip(columns, r)) for r in rows]
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self._cur.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class DuckDBConnection:
+    """
+    psycopg2-style connection on a DuckDB database. Read-only and
+    autocommit, so commit()/rollback() do nothing; close() releases the
+    underlying DuckDB cursor.
+    """
+
+    def __init__(self, database, cursor_factory=None):
+        self.database = database
+        self.cursor_factory = cursor_factory
+        self.statement_timeout_ms = None
+        self.autocommit = True
+        self.closed = 0
+        self._con = database.con.cursor()
+        self._cursors = []
+
+    def cursor(self, cursor_factory=None):
+        if self.closed:
+            raise duckdb.ConnectionException("connection already closed")
+        factory = cursor_factory or self.cursor_factory
+        dict_rows = factory is not None and issubclass(factory, RealDictCursor)
+        cur = memo_cursor_class(DuckDBCursor)(self, dict_rows)
+        self._cursors.append(cur)
+        return cur
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = 1
+        for cur in self._cursors:
+            cur.close()
+        self._con.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+# ============================================================
+# DATABASE
+# ============================================================
+
+class Database:
+    """In-process DuckDB with one view (or table) per snapshot relation."""
+
+    def __init__(self, version, directory):
+        self.version = version
+        self.directory = directory
+        self.manifest = read_manifest(directory)
+        self.relations = self.manifest["relations"]
+        self.opened_at = time.time()
+
+        self.con = duckdb.connect(config={
+            "threads": DUCKDB_CONFIG["threads"],
+            "memory_limit": DUCKDB_CONFIG["memory_limit"],
+        })
+        self.con.execute("CREATE SCHEMA IF NOT EXISTS public")
+        kind = "TABLE" if DUCKDB_CONFIG["in_memory"] else "VIEW"
+        for name, info in self.relations.items():
+            path = os.path.join(directory, info["file"]).replace("'", "''")
+            self.con.execute(
+                f'CREATE {kind} public."{name}" AS SELECT * FROM read_parquet(\'{path}\')'
+            )
+            # Unqualified names resolve in main, not public.
+            self.con.execute(f'CREATE VIEW main."{name}" AS SELECT * FROM public."{name}"')
+        logger.info(f"DuckDB backend: opened snapshot {version} ({len(self.relations)} relations)")
+
+    def stats(self):
+        return {
+            "backend": "duckdb",
+            "version": self.version,
+            "directory": self.directory,
+            "relations": len(self.relations),
+            "rows": sum(r["rows"] for r in self.relations.values()),
+            "in_memory": DUCKDB_CONFIG["in_memory"],
+        }
+
+
+_DATABASE = None
+_LOCK = threading.Lock()
+
+
+def open_database():
+    """Open the live snapshot (if not open yet); adopts its data version."""
+    global _DATABASE
+    with _LOCK:
+        if _DATABASE is None:
+            version, directory = current_snapshot()
+            if version is None:
+                raise FileNotFoundError(f"no Parquet snapshot in {parquet_dir()} (run parquet_snapshot.py)")
+            _DATABASE = Database(version, directory)
+            # Nothing is built from the data yet, so no refresh callbacks.
+            adopt(list(_DATABASE.relations), version)
+    return _DATABASE
+
+
+def connect(cursor_factory=None) -> DuckDBConnection:
+    return DuckDBConnection(_DATABASE or open_database(), cursor_factory)
+
+
+def ready() -> bool:
+    return _DATABASE is not None
+
+
+def stats():
+    return _DATABASE.stats() if _DATABASE is not None else None
+
+
+def reload():
+    """
+    Switch to the live snapshot if it changed, then publish the relations
+    whose files differ so in-memory structures are rebuilt.
+    """
+    global _DATABASE
+    version, directory = current_snapshot()
+    if version is None or (_DATABASE is not None and version == _DATABASE.version):
+        return False
+    database = Database(version, directory)
+    with _LOCK:
+        previous, _DATABASE = _DATABASE, database
+    if previous is None:
+        changed = list(database.relations)
+    else:
+        changed = [
+            name for name, info in database.relations.items()
+            if previous.relations.get(name, {}).get("sha256") != info["sha256"]
+        ]
+    if changed:
+        publish(changed, version)
+    else:
+        adopt([], version)
+    return True
+
+
+_watcher = None
+
+
+def _watch_forever():
+    while True:
+        time.sleep(DUCKDB_CONFIG["poll_seconds"])
+        try:
+            reload()
+        except Exception as e:
+            logger.warning(f"DuckDB backend: could not open new snapshot: {e}")
+
+
+def start_watcher():
+    """Poll for new snapshots in a daemon thread (idempotent)."""
+    global _watcher
+    if _watcher and _watcher.is_alive():
+        return
+    _watcher = threading.Thread(target=_watch_forever, name="parquet-watcher", daemon=True)
+    _watcher.start()
@@ -0,0 +1,190 @@
+"""
+Parity check of the DuckDB backend against Postgres.
+
+Takes a Parquet snapshot of the current Postgres data, exports the whole
+API from each backend with export_snapshot.py (in separate processes, so
+neither run sees the other's in-memory indexes) and compares the
+responses URL by URL:
+
+    python duckdb_parity.py
+    python duckdb_parity.py --groups maps --wards hells-gate --keep-exports /tmp/parity
+    python duckdb_parity.py --skip-snapshot     # DuckDB reads the existing snapshot
+
+Responses match when they are equal as JSON, with two allowances for
+what Postgres itself does not pin down: numbers compare with a relative
+tolerance, and lists of objects may differ in order (queries without
+ORDER BY). Types must match: a numeric sent as the string "12.5" by one
+backend and as the number 12.5 by the other is a difference, since
+clients see it. "version" values are ignored: each backend
+has its own data versions. Exits 1 if any URL differs.
+"""
+import os
+import sys
+import json
+import math
+import shutil
+import argparse
+import tempfile
+import subprocess
+
+BACKENDS = ("postgres", "duckdb")
+IGNORED_KEYS = {"version"}
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+# ============================================================
+# COMPARISON
+# ============================================================
+
+def as_number(value):
+    """Float for JSON numbers (not numeric strings), else None."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    return None
+
+
+def sort_key(value):
+    """Canonical JSON with numbers rounded, for order-insensitive lists."""
+    def normalize(v):
+        if isinstance(v, dict):
+            return {k: normalize(x) for k, x in v.items() if k not in IGNORED_KEYS}
+        if isinstance(v, list):
+            return [normalize(x) for x in v]
+        number = as_number(v)
+        return float(f"{number:.9g}") if number is not None else v
+    return json.dumps(normalize(value), sort_keys=True)
+
+
+def compare(a, b, path="$", rel_tol=1e-9, abs_tol=1e-6):
+    """List of (json path, postgres value, duckdb value) differences."""
+    na, nb = as_number(a), as_number(b)
+    if na is not None and nb is not None:
+        return [] if math.isclose(na, nb, rel_tol=rel_tol, abs_tol=abs_tol) else [(path, a, b)]
+    if type(a) is not type(b):
+        return [(path, a, b)]
+
+    if isinstance(a, dict):
+        diffs = []
+        for key in sorted(a.keys() | b.keys()):
+            if key in IGNORED_KEYS:
+                continue
+            if key not in a or key not in b:
+                diffs.append((f"{path}.{key}", a.get(key, "<missing>"), b.get(key, "<missing>")))
+            else:
+                diffs.extend(compare(a[key], b[key], f"{path}.{key}", rel_tol, abs_tol))
+        return diffs
+
+    if isinstance(a, list):
+        if len(a) != len(b):
+            return [(f"{path}.length", len(a), len(b))]
+        diffs = []
+        for i, (x, y) in enumerate(zip(a, b)):
+            diffs.extend(compare(x, y, f"{path}[{i}]", rel_tol, abs_tol))
+        if diffs and all(isinstance(x, (dict, list)) for x in a + b):
+            # Same elements in another order is not a difference.
+            reordered = []
+            for i, (x, y) in enumerate(zip(sorted(a, key=sort_key), sorted(b, key=sort_key))):
+                reordered.extend(compare(x, y, f"{path}[~{i}]", rel_tol, abs_tol))
+            # Reported against the sorted lists: in-order positions would
+            # flag every element after the first shifted one.
+            return reordered
+        return diffs
+
+    return [] if a == b else [(path, a, b)]
+
+
+# ============================================================
+# RUNNING
+# ============================================================
+
+def run(command):
+    print("$", " ".join(command), file=sys.stderr)
+    return subprocess.run([sys.executable] + command, cwd=HERE).returncode
+
+
+def export_all(args, workdir):
+    options = []
+    if args.groups:
+        options += ["--groups", args.groups]
+    if args.wards:
+        options += ["--wards", args.wards]
+    if args.hexbin_resolutions:
+        options += ["--hexbin-resolutions", args.hexbin_resolutions]
+
+    outputs = {}
+    for backend in BACKENDS:
+        out = os.path.join(workdir, backend)
+        code = run(["export_snapshot.py", "--backend", backend, "--out", out,
+                    "--allow-errors"] + options)
+        if code != 0:
+            raise SystemExit(f"export from {backend} failed (exit {code})")
+        with open(os.path.join(out, "manifest.json"), encoding="utf-8") as f:
+            outputs[backend] = (out, json.load(f))
+    return outputs
+
+
+def load(root, entry):
+    with open(os.path.join(root, entry["file"]), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def check(outputs, max_diffs):
+    (pg_root, pg), (dk_root, dk) = outputs["postgres"], outputs["duckdb"]
+    failures = 0
+
+    for backend, (_, manifest) in outputs.items():
+        for error in manifest["errors"]:
+            failures += 1
+            print(f"FAIL {error['url']}: HTTP {error['status']} from {backend}")
+
+    identical = equivalent = 0
+    for url in sorted(pg["routes"].keys() | dk["routes"].keys()):
+        if url not in pg["routes"] or url not in dk["routes"]:
+            # Only reachable when the other backend errored (reported above).
+            continue
+        a, b = pg["routes"][url], dk["routes"][url]
+        if a["sha256"] == b["sha256"]:
+            identical += 1
+            continue
+        diffs = compare(load(pg_root, a), load(dk_root, b))
+        if not diffs:
+            equivalent += 1
+            continue
+        failures += 1
+        print(f"FAIL {url}: {len(diffs)} differences")
+        for path, x, y in diffs[:max_diffs]:
+            print(f"    {path}: postgres={json.dumps(x)[:120]} duckdb={json.dumps(y)[:120]}")
+
+    total = len(pg["routes"].keys() | dk["routes"].keys())
+    print(f"{total} URLs: {identical} identical, {equivalent} equivalent, {failures} failing")
+    return 1 if failures else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--skip-snapshot", action="store_true",
+                        help="compare against the existing Parquet snapshot")
+    parser.add_argument("--groups", help="comma-separated subset of endpoint groups")
+    parser.add_argument("--wards", help="comma-separated subset of ward IDs")
+    parser.add_argument("--hexbin-resolutions", help="as in export_snapshot.py")
+    parser.add_argument("--max-diffs", type=int, default=5,
+                        help="differences printed per URL")
+    parser.add_argument("--keep-exports", help="directory to keep both exports in")
+    args = parser.parse_args(argv)
+
+    if not args.skip_snapshot and run(["parquet_snapshot.py"]) != 0:
+        raise SystemExit("Parquet snapshot failed")
+
+    workdir = args.keep_exports or tempfile.mkdtemp(prefix="duckdb-parity-")
+    try:
+        sys.exit(check(export_all(args, workdir), args.max_diffs))
+    finally:
+        if not args.keep_exports:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import json
+import time
+import queue
+import threading
+from flask import Blueprint, Response, jsonify, request
+from config import EVENTS_CONFIG
+from data_version import current_version, on_refresh, view_versions
+
+events_bp = Blueprint("events", __name__, url_prefix="/api")
+
+# ============================================================
+# SERVER-SENT EVENTS FOR MATERIALIZED VIEW REFRESHES
+# ============================================================
+# Every open /api/events stream has its own bounded queue. The refresh
+# callback (run by data_version's LISTEN thread) fans each refresh out to
+# all of them, so dashboards can refetch just the panels backed by the
+# views named in the event. Event ids are data versions: a reconnecting
+# EventSource sends Last-Event-ID and is told about every view refreshed
+# since. Streams hold a server thread, so they are capped per worker and
+# closed after max_stream_seconds; clients reconnect transparently.
+#
+# The cap is max_subscribers, lowered to threads - 1 under gunicorn
+# (limit_subscribers() from gunicorn.conf.py) so streams never take every
+# request thread of a worker. A stream registers itself only once its
+# body starts: a client gone before that holds no slot.
+
+_SUBSCRIBERS = set()
+_LOCK = threading.Lock()
+_max_subscribers = EVENTS_CONFIG["max_subscribers"]
+
+
+def limit_subscribers(threads: int):
+    """Leave at least one of a worker's `threads` for ordinary requests."""
+    global _max_subscribers
+    _max_subscribers = max(0, min(EVENTS_CONFIG["max_subscribers"], threads - 1))
+
+
+def format_event(event: str, data: dict, event_id: str | None = None) -> str:
+    lines = []
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+
+def _broadcast(views, version):
+    message = format_event("refresh", {"views": list(views), "version": version}, version)
+    with _LOCK:
+        subscribers = list(_SUBSCRIBERS)
+    for q in subscribers:
+        try:
+            q.put_nowait(message)
+        except queue.Full:
+            # A stalled client loses its oldest event rather than blocking
+            # the listener thread.
+            try:
+                q.get_nowait()
+                q.put_nowait(message)
+            except (queue.Empty, queue.Full):
+                pass
+
+
+on_refresh(_broadcast)
+
+
+def missed_since(last_event_id: str) -> dict | None:
+    """Refresh event covering every view refreshed after last_event_id."""
+    versions = view_versions()
+    views = sorted(v for v, ver in versions.items() if ver > last_event_id)
+    if not views:
+        return None
+    return {"views": views, "version": max(versions[v] for v in views)}
+
+
+def stream(last_event_id):
+    q = queue.Queue(maxsize=EVENTS_CONFIG["queue_size"])
+    with _LOCK:
+        full = len(_SUBSCRIBERS) >= _max_subscribers
+        if not full:
+            _SUBSCRIBERS.add(q)
+    if full:
+        # Lost the last slot to a concurrent stream after the view's
+        # check: end at once, the client reconnects after retry.
+        yield f"retry: {EVENTS_CONFIG['retry_ms']}\n\n"
+        return
+    try:
+        yield f"retry: {EVENTS_CONFIG['retry_ms']}\n\n"
+        # The hello id lets a client that saw no refresh yet resume from
+        # here ("initial" is not an orderable version, so it is not sent).
+        version = current_version()
+        yield format_event("hello", {"version": version}, None if version == "initial" else version)
+        if last_event_id:
+            missed = missed_since(last_event_id)
+            if missed:
+                yield format_event("refresh", missed, missed["version"])
+
+        deadline = time.monotonic() + EVENTS_CONFIG["max_stream_seconds"]
+        while time.monotonic() < deadline:
+            try:
+                yield q.get(timeout=EVENTS_CONFIG["heartbeat_seconds"])
+            except queue.Empty:
+                # Comment line: keeps proxies from timing out the connection
+                # and surfaces disconnected clients as write errors.
+                yield ": keepalive\n\n"
+    finally:
+        with _LOCK:
+            _SUBSCRIBERS.discard(q)
+
+
+@events_bp.route("/events", methods=["GET"])
+def events():
+    """
+    text/event-stream of "refresh" events:
+        id: <version>
+        event: refresh
+        data: {"views": ["mv_..."], "version": "<version>"}
+    """
+    if subscriber_count() >= _max_subscribers:
+        response = jsonify({"error": "Too many event subscribers on this worker"})
+        response.status_code = 503
+        response.headers["Retry-After"] = str(EVENTS_CONFIG["retry_ms"] // 1000)
+        return response
+
+    last_event_id = request.headers.get("Last-Event-ID") or request.args.get("last_event_id")
+    response = Response(stream(last_event_id), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+def subscriber_count() -> int:
+    with _LOCK:
+        return len(_SUBSCRIBERS)
@@ -0,0 +1,284 @@
+"""
+Static snapshot of the whole dashboard API.
+
+Walks every read-only /api/* endpoint for "ALL" and each ward (plus the
+map layers and their variants) through the Flask test client, and writes
+the responses as pre-serialized JSON with a gzip twin into a directory
+tree mirroring the URL space:
+
+    /api/overview/summary?ward=ALL              -> api/overview/summary/ALL.json
+    /api/overview/summary?ward=hells gate       -> api/overview/summary/hells-gate.json
+    /api/maps/hexbins?resolution=6&ward=ALL     -> api/maps/hexbins/resolution-6/ALL.json
+    /api/wards                                  -> api/wards/index.json
+    /api/maps/households/P00004613              -> api/maps/households/P00004613/index.json
+    /api/maps/photos/P00004613?kind=plot&size=256
+                                                -> api/maps/photos/kind-plot/size-256/P00004613.jpg
+
+The popup details and photo thumbnails of every feature in the exported
+map layers are included, so a snapshot map works offline too.
+
+manifest.json lists every URL with its file, SHA-256 content hash and
+sizes, plus the wards and data version. The tree can be served by any
+static host (with gzip_static / equivalent). It is written to a temporary
+directory next to --out and swapped in only when complete:
+
+    python export_snapshot.py --out ../snapshot
+    python export_snapshot.py --out ../snapshot --groups maps --hexbin-resolutions 4,5,6
+"""
+import os
+import sys
+import gzip
+import json
+import shutil
+import hashlib
+import argparse
+from datetime import datetime, timezone
+from urllib.parse import quote, urlencode
+
+from config import HEXBIN_CONFIG, PHOTO_CONFIG
+
+# ============================================================
+# EXPORT PLAN
+# ============================================================
+# (group, path, variants). Each variant is a dict of extra query params
+# and is exported once per ward scope ("ALL" and every ward). None means
+# the endpoint takes no ward and is exported once as index.json.
+ENDPOINTS = [
+    ("overview", "/api/overview/summary", [{}]),
+    ("overview", "/api/overview/charts", [{}]),
+    ("overview", "/api/wards", None),
+    ("demographics", "/api/demographics/summary", [{}]),
+    ("demographics", "/api/demographics/charts", [{}]),
+    ("households", "/api/households/summary", [{}]),
+    ("households", "/api/households/charts", [{}]),
+    ("households", "/api/households/sanitation-safety", [{}]),
+    ("households", "/api/households/wash-governance", [{}]),
+    ("households", "/api/households/crossfilter", [{}]),
+    ("institutions", "/api/learning-institutions/summary", [{}]),
+    ("institutions", "/api/learning-institutions/charts", [{}]),
+    ("institutions", "/api/health-facilities/summary", [{}]),
+    ("institutions", "/api/health-facilities/charts", [{}]),
+    ("institutions", "/api/other-institutions/summary", [{}]),
+    ("institutions", "/api/other-institutions/charts", [{}]),
+    ("diagnostics", "/api/institutions/diagnostics/charts", [{}]),
+    ("diagnostics", "/api/institutions/diagnostics/options", [{}]),
+    ("diagnostics", "/api/institutions/diagnostics/narrative", [{}]),
+    ("maps", "/api/maps/households", [{}]),
+    ("maps", "/api/maps/institutions", [{}]),
+    ("maps", "/api/maps/wards", None),
+    ("maps", "/api/maps/accessibility", [{}]),
+    ("maps", "/api/maps/ward-boundaries", [
+        {},
+        {"include_stats": "true"},
+        {"include_stats": "true", "classify": "quantile"},
+        {"include_stats": "true", "classify": "equal_interval"},
+        {"include_stats": "true", "classify": "jenks"},
+    ]),
+    # hexbins variants are filled in from --hexbin-resolutions
+    ("maps", "/api/maps/hexbins", []),
+]
+
+
+def variant_dir(params):
+    """{"include_stats": "true", "classify": "jenks"} -> "classify-jenks/include_stats-true"."""
+    return "/".join(f"{k}-{v}" for k, v in sorted(params.items()))
+
+
+def file_path(path, params, ward):
+    parts = [path.strip("/")]
+    if ward is None:
+        parts.append("index.json")
+    else:
+        if params:
+            parts.append(variant_dir(params))
+        parts.append(f"{ward}.json")
+    return "/".join(parts)
+
+
+# Map layer -> (id property, detail path, photo kind). Details and photos
+# are exported for the features of the exported layer responses.
+LAYER_FEATURES = {
+    "/api/maps/households": ("plot_id", "/api/maps/households", "plot"),
+    "/api/maps/institutions": ("institution_id", "/api/maps/institutions", "institution"),
+}
+
+
+def build_plan(groups, wards, hexbin_resolutions):
+    """[(url, query params, relative file path)]."""
+    plan = []
+    for group, path, variants in ENDPOINTS:
+        if groups and group not in groups:
+            continue
+        if path == "/api/maps/hexbins":
+            variants = [{"resolution": str(r)} for r in hexbin_resolutions]
+        if variants is None:
+            plan.append((path, {}, file_path(path, {}, None)))
+            continue
+        for params in variants:
+            for ward_id in ["ALL"] + [w["id"] for w in wards]:
+                query = dict(params, ward=ward_id)
+                plan.append((path, query, file_path(path, params, ward_id)))
+    return plan
+
+
+def feature_plan(features, photo_sizes):
+    """
+    [(url, query params, relative file path)] of the details and photo
+    thumbnails of `features` ({layer path: {feature id: has photo}}).
+    """
+    plan = []
+    for layer, ids in sorted(features.items()):
+        _, detail_path, kind = LAYER_FEATURES[layer]
+        for feature_id, has_photo in sorted(ids.items()):
+            name = quote(feature_id, safe="")
+            path = f"{detail_path}/{name}"
+            plan.append((path, {}, file_path(path, {}, None)))
+            if not has_photo:
+                continue
+            for size in photo_sizes:
+                params = {"kind": kind, "size": str(size)}
+                plan.append((f"/api/maps/photos/{name}", params,
+                             f"api/maps/photos/{variant_dir(params)}/{name}.jpg"))
+    return plan
+
+
+def collect_features(features, path, body):
+    """Record the feature IDs (and whether they have a photo) of a layer response."""
+    id_property = LAYER_FEATURES[path][0]
+    ids = features.setdefault(path, {})
+    for feature in json.loads(body)["features"]:
+        props = feature["properties"]
+        ids[str(props[id_property])] = bool(props.get("photo"))
+
+
+# ============================================================
+# WRITING
+# ============================================================
+
+def write_file(root, rel, body):
+    """
+    Write body under root, with a body.gz twin except for JPEGs (already
+    compressed); returns the manifest entry.
+    """
+    target = os.path.join(root, rel)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, "wb") as f:
+        f.write(body)
+    entry = {
+        "file": rel,
+        "sha256": hashlib.sha256(body).hexdigest(),
+        "bytes": len(body),
+        "gzip_bytes": len(body),
+    }
+    if not rel.endswith(".jpg"):
+        # mtime=0 keeps the .gz byte-identical for identical content.
+        compressed = gzip.compress(body, compresslevel=9, mtime=0)
+        with open(target + ".gz", "wb") as f:
+            f.write(compressed)
+        entry["gzip_bytes"] = len(compressed)
+    return entry
+
+
+def export(args):
+    import db
+    if args.backend:
+        db.use_backend(args.backend)
+    from app import create_app, warm_up
+    from data_version import current_version
+    from wards import get_registry
+
+    app = create_app({"CACHE_TYPE": "NullCache"})
+    warm_up(app)
+
+    with app.app_context():
+        registry = get_registry()
+    wards = sorted((w.to_dict() for w in registry.wards.values()), key=lambda w: w["id"])
+    if args.wards:
+        wanted = set(args.wards.split(","))
+        wards = [w for w in wards if w["id"] in wanted]
+
+    groups = set(args.groups.split(",")) if args.groups else None
+    resolutions = [int(r) for r in args.hexbin_resolutions.split(",")]
+    plan = build_plan(groups, wards, resolutions)
+
+    out = os.path.abspath(args.out)
+    tmp = f"{out}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    client = app.test_client()
+    routes, errors, missing, features = {}, [], [], {}
+
+    def run(plan):
+        for i, (path, query, rel) in enumerate(plan, 1):
+            url = f"{path}?{urlencode(query)}" if query else path
+            resp = client.get(url)
+            if resp.status_code == 404 and path.startswith("/api/maps/photos/"):
+                # The API has no photo for it either; the static host 404s too.
+                missing.append(url)
+                continue
+            if resp.status_code != 200:
+                errors.append({"url": url, "status": resp.status_code, "body": resp.get_data(as_text=True)[:500]})
+                print(f"[{i}/{len(plan)}] {url}: HTTP {resp.status_code}", file=sys.stderr)
+                continue
+            routes[url] = write_file(tmp, rel, resp.get_data())
+            if path in LAYER_FEATURES:
+                collect_features(features, path, resp.get_data())
+            if i % 50 == 0 or i == len(plan):
+                print(f"[{i}/{len(plan)}] exported", file=sys.stderr)
+
+    run(plan)
+    if features and not args.no_features:
+        photo_sizes = [int(s) for s in args.photo_sizes.split(",")] if args.photo_sizes else []
+        run(feature_plan(features, photo_sizes))
+
+    manifest = {
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "data_version": current_version(),
+        "wards": wards,
+        "hexbin_resolutions": resolutions,
+        "routes": routes,
+        "errors": errors,
+        "missing_photos": missing,
+    }
+    with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+
+    if errors and not args.allow_errors:
+        print(f"{len(errors)} endpoints failed; partial snapshot left in {tmp}", file=sys.stderr)
+        return 1
+
+    # Swap the finished tree in; the previous snapshot is removed last.
+    old = f"{out}.old-{os.getpid()}"
+    if os.path.exists(out):
+        os.rename(out, old)
+    os.rename(tmp, out)
+    shutil.rmtree(old, ignore_errors=True)
+
+    total = sum(r["bytes"] for r in routes.values())
+    total_gz = sum(r["gzip_bytes"] for r in routes.values())
+    print(f"Wrote {len(routes)} files to {out} ({total / 1e6:.1f} MB, {total_gz / 1e6:.1f} MB gzipped)")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--out", default="snapshot", help="output directory (replaced)")
+    parser.add_argument("--groups", help="comma-separated subset of endpoint groups")
+    parser.add_argument("--wards", help="comma-separated subset of ward IDs")
+    parser.add_argument("--hexbin-resolutions", default=str(HEXBIN_CONFIG["default_resolution"]),
+                        help="comma-separated hexbin resolutions to export")
+    parser.add_argument("--photo-sizes", default=str(PHOTO_CONFIG["default_size"]),
+                        help="comma-separated thumbnail sizes to export (empty: no photos)")
+    parser.add_argument("--no-features", action="store_true",
+                        help="skip the per-feature details and photos of the map layers")
+    parser.add_argument("--backend", choices=["postgres", "duckdb"],
+                        help="data backend to export from (default: DATA_BACKEND)")
+    parser.add_argument("--allow-errors", action="store_true",
+                        help="publish the snapshot even if some endpoints failed")
+    args = parser.parse_args(argv)
+    sys.exit(export(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Small planar geometry helpers for GeoJSON polygons in lon/lat.
+
+Coordinates are treated as plain (x, y) = (lon, lat); at ward/county
+scale near the equator this is accurate enough for containment tests.
+"""
+import math
+
+
+def ring_contains(ring, x: float, y: float) -> bool:
+    """Ray-casting test for a single closed ring of [x, y] pairs."""
+    inside = False
+    n = len(ring)
+    j = n - 1
+    for i in range(n):
+        xi, yi = ring[i][0], ring[i][1]
+        xj, yj = ring[j][0], ring[j][1]
+        if (yi > y) != (yj > y):
+            if x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+                inside = not inside
+        j = i
+    return inside
+
+
+def polygon_contains(rings, x: float, y: float) -> bool:
+    """GeoJSON Polygon coordinates: exterior ring followed by holes."""
+    if not rings or not ring_contains(rings[0], x, y):
+        return False
+    for hole in rings[1:]:
+        if ring_contains(hole, x, y):
+            return False
+    return True
+
+
+def geometry_polygons(geometry: dict) -> list:
+    """Polygon / MultiPolygon geometry -> list of polygon ring lists."""
+    gtype = geometry.get("type")
+    coords = geometry.get("coordinates") or []
+    if gtype == "Polygon":
+        return [coords]
+    if gtype == "MultiPolygon":
+        return list(coords)
+    raise ValueError(f"Unsupported geometry type: {gtype}")
+
+
+def validate_polygons(geometry: dict):
+    """
+    Raise ValueError unless every ring of a Polygon / MultiPolygon is a
+    list of at least 3 positions whose x and y are finite numbers.
+    """
+    for polygon in geometry_polygons(geometry):
+        if not isinstance(polygon, list) or not polygon:
+            raise ValueError("polygon must be a non-empty list of rings")
+        for ring in polygon:
+            if not isinstance(ring, list) or len(ring) < 3:
+                raise ValueError("ring must be a list of at least 3 positions")
+            for position in ring:
+                if not isinstance(position, list) or len(position) < 2:
+                    raise ValueError("position must be [x, y]")
+                for v in position[:2]:
+                    if isinstance(v, bool) or not isinstance(v, (int, float)) or not math.isfinite(v):
+                        raise ValueError("coordinates must be finite numbers")
+
+
+def geometry_contains(geometry: dict, x: float, y: float) -> bool:
+    return any(polygon_contains(p, x, y) for p in geometry_polygons(geometry))
+
+
+def geometry_bbox(geometry: dict) -> tuple:
+    """(min_x, min_y, max_x, max_y) of a Polygon / MultiPolygon."""
+    xs, ys = [], []
+    for polygon in geometry_polygons(geometry):
+        for x, y, *_ in polygon[0]:
+            xs.append(x)
+            ys.append(y)
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+def translate_geometry(geometry: dict, dx: float, dy: float) -> dict:
+    """Copy of a Polygon / MultiPolygon shifted by (dx, dy)."""
+    def shift(rings):
+        return [[[p[0] + dx, p[1] + dy] for p in ring] for ring in rings]
+
+    polygons = [shift(p) for p in geometry_polygons(geometry)]
+    if geometry["type"] == "Polygon":
+        return {"type": "Polygon", "coordinates": polygons[0]}
+    return {"type": "MultiPolygon", "coordinates": polygons}
+
+
+def _segments_cross(ax, ay, bx, by, cx, cy, dx, dy) -> bool:
+    """Whether segments AB and CD intersect (touching counts)."""
+    def orient(px, py, qx, qy, rx, ry):
+        v = (qx - px) * (ry - py) - (qy - py) * (rx - px)
+        return (v > 0) - (v < 0)
+
+    def on_segment(px, py, qx, qy, rx, ry):
+        return min(px, qx) <= rx <= max(px, qx) and min(py, qy) <= ry <= max(py, qy)
+
+    o1 = orient(ax, ay, bx, by, cx, cy)
+    o2 = orient(ax, ay, bx, by, dx, dy)
+    o3 = orient(cx, cy, dx, dy, ax, ay)
+    o4 = orient(cx, cy, dx, dy, bx, by)
+    if o1 != o2 and o3 != o4:
+        return True
+    return (
+        (o1 == 0 and on_segment(ax, ay, bx, by, cx, cy))
+        or (o2 == 0 and on_segment(ax, ay, bx, by, dx, dy))
+        or (o3 == 0 and on_segment(cx, cy, dx, dy, ax, ay))
+        or (o4 == 0 and on_segment(cx, cy, dx, dy, bx, by))
+    )
+
+
+def segment_intersects_rect(x1, y1, x2, y2, min_x, min_y, max_x, max_y) -> bool:
+    """Whether segment (x1, y1)-(x2, y2) touches the axis-aligned rectangle."""
+    if max(x1, x2) < min_x or min(x1, x2) > max_x:
+        return False
+    if max(y1, y2) < min_y or min(y1, y2) > max_y:
+        return False
+    if min_x <= x1 <= max_x and min_y <= y1 <= max_y:
+        return True
+    if min_x <= x2 <= max_x and min_y <= y2 <= max_y:
+        return True
+    corners = ((min_x, min_y), (max_x, min_y), (max_x, max_y), (min_x, max_y))
+    for i in range(4):
+        (cx, cy), (dx, dy) = corners[i], corners[(i + 1) % 4]
+        if _segments_cross(x1, y1, x2, y2, cx, cy, dx, dy):
+            return True
+    return False
+
+
+def geometry_edges(geometry: dict) -> list:
+    """Every ring edge of a Polygon / MultiPolygon as (x1, y1, x2, y2)."""
+    edges = []
+    for polygon in geometry_polygons(geometry):
+        for ring in polygon:
+            for a, b in zip(ring, ring[1:] + ring[:1]):
+                if a[0] != b[0] or a[1] != b[1]:
+                    edges.append((a[0], a[1], b[0], b[1]))
+    return edges
+
@@ -0,0 +1,45 @@
+"""
+Production serving configuration.
+
+    cd backend && gunicorn
+
+The app is built by create_app() inside each worker (preload_app is off),
+so the Flask-Caching store and the connection pool are created after
+fork and never shared between processes. Workers are recycled after
+max_requests (+ jitter) to bound memory growth.
+"""
+import multiprocessing
+
+from config import SERVER_CONFIG
+
+_cpus = multiprocessing.cpu_count()
+
+wsgi_app = "app:create_app()"
+bind = SERVER_CONFIG["bind"]
+
+# I/O-bound (waiting on Postgres), so threads per worker rather than a
+# very large worker count; each worker holds its own cache and pool.
+worker_class = "gthread"
+workers = SERVER_CONFIG["workers"] or min(2 * _cpus + 1, 12)
+threads = SERVER_CONFIG["threads"] or max(2, min(_cpus, 8))
+preload_app = False
+
+max_requests = SERVER_CONFIG["max_requests"]
+max_requests_jitter = SERVER_CONFIG["max_requests_jitter"]
+timeout = SERVER_CONFIG["timeout"]
+graceful_timeout = 30
+keepalive = 5
+
+
+def post_worker_init(worker):
+    # One connection per request thread, plus one spare.
+    from app import warm_up
+    warm_up(worker.wsgi, maxconn=worker.cfg.threads + 1)
+    # Event streams hold a thread each; keep one free for other requests.
+    import events
+    events.limit_subscribers(worker.cfg.threads)
+
+
+def worker_exit(server, worker):
+    import db
+    db.close_pool()
@@ -1,7 +1,9 @@
 # health_facilities.py
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify
 from db import get_conn
 from extensions import cache
+from admission import admit
+from wards import normalized_cache_key, ward_arg
 from psycopg2.extras import RealDictCursor
 
 health_facilities_bp = Blueprint("health_facilities", __name__)
@@ -10,10 +12,10 @@ health_facilities_bp = Blueprint("health_facilities", __name__)
 # SUMMARY (KPI METRICS)
 # ============================================================
 @health_facilities_bp.route("/api/health-facilities/summary", methods=["GET"])
-@cache.cached(timeout=300, query_string=True)
+@cache.cached(timeout=300, make_cache_key=normalized_cache_key)
+@admit("summaries")
 def health_facilities_summary():
-    ward = request.args.get("ward")
-    ward = None if not ward or ward.upper() == "ALL" else ward.lower()
+    ward = ward_arg("summary")
 
     conn = get_conn()
     cur = conn.cursor(cursor_factory=RealDictCursor)
@@ -54,10 +56,10 @@ def health_facilities_summary():
 # CHART DATA
 # ============================================================
 @health_facilities_bp.route("/api/health-facilities/charts", methods=["GET"])
-@cache.cached(timeout=300, query_string=True)
+@cache.cached(timeout=300, make_cache_key=normalized_cache_key)
+@admit("summaries")
 def health_facilities_charts():
-    ward = request.args.get("ward")
-    ward = None if not ward or ward.upper() == "ALL" else ward.lower()
+    ward = ward_arg("summary")
 
     sql = """
         SELECT
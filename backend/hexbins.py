@@ -0,0 +1,205 @@
+import math
+import logging
+import threading
+from collections import OrderedDict
+from db import get_conn
+from config import HEXBIN_CONFIG
+from data_version import current_version, on_refresh
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# HEXAGONAL BINNING OF HOUSEHOLD POINTS
+# ============================================================
+# mv_map_households is loaded once into NumPy columns. A layer for a given
+# resolution (and optional ward) is computed with vectorized hex
+# assignment + bincount, and kept in a small LRU keyed by data version,
+# so a refresh of INDEX_VIEWS naturally invalidates it.
+#
+# Hexes are pointy-top with circumradius base_size_deg / 2**resolution
+# degrees of latitude; longitudes are scaled by cos(mean latitude) first so
+# cells are regular on the ground.
+#
+# NumPy is imported where it is used, so importing this module (as maps.py
+# does) costs nothing until the first hexbin layer is built.
+
+INDEX_VIEWS = ["mv_map_households"]
+
+UNSAFE_CLASSES = ("Unimproved", "Open defecation")
+
+SQRT3 = math.sqrt(3)
+
+
+def hex_cells(x, y, radius):
+    """
+    Integer (col, row) of the pointy-top hexagon containing each point
+    (d3-hexbin lattice). x, y are arrays in the scaled plane.
+    """
+    import numpy as np
+
+    dx = radius * SQRT3
+    dy = radius * 1.5
+    py = y / dy
+    pj = np.round(py)
+    odd = np.mod(pj, 2)
+    px = x / dx - odd / 2
+    pi = np.round(px)
+    py1 = py - pj
+
+    # Near a row boundary the point may belong to the neighbouring row.
+    ambiguous = np.abs(py1) * 3 > 1
+    px1 = px - pi
+    pi2 = pi + np.where(px < pi, -0.5, 0.5)
+    pj2 = pj + np.where(py < pj, -1.0, 1.0)
+    px2 = px - pi2
+    py2 = py - pj2
+    # Compare true distances to both candidate centres (lattice units
+    # differ along x and y, so scale back before comparing).
+    switch = ambiguous & (
+        (px1 * dx) ** 2 + (py1 * dy) ** 2 > (px2 * dx) ** 2 + (py2 * dy) ** 2
+    )
+    pi = np.where(switch, pi2 + np.where(odd == 1, 0.5, -0.5), pi)
+    pj = np.where(switch, pj2, pj)
+    return pi.astype(np.int64), pj.astype(np.int64)
+
+
+def hex_polygon(col, row, radius, lon_scale):
+    """Closed lon/lat ring of hexagon (col, row)."""
+    cx = (col + (row % 2) / 2) * radius * SQRT3
+    cy = row * radius * 1.5
+    ring = []
+    for k in range(7):
+        angle = math.radians(60 * (k % 6) + 30)
+        ring.append([
+            round((cx + radius * math.cos(angle)) / lon_scale, 6),
+            round(cy + radius * math.sin(angle), 6),
+        ])
+    return [ring]
+
+
+class HouseholdPoints:
+    """Column arrays of the household layer."""
+
+    def __init__(self, rows, version):
+        import numpy as np
+
+        self.version = version
+        n = len(rows)
+        self.lon = np.fromiter((r[0] for r in rows), dtype=np.float64, count=n)
+        self.lat = np.fromiter((r[1] for r in rows), dtype=np.float64, count=n)
+        wards = np.array([r[2] or "" for r in rows], dtype=object)
+        self.ward_names, self.ward_codes = np.unique(wards, return_inverse=True)
+        self.unsafe = np.fromiter((r[3] in UNSAFE_CLASSES for r in rows), dtype=bool, count=n)
+        self.shared = np.fromiter((bool(r[4]) for r in rows), dtype=bool, count=n)
+        self.persons = np.fromiter((r[5] or 0 for r in rows), dtype=np.int64, count=n)
+        self.lon_scale = math.cos(math.radians(float(self.lat.mean()))) if n else 1.0
+        self.size = n
+        self._layers = OrderedDict()
+        self._lock = threading.Lock()
+
+    def layer(self, resolution, ward=None):
+        key = (resolution, ward)
+        with self._lock:
+            if key in self._layers:
+                self._layers.move_to_end(key)
+                return self._layers[key]
+
+        layer = self._compute(resolution, ward)
+        with self._lock:
+            self._layers[key] = layer
+            while len(self._layers) > HEXBIN_CONFIG["max_cached_layers"]:
+                self._layers.popitem(last=False)
+        return layer
+
+    def _compute(self, resolution, ward):
+        import numpy as np
+
+        radius = HEXBIN_CONFIG["base_size_deg"] / 2 ** resolution
+        mask = slice(None)
+        if ward is not None:
+            matches = np.flatnonzero(self.ward_names == ward)
+            if not len(matches):
+                return []
+            mask = self.ward_codes == matches[0]
+
+        cols, rows = hex_cells(self.lon[mask] * self.lon_scale, self.lat[mask], radius)
+        if not len(cols):
+            return []
+        cells, inverse = np.unique(np.stack([cols, rows], axis=1), axis=0, return_inverse=True)
+        inverse = inverse.ravel()
+        households = np.bincount(inverse)
+        unsafe = np.bincount(inverse, weights=self.unsafe[mask])
+        shared = np.bincount(inverse, weights=self.shared[mask])
+        persons = np.bincount(inverse, weights=self.persons[mask])
+
+        features = []
+        for (col, row), n, u, s, p in zip(cells.tolist(), households.tolist(),
+                                          unsafe.tolist(), shared.tolist(), persons.tolist()):
+            features.append({
+                "type": "Feature",
+                "geometry": {
+                    "type": "Polygon",
+                    "coordinates": hex_polygon(col, row, radius, self.lon_scale),
+                },
+                "properties": {
+                    "hex_id": f"{resolution}:{col}:{row}",
+                    "households": n,
+                    "unsafe_households": int(u),
+                    "unsafe_share": round(u / n, 4),
+                    "shared_share": round(s / n, 4),
+                    "population": int(p),
+                },
+            })
+        return features
+
+
+def load_points():
+    version = current_version(INDEX_VIEWS)
+    conn = get_conn(cursor_factory=None)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT lon, lat, ward, sanitation_class, is_shared, total_persons
+                FROM public.mv_map_households
+                WHERE lat IS NOT NULL AND lon IS NOT NULL
+            """)
+            rows = cur.fetchall()
+    finally:
+        conn.close()
+
+    points = HouseholdPoints(rows, version)
+    logger.info(f"Loaded {points.size} household points for hexbins v{version}")
+    return points
+
+
+_POINTS = None
+_BUILD_LOCK = threading.Lock()
+
+
+def get_points():
+    """Current point arrays, loaded on first use."""
+    global _POINTS
+    if _POINTS is None:
+        with _BUILD_LOCK:
+            if _POINTS is None:
+                _POINTS = load_points()
+    return _POINTS
+
+
+def _reload(views, version):
+    """Load the replacement off the request path; keep serving the old one."""
+    if _POINTS is None:
+        return
+
+    def build():
+        global _POINTS
+        with _BUILD_LOCK:
+            try:
+                _POINTS = load_points()
+            except Exception as e:
+                logger.error(f"Hexbin point reload failed: {e}")
+
+    threading.Thread(target=build, name="hexbin-points", daemon=True).start()
+
+
+on_refresh(_reload, views=INDEX_VIEWS)
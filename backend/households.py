@@ -1,7 +1,11 @@
 from flask import Blueprint, jsonify, request
 from db import get_conn
 from extensions import cache
+from admission import admit
 from psycopg2.extras import RealDictCursor
+from crossfilter import DIMENSIONS, get_engine as get_crossfilter, value_label
+from wards import get_registry, normalized_cache_key, ward_arg
+from tracing import span
 
 households_bp = Blueprint("households", __name__)
 
@@ -10,8 +14,7 @@ households_bp = Blueprint("households", __name__)
 # ============================================================
 
 def normalize_ward():
-    ward = request.args.get("ward")
-    return None if not ward or ward.upper() == "ALL" else ward.lower()
+    return ward_arg("summary")
 
 
 def normalize_label(label: str) -> str:
@@ -66,7 +69,8 @@ def dict_to_list(d: dict):
 # SUMMARY (KPI METRICS)
 # ============================================================
 @households_bp.route("/api/households/summary", methods=["GET"])
-@cache.cached(timeout=300, query_string=True)
+@cache.cached(timeout=300, make_cache_key=normalized_cache_key)
+@admit("summaries")
 def households_summary():
     ward = normalize_ward()
 
@@ -105,7 +109,8 @@ def households_summary():
 # CHART DATA (AGGREGATED & CLEAN)
 # ============================================================
 @households_bp.route("/api/households/charts", methods=["GET"])
-@cache.cached(timeout=300, query_string=True)
+@cache.cached(timeout=300, make_cache_key=normalized_cache_key)
+@admit("summaries")
 def households_charts():
     ward = normalize_ward()
 
@@ -130,21 +135,22 @@ def households_charts():
     water_sources = {}
     sharing_patterns = {}
 
-    for row in rows:
-        chart_type = row["chart_type"]
-        label = row["label"]
-        value = row["value"]
+    with span("reshape.classify", rows=len(rows)):
+        for row in rows:
+            chart_type = row["chart_type"]
+            label = row["label"]
+            value = row["value"]
 
-        if chart_type == "sanitation_type":
-            key = classify_sanitation_type(label)
-            sanitation_types[key] = sanitation_types.get(key, 0) + value
+            if chart_type == "sanitation_type":
+                key = classify_sanitation_type(label)
+                sanitation_types[key] = sanitation_types.get(key, 0) + value
 
-        elif chart_type == "water_source":
-            key = classify_water_source(label)
-            water_sources[key] = water_sources.get(key, 0) + value
+            elif chart_type == "water_source":
+                key = classify_water_source(label)
+                water_sources[key] = water_sources.get(key, 0) + value
 
-        elif chart_type == "toilet_sharing":
-            sharing_patterns[label] = sharing_patterns.get(label, 0) + value
+            elif chart_type == "toilet_sharing":
+                sharing_patterns[label] = sharing_patterns.get(label, 0) + value
 
     return jsonify({
         "sanitationTypes": dict_to_list(sanitation_types),
@@ -157,7 +163,8 @@ def households_charts():
 # SANITATION SAFETY & FUNCTIONALITY (MV 1)
 # ============================================================
 @households_bp.route("/api/households/sanitation-safety", methods=["GET"])
-@cache.cached(timeout=300, query_string=True)
+@cache.cached(timeout=300, make_cache_key=normalized_cache_key)
+@admit("summaries")
 def households_sanitation_safety():
     ward = normalize_ward()
 
@@ -215,7 +222,8 @@ def households_sanitation_safety():
 # WASH & GOVERNANCE (MV 2)
 # ============================================================
 @households_bp.route("/api/households/wash-governance", methods=["GET"])
-@cache.cached(timeout=300, query_string=True)
+@cache.cached(timeout=300, make_cache_key=normalized_cache_key)
+@admit("summaries")
 def households_wash_governance():
     ward = normalize_ward()
 
@@ -250,3 +258,38 @@ def households_wash_governance():
 
     return jsonify(row)
 
+
+# ============================================================
+# CROSS-FILTER (IN-MEMORY BITMAPS OVER mv_map_households)
+# ============================================================
+@households_bp.route("/api/households/crossfilter", methods=["GET"])
+@cache.cached(timeout=300, make_cache_key=normalized_cache_key)
+@admit("summaries")
+def households_crossfilter():
+    """
+    Chart counts for every household dimension under the selected filters,
+    e.g. ?is_shared=Yes&sanitation_class=Basic&sanitation_class=Unimproved
+    (repeat a parameter to select several values). Each dimension's counts
+    ignore its own filter. Booleans are Yes / No / Unknown.
+    """
+    engine = get_crossfilter()
+    filters = {
+        dim: [value_label(dim, v) for v in request.args.getlist(dim)]
+        for dim in DIMENSIONS
+        if dim != "ward" and request.args.getlist(dim)
+    }
+    wards = [get_registry().stored_name(w, "households") for w in request.args.getlist("ward")]
+    if wards and None not in wards:
+        # Column labels of the ward dimension are value_label()-normalized.
+        filters["ward"] = [value_label("ward", w) for w in wards]
+
+    matched, charts = engine.query(filters)
+    return jsonify({
+        "data": {dim: dict_to_list(dict(counts)) for dim, counts in charts.items()},
+        "meta": {
+            "total_households": engine.size,
+            "matched_households": matched,
+            "filters": filters,
+            "version": engine.version,
+        },
+    })
@@ -0,0 +1,223 @@
+import bisect
+import logging
+import threading
+from collections import defaultdict, namedtuple
+from itertools import product
+from db import get_conn
+from data_version import current_version, on_refresh
+from json_encoding import dumps
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# IN-MEMORY CUBE FOR INSTITUTION DIAGNOSTICS
+# ============================================================
+# The three diagnostics MVs are loaded once and every roll-up over
+# ward x institution_category x institution_subcategory (x metric) is
+# precomputed, so any filter combination is a dict lookup. Rebuilt in the
+# background when refresh.py announces a refresh of one of CUBE_VIEWS.
+#
+# Cell keys use ALL for "not filtered"; None stays a real (NULL) value,
+# matching the SQL `(%s IS NULL OR col = %s)` semantics, where NULL rows
+# only appear unfiltered.
+#
+# Option rows are kept as OptionRow tuples (not dicts) together with
+# their JSON, encoded once per build, so /options responses are a join
+# of prepared strings.
+
+CUBE_VIEWS = [
+    "mv_institutions_chart_aggregates",
+    "mv_institutions_option_summary",
+    "mv_institutions_diagnostics",
+]
+
+ALL = "\x00ALL"
+
+
+def option_sort_key(ward, subcategory, category):
+    """
+    ORDER BY ward, institution_subcategory (NULLs last, as in Postgres),
+    with institution_category as a tie-breaker so keyset pages are exact.
+    """
+    return (
+        ward is None, ward or "",
+        subcategory is None, subcategory or "",
+        category is None, category or "",
+    )
+
+
+OPTION_COLUMNS = (
+    "ward",
+    "institution_category",
+    "institution_subcategory",
+    "total_institutions",
+    "ever_emptied_yes",
+    "ever_emptied_no",
+    "safe_sludge_yes",
+    "safe_sludge_no",
+    "solid_waste_open_dump",
+    "solid_waste_burning",
+    "solid_waste_collected",
+    "water_access_yes",
+    "water_access_no",
+    "water_continuous",
+    "handwashing_yes",
+    "handwashing_no",
+    "soap_available_yes",
+    "soap_available_no",
+    "maintenance_plan_yes",
+    "maintenance_plan_no",
+    "flood_affected_yes",
+    "flood_affected_no",
+)
+
+
+class OptionRow(namedtuple("OptionRow", OPTION_COLUMNS)):
+    __slots__ = ()
+
+
+def option_row_key(row):
+    return (row.ward, row.institution_subcategory, row.institution_category)
+
+
+class InstitutionsCube:
+    def __init__(self, chart_rows, option_rows, narrative_rows, version):
+        self.version = version
+        self.charts = self._rollup(chart_rows)
+        self.narrative = self._rollup(narrative_rows)
+        self.options = self._index_options(option_rows)
+
+    @staticmethod
+    def _rollup(rows):
+        """
+        rows: (ward, category, subcategory, metric, label, value).
+        Returns {(ward|ALL, category|ALL, subcategory|ALL, metric|ALL):
+                 {metric: {label: value}}}.
+        """
+        cells = defaultdict(lambda: defaultdict(lambda: defaultdict(int)))
+        for ward, category, subcategory, metric, label, value in rows:
+            dims = (ward, category, subcategory, metric)
+            for mask in product((True, False), repeat=4):
+                key = tuple(d if keep else ALL for d, keep in zip(dims, mask))
+                cells[key][metric][label] += value or 0
+        return cells
+
+    @staticmethod
+    def _index_options(rows):
+        """
+        {(ward|ALL, category|ALL, subcategory|ALL): ([row, ...], [json, ...])}
+        in SQL order.
+        """
+        rows = sorted(rows, key=lambda r: option_sort_key(*option_row_key(r)))
+        index = defaultdict(lambda: ([], []))
+        for row in rows:
+            encoded = dumps(row._asdict())
+            dims = (row.ward, row.institution_category, row.institution_subcategory)
+            for mask in product((True, False), repeat=3):
+                key = tuple(d if keep else ALL for d, keep in zip(dims, mask))
+                cell_rows, cell_json = index[key]
+                cell_rows.append(row)
+                cell_json.append(encoded)
+        return index
+
+    @staticmethod
+    def _key(*filters):
+        return tuple(ALL if f is None else f for f in filters)
+
+    def _counts(self, cells, ward, category, subcategory, metric):
+        """{metric: [(label, value), ...]} ordered by value DESC."""
+        cell = cells.get(self._key(ward, category, subcategory, metric), {})
+        return {
+            m: sorted(labels.items(), key=lambda lv: (-lv[1], lv[0] or ""))
+            for m, labels in cell.items()
+        }
+
+    def chart_counts(self, ward, category, subcategory, metric):
+        return self._counts(self.charts, ward, category, subcategory, metric)
+
+    def narrative_counts(self, ward, category, subcategory, metric):
+        return self._counts(self.narrative, ward, category, subcategory, metric)
+
+    def option_page(self, ward, category, subcategory, after=None, limit=None):
+        """
+        (option rows, their JSON) in SQL order. `after` is the
+        option_row_key of the last row already returned (keyset cursor);
+        `limit` caps the page.
+        """
+        rows, encoded = self.options.get(self._key(ward, category, subcategory), ([], []))
+        start = 0
+        if after is not None:
+            start = bisect.bisect_right(
+                rows, option_sort_key(*after),
+                key=lambda r: option_sort_key(*option_row_key(r)),
+            )
+        end = len(rows) if limit is None else start + limit
+        return rows[start:end], encoded[start:end]
+
+
+def load_cube():
+    version = current_version(CUBE_VIEWS)
+    conn = get_conn(cursor_factory=None)
+    cur = conn.cursor()
+
+    cur.execute("""
+        SELECT ward, institution_category, institution_subcategory,
+               metric, category, SUM(value)::int AS value
+        FROM mv_institutions_chart_aggregates
+        GROUP BY 1, 2, 3, 4, 5
+    """)
+    chart_rows = cur.fetchall()
+
+    cur.execute("""
+        SELECT ward, institution_category, institution_subcategory,
+               metric, category, SUM(value)::int AS value
+        FROM mv_institutions_diagnostics
+        GROUP BY 1, 2, 3, 4, 5
+    """)
+    narrative_rows = cur.fetchall()
+
+    cur.execute(f"""
+        SELECT {", ".join(OPTION_COLUMNS)}
+        FROM mv_institutions_option_summary
+    """)
+    option_rows = [OptionRow._make(r) for r in cur.fetchall()]
+
+    cur.close()
+    conn.close()
+
+    cube = InstitutionsCube(chart_rows, option_rows, narrative_rows, version)
+    logger.info(
+        f"Built institutions cube v{version}: {len(cube.charts)} chart cells, "
+        f"{len(cube.narrative)} narrative cells, {len(option_rows)} option rows"
+    )
+    return cube
+
+
+_CUBE = None
+_BUILD_LOCK = threading.Lock()
+
+
+def get_cube():
+    """Current cube, built on first use."""
+    global _CUBE
+    if _CUBE is None:
+        with _BUILD_LOCK:
+            if _CUBE is None:
+                _CUBE = load_cube()
+    return _CUBE
+
+
+def _rebuild(views, version):
+    """Build the replacement off the request path; keep serving the old one."""
+    def build():
+        global _CUBE
+        with _BUILD_LOCK:
+            try:
+                _CUBE = load_cube()
+            except Exception as e:
+                logger.error(f"Institutions cube rebuild failed: {e}")
+
+    threading.Thread(target=build, name="institutions-cube", daemon=True).start()
+
+
+on_refresh(_rebuild, views=CUBE_VIEWS)
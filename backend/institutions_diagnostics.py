@@ -1,7 +1,10 @@
 from flask import Blueprint, jsonify, request
-from db import get_conn
 from extensions import cache
-from psycopg2.extras import RealDictCursor
+from admission import admit
+from institutions_cube import get_cube, option_row_key
+from json_encoding import dumps, json_response
+from pagination import page_args, page_meta
+from wards import normalized_cache_key, ward_arg
 
 institutions_diagnostics_bp = Blueprint(
     "institutions_diagnostics", __name__
@@ -13,10 +16,12 @@ institutions_diagnostics_bp = Blueprint(
 @institutions_diagnostics_bp.route(
     "/api/institutions/diagnostics/charts", methods=["GET"]
 )
-@cache.cached(timeout=300, query_string=True)
+@cache.cached(timeout=300, make_cache_key=normalized_cache_key)
+@admit("diagnostics")
 def institutions_diagnostics_charts():
     """
     Generic chart endpoint backed by mv_institutions_chart_aggregates
+    (answered from the in-memory cube, see institutions_cube.py)
 
     Query params (all optional):
     - ward
@@ -25,60 +30,28 @@ def institutions_diagnostics_charts():
     - metric
     """
 
-    ward = request.args.get("ward")
     category = request.args.get("institution_category")
     subcategory = request.args.get("institution_subcategory")
     metric = request.args.get("metric")
 
     # Normalize filters
-    ward = None if not ward or ward.upper() == "ALL" else ward.lower()
+    ward = ward_arg("summary")
     category = None if not category or category.upper() == "ALL" else category
     subcategory = None if not subcategory or subcategory.upper() == "ALL" else subcategory
     metric = None if not metric or metric.upper() == "ALL" else metric
 
-    sql = """
-        SELECT
-            metric,
-            category AS label,
-            SUM(value)::int AS value
-        FROM mv_institutions_chart_aggregates
-        WHERE (%s IS NULL OR ward = %s)
-          AND (%s IS NULL OR institution_category = %s)
-          AND (%s IS NULL OR institution_subcategory = %s)
-          AND (%s IS NULL OR metric = %s)
-        GROUP BY metric, category
-        ORDER BY metric, value DESC
-    """
-
-    conn = get_conn()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
-
-    cur.execute(
-        sql,
-        (
-            ward, ward,
-            category, category,
-            subcategory, subcategory,
-            metric, metric
-        )
-    )
-
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
+    counts = get_cube().chart_counts(ward, category, subcategory, metric)
 
     # Shape response by metric (frontend-friendly)
     charts = {}
-    for row in rows:
-        m = row["metric"]
-        if m not in charts:
-            charts[m] = []
-        charts[m].append(
+    for m, labels in counts.items():
+        charts[m] = [
             {
-                "label": row["label"],
-                "value": row["value"]
+                "label": label,
+                "value": value
             }
-        )
+            for label, value in labels
+        ]
 
     return jsonify(charts)
 
@@ -88,84 +61,48 @@ def institutions_diagnostics_charts():
 @institutions_diagnostics_bp.route(
     "/api/institutions/diagnostics/options", methods=["GET"]
 )
-@cache.cached(timeout=300, query_string=True)
+@cache.cached(timeout=300, make_cache_key=normalized_cache_key)
+@admit("diagnostics")
 def institutions_diagnostics_options():
     """
     Option-heavy diagnostics endpoint backed by mv_institutions_option_summary
+    (answered from the in-memory cube, see institutions_cube.py)
 
     Query params (all optional):
     - ward
     - institution_category
     - institution_subcategory
+    - limit, cursor: keyset pagination; the response becomes
+      {"data": [...], "meta": {"next_cursor": ...}}
     """
 
-    ward = request.args.get("ward")
     category = request.args.get("institution_category")
     subcategory = request.args.get("institution_subcategory")
+    # Cursor: option_row_key (ward, subcategory, category)
+    limit, after = page_args(3)
 
     # Normalize filters
-    ward = None if not ward or ward.upper() == "ALL" else ward.lower()
+    ward = ward_arg("summary")
     category = None if not category or category.upper() == "ALL" else category
     subcategory = None if not subcategory or subcategory.upper() == "ALL" else subcategory
 
-    sql = """
-        SELECT
-            ward,
-            institution_category,
-            institution_subcategory,
-
-            total_institutions,
-
-            ever_emptied_yes,
-            ever_emptied_no,
-
-            safe_sludge_yes,
-            safe_sludge_no,
-
-            solid_waste_open_dump,
-            solid_waste_burning,
-            solid_waste_collected,
-
-            water_access_yes,
-            water_access_no,
-            water_continuous,
-
-            handwashing_yes,
-            handwashing_no,
-
-            soap_available_yes,
-            soap_available_no,
+    # Rows are served as the JSON the cube encoded when it was built
+    if limit is None:
+        _, encoded = get_cube().option_page(ward, category, subcategory)
+        return json_response("[" + ",".join(encoded) + "]")
 
-            maintenance_plan_yes,
-            maintenance_plan_no,
-
-            flood_affected_yes,
-            flood_affected_no
-
-        FROM mv_institutions_option_summary
-        WHERE (%s IS NULL OR ward = %s)
-          AND (%s IS NULL OR institution_category = %s)
-          AND (%s IS NULL OR institution_subcategory = %s)
-        ORDER BY ward, institution_subcategory
-    """
-
-    conn = get_conn()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
-
-    cur.execute(
-        sql,
-        (
-            ward, ward,
-            category, category,
-            subcategory, subcategory
-        )
+    # One extra row tells us whether there is a next page
+    rows, encoded = get_cube().option_page(
+        ward, category, subcategory, after=after, limit=limit + 1
     )
+    has_more = len(rows) > limit
+    rows, encoded = rows[:limit], encoded[:limit]
 
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
-
-    return jsonify(rows)
+    meta = dict(
+        page_meta(limit, has_more, option_row_key(rows[-1]) if rows else None),
+        count=len(rows),
+    )
+    return json_response('{"data":[' + ",".join(encoded) + '],"meta":' + dumps(meta) + "}")
 
 
 # ============================================================
@@ -175,10 +112,12 @@ def institutions_diagnostics_options():
 @institutions_diagnostics_bp.route(
     "/api/institutions/diagnostics/narrative", methods=["GET"]
 )
-@cache.cached(timeout=300, query_string=True)
+@cache.cached(timeout=300, make_cache_key=normalized_cache_key)
+@admit("diagnostics")
 def institutions_diagnostics_narrative():
     """
     Qualitative diagnostics endpoint backed by mv_institutions_diagnostics
+    (answered from the in-memory cube, see institutions_cube.py)
 
     Query params (all optional):
     - ward
@@ -187,59 +126,27 @@ def institutions_diagnostics_narrative():
     - metric
     """
 
-    ward = request.args.get("ward")
     category = request.args.get("institution_category")
     subcategory = request.args.get("institution_subcategory")
     metric = request.args.get("metric")
 
     # Normalize filters
-    ward = None if not ward or ward.upper() == "ALL" else ward.lower()
+    ward = ward_arg("summary")
     category = None if not category or category.upper() == "ALL" else category
     subcategory = None if not subcategory or subcategory.upper() == "ALL" else subcategory
     metric = None if not metric or metric.upper() == "ALL" else metric
 
-    sql = """
-        SELECT
-            metric,
-            category AS insight,
-            SUM(value)::int AS count
-        FROM mv_institutions_diagnostics
-        WHERE (%s IS NULL OR ward = %s)
-          AND (%s IS NULL OR institution_category = %s)
-          AND (%s IS NULL OR institution_subcategory = %s)
-          AND (%s IS NULL OR metric = %s)
-        GROUP BY metric, category
-        ORDER BY metric, count DESC
-    """
-
-    conn = get_conn()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
-
-    cur.execute(
-        sql,
-        (
-            ward, ward,
-            category, category,
-            subcategory, subcategory,
-            metric, metric
-        )
-    )
-
-    rows = cur.fetchall()
-    cur.close()
-    conn.close()
+    counts = get_cube().narrative_counts(ward, category, subcategory, metric)
 
     # Group results by metric for frontend consumption
     narrative = {}
-    for row in rows:
-        m = row["metric"]
-        if m not in narrative:
-            narrative[m] = []
-        narrative[m].append(
+    for m, insights in counts.items():
+        narrative[m] = [
             {
-                "insight": row["insight"],
-                "count": row["count"]
+                "insight": insight,
+                "count": count
             }
-        )
+            for insight, count in insights
+        ]
 
     return jsonify(narrative)
\ No newline at end of file
@@ -0,0 +1,112 @@
+import math
+import json
+from json.encoder import encode_basestring_ascii
+from flask import current_app
+from flask.json.provider import DefaultJSONProvider
+from tracing import span
+
+# ============================================================
+# DIRECT JSON ENCODING FOR LARGE RESPONSES
+# ============================================================
+# jsonify() of a map layer builds a row dict, a Feature dict, a geometry
+# dict, a coordinate list and a properties dict per point before the
+# encoder walks them all again. For the layer and option endpoints,
+# rows are instead read as tuples by column index and written straight
+# into the response text: each GeoJSON feature is one %-template filled
+# with pre-encoded values, and the institutions cube keeps its option
+# rows as namedtuples with their JSON encoded once per build.
+#
+# The output is byte for byte what jsonify() produces in production
+# (Flask's DefaultJSONProvider: sorted keys, ASCII, compact separators,
+# Decimal as a string, trailing newline).
+
+
+def dumps(obj) -> str:
+    """json.dumps with the settings of a compact jsonify()."""
+    return json.dumps(
+        obj, default=DefaultJSONProvider.default, ensure_ascii=True,
+        sort_keys=True, separators=(",", ":"),
+    )
+
+
+def _float(v):
+    if math.isfinite(v):
+        return float.__repr__(v)
+    return "NaN" if v != v else ("Infinity" if v > 0 else "-Infinity")
+
+
+_ENCODERS = {
+    str: encode_basestring_ascii,
+    int: int.__repr__,
+    float: _float,
+    bool: lambda v: "true" if v else "false",
+    type(None): lambda v: "null",
+}
+
+
+def encode_value(v) -> str:
+    """JSON for one scalar; anything unusual goes through dumps()."""
+    encoder = _ENCODERS.get(type(v))
+    return encoder(v) if encoder is not None else dumps(v)
+
+
+def json_response(body: str):
+    """Response for already encoded JSON (body without the newline)."""
+    return current_app.response_class(body + "\n", mimetype=current_app.json.mimetype)
+
+
+class FeatureEncoder:
+    """
+    GeoJSON Point features from tuple rows whose columns are `columns`
+    (as produced by maps.select_list: the property columns, then lat, lon).
+    """
+
+    __slots__ = ("template", "indexes", "lat", "lon")
+
+    def __init__(self, properties: dict, fields: list[str], columns: list[str]):
+        position = {c: i for i, c in enumerate(columns)}
+        names = sorted(fields)
+        self.indexes = [position[properties[f]] for f in names]
+        self.lat = position["lat"]
+        self.lon = position["lon"]
+        props = ",".join(f"{encode_basestring_ascii(f)}:%s" for f in names)
+        self.template = (
+            '{"geometry":{"coordinates":[%s,%s],"type":"Point"},'
+            '"properties":{' + props + '},"type":"Feature"}'
+        )
+
+    def encode(self, row):
+        """Feature JSON, or None for a row without coordinates."""
+        lat, lon = row[self.lat], row[self.lon]
+        if lat is None or lon is None:
+            return None
+        return self.template % (
+            (encode_value(lon), encode_value(lat))
+            + tuple([encode_value(row[i]) for i in self.indexes])
+        )
+
+    def encode_rows(self, rows) -> list[str]:
+        """
+        Features for `rows`, skipping those without coordinates. Passing
+        the cursor itself converts rows one at a time instead of holding
+        a list of the whole result next to its features.
+        """
+        return [f for f in map(self.encode, rows) if f is not None]
+
+
+def feature_collection(features: list[str], meta: dict):
+    """
+    FeatureCollection response from encoded features. The head and tail
+    are folded into the first and last feature (the list is modified) so
+    the body is built by a single join.
+    """
+    head = '{"features":['
+    tail = '],"meta":' + dumps(meta) + ',"type":"FeatureCollection"}\n'
+    with span("encode", features=len(features)):
+        if not features:
+            body = head + tail
+        else:
+            features[0] = head + features[0]
+            features[-1] += tail
+            body = ",".join(features)
+        return current_app.response_class(body, mimetype=current_app.json.mimetype)
@@ -1,6 +1,8 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify
 from db import get_conn
 from extensions import cache
+from admission import admit
+from wards import normalized_cache_key, ward_arg
 from psycopg2.extras import RealDictCursor
 
 learning_institutions_bp = Blueprint(
@@ -15,10 +17,10 @@ learning_institutions_bp = Blueprint(
     "/api/learning-institutions/summary",
     methods=["GET"]
 )
-@cache.cached(timeout=300, query_string=True)
+@cache.cached(timeout=300, make_cache_key=normalized_cache_key)
+@admit("summaries")
 def learning_institutions_summary():
-    ward = request.args.get("ward")
-    ward = None if not ward or ward.upper() == "ALL" else ward.lower()
+    ward = ward_arg("summary")
 
     conn = get_conn()
     cur = conn.cursor(cursor_factory=RealDictCursor)
@@ -71,10 +73,10 @@ def learning_institutions_summary():
     "/api/learning-institutions/charts",
     methods=["GET"]
 )
-@cache.cached(timeout=300, query_string=True)
+@cache.cached(timeout=300, make_cache_key=normalized_cache_key)
+@admit("summaries")
 def learning_institutions_charts():
-    ward = request.args.get("ward")
-    ward = None if not ward or ward.upper() == "ALL" else ward.lower()
+    ward = ward_arg("summary")
 
     sql = """
         SELECT
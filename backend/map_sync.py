@@ -0,0 +1,311 @@
+import logging
+import threading
+from collections import deque
+import psycopg2
+from psycopg2 import sql
+import db
+from db import get_conn
+from config import MAP_SYNC_CONFIG
+from data_version import on_refresh
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# ROW-HASH HISTORY FOR MAP LAYER DELTA SYNC
+# ============================================================
+# For each map layer we keep {id: row hash} for the current contents of
+# its MV and a bounded history of what changed at each refresh. A layer
+# version is a digest of all row hashes, so the same data always gives
+# the same token. A client holding an older token gets only the features
+# added, changed or removed since; one holding an unknown token gets the
+# full layer.
+#
+# With Postgres the history is recorded once per refresh, on the primary,
+# by refresh.py (record_versions) into the map_sync_* tables below, and
+# every worker reads deltas from there: it survives worker restarts, is
+# the same in every worker, and the MVs are hashed once per refresh
+# instead of once per worker. Where those tables are not available (the
+# DuckDB backend, or a database refresh.py has not recorded yet) each
+# worker keeps its own history instead (LayerHistory); both compute the
+# same version tokens.
+
+LAYERS = {
+    "households": ("mv_map_households", "plot_id"),
+    "institutions": ("mv_map_institutions", "institution_id"),
+}
+
+_MASK = (1 << 64) - 1
+
+# 64-bit hash of a whole MV row (alias t).
+ROW_HASH_SQL = "('x' || substr(md5(t::text), 1, 16))::bit(64)::bigint"
+
+SCHEMA_SQL = """
+    CREATE TABLE IF NOT EXISTS public.map_sync_rows (
+        layer text NOT NULL,
+        id text NOT NULL,
+        row_hash bigint NOT NULL,
+        PRIMARY KEY (layer, id)
+    );
+    CREATE TABLE IF NOT EXISTS public.map_sync_versions (
+        layer text NOT NULL,
+        seq bigint NOT NULL,
+        from_version text,
+        to_version text NOT NULL,
+        recorded_at timestamptz NOT NULL DEFAULT now(),
+        PRIMARY KEY (layer, seq)
+    );
+    CREATE TABLE IF NOT EXISTS public.map_sync_changes (
+        layer text NOT NULL,
+        seq bigint NOT NULL,
+        id text NOT NULL,
+        kind text NOT NULL,
+        PRIMARY KEY (layer, seq, id)
+    );
+"""
+
+
+class LayerHistory:
+    def __init__(self, view, id_column):
+        self.view = view
+        self.id_column = id_column
+        self.hashes = {}
+        self.version = None
+        # (from_version, to_version, {id: "added" | "changed" | "removed"})
+        # per refresh, oldest first.
+        self.history = deque(maxlen=MAP_SYNC_CONFIG["max_versions"])
+        self.lock = threading.Lock()
+
+    def scan(self):
+        """{id: 64-bit hash of the whole row} straight from the database."""
+        if db.BACKEND == "duckdb":
+            # DuckDB's own row hash: versions differ from Postgres ones,
+            # but are equally stable across workers on one snapshot.
+            query = f'SELECT "{self.id_column}", hash(t) FROM public."{self.view}" t'
+        else:
+            query = sql.SQL("SELECT {id}, " + ROW_HASH_SQL + " FROM public.{view} t").format(
+                id=sql.Identifier(self.id_column), view=sql.Identifier(self.view)
+            )
+        conn = get_conn(cursor_factory=None)
+        try:
+            with conn.cursor() as cur:
+                cur.execute(query)
+                return dict(cur.fetchall())
+        finally:
+            conn.close()
+
+    @staticmethod
+    def digest(hashes):
+        total = len(hashes)
+        for h in hashes.values():
+            total = (total + h) & _MASK
+        return f"{total:016x}"
+
+    def update(self):
+        hashes = self.scan()
+        version = self.digest(hashes)
+        with self.lock:
+            if version == self.version:
+                return
+            if self.version is not None:
+                old = self.hashes
+                changes = {}
+                for key, h in hashes.items():
+                    previous = old.get(key)
+                    if previous is None:
+                        changes[key] = "added"
+                    elif previous != h:
+                        changes[key] = "changed"
+                for key in old.keys() - hashes.keys():
+                    changes[key] = "removed"
+                self.history.append((self.version, version, changes))
+            self.hashes = hashes
+            self.version = version
+        logger.info(f"{self.view}: version {version}, {len(hashes)} rows")
+
+    def changes_since(self, since):
+        """
+        (upserted_ids, removed_ids) between `since` and the current
+        version, or None if `since` is not in this process's history.
+        """
+        with self.lock:
+            if since == self.version:
+                return set(), set()
+            entries = list(self.history)
+
+        start = next((i for i, e in enumerate(entries) if e[0] == since), None)
+        if start is None:
+            return None
+
+        # First event per id tells whether it existed at `since`.
+        existed_before = {}
+        for _, _, changes in entries[start:]:
+            for key, kind in changes.items():
+                existed_before.setdefault(key, kind != "added")
+
+        current = self.hashes
+        upserted = {k for k in existed_before if k in current}
+        removed = {k for k, existed in existed_before.items() if existed and k not in current}
+        return upserted, removed
+
+
+_HISTORIES = {name: LayerHistory(*spec) for name, spec in LAYERS.items()}
+
+
+def get_history(layer):
+    """In-process history for a layer, scanned on first use."""
+    history = _HISTORIES[layer]
+    if history.version is None:
+        history.update()
+    return history
+
+
+# ============================================================
+# RECORDED HISTORY (POSTGRES)
+# ============================================================
+
+def record_versions(conn, views):
+    """
+    Record a new version (and what changed) of each map layer whose MV is
+    in `views`. Runs on the primary right after the refresh, before
+    workers are notified; one transaction per layer on `conn`, which must
+    not be in autocommit mode.
+    """
+    with conn.cursor() as cur:
+        cur.execute(SCHEMA_SQL)
+    conn.commit()
+    for layer, (view, id_column) in LAYERS.items():
+        if view in views:
+            _record_layer(conn, layer, view, id_column)
+
+
+def _record_layer(conn, layer, view, id_column):
+    keep = MAP_SYNC_CONFIG["max_versions"]
+    try:
+        with conn.cursor() as cur:
+            # One recorder per layer at a time
+            cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s))", (f"map_sync:{layer}",))
+            cur.execute(sql.SQL(
+                "CREATE TEMP TABLE map_sync_scan ON COMMIT DROP AS "
+                "SELECT {id}::text AS id, " + ROW_HASH_SQL + " AS row_hash FROM public.{view} t"
+            ).format(id=sql.Identifier(id_column), view=sql.Identifier(view)))
+            cur.execute("SELECT count(*), coalesce(sum(row_hash::numeric), 0) FROM map_sync_scan")
+            count, total = cur.fetchone()
+            # Same token as LayerHistory.digest() over the same hashes
+            version = f"{(count + int(total)) & _MASK:016x}"
+
+            cur.execute("""
+                SELECT seq, to_version FROM public.map_sync_versions
+                WHERE layer = %s ORDER BY seq DESC LIMIT 1
+            """, (layer,))
+            last = cur.fetchone()
+            if last and last[1] == version:
+                conn.commit()
+                return
+            seq = last[0] + 1 if last else 1
+            params = {"layer": layer, "seq": seq}
+            if last:
+                cur.execute("""
+                    INSERT INTO public.map_sync_changes (layer, seq, id, kind)
+                    SELECT %(layer)s, %(seq)s, n.id,
+                           CASE WHEN o.id IS NULL THEN 'added' ELSE 'changed' END
+                    FROM map_sync_scan n
+                    LEFT JOIN public.map_sync_rows o ON o.layer = %(layer)s AND o.id = n.id
+                    WHERE o.row_hash IS DISTINCT FROM n.row_hash
+                    UNION ALL
+                    SELECT %(layer)s, %(seq)s, o.id, 'removed'
+                    FROM public.map_sync_rows o
+                    WHERE o.layer = %(layer)s
+                      AND NOT EXISTS (SELECT 1 FROM map_sync_scan n WHERE n.id = o.id)
+                """, params)
+            cur.execute("""
+                INSERT INTO public.map_sync_versions (layer, seq, from_version, to_version)
+                VALUES (%s, %s, %s, %s)
+            """, (layer, seq, last[1] if last else None, version))
+            cur.execute("DELETE FROM public.map_sync_rows WHERE layer = %s", (layer,))
+            cur.execute("""
+                INSERT INTO public.map_sync_rows (layer, id, row_hash)
+                SELECT %s, id, row_hash FROM map_sync_scan
+            """, (layer,))
+            cur.execute("DELETE FROM public.map_sync_changes WHERE layer = %s AND seq <= %s",
+                        (layer, seq - keep))
+            cur.execute("DELETE FROM public.map_sync_versions WHERE layer = %s AND seq <= %s",
+                        (layer, seq - keep))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    logger.info(f"{view}: recorded version {version} ({count} rows)")
+
+
+def recorded_state(layer, since=None):
+    """
+    (current version, delta) from the recorded history, delta as in
+    sync_state(); None if nothing has been recorded for the layer.
+    """
+    conn = get_conn(cursor_factory=None)
+    try:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT seq, from_version, to_version FROM public.map_sync_versions
+                WHERE layer = %s ORDER BY seq
+            """, (layer,))
+            versions = cur.fetchall()
+            if not versions:
+                return None
+            current = versions[-1][2]
+            if not since:
+                return current, None
+            if since == current:
+                return current, (set(), set())
+            start = next((seq for seq, from_version, _ in versions if from_version == since), None)
+            if start is None:
+                return current, None
+            cur.execute("""
+                SELECT id, kind FROM public.map_sync_changes
+                WHERE layer = %s AND seq >= %s ORDER BY seq
+            """, (layer, start))
+            # First event per id tells whether it existed at `since`, the
+            # last one whether it exists now.
+            existed_before, exists_now = {}, {}
+            for key, kind in cur.fetchall():
+                existed_before.setdefault(key, kind != "added")
+                exists_now[key] = kind != "removed"
+    finally:
+        conn.close()
+    upserted = {k for k, exists in exists_now.items() if exists}
+    removed = {k for k, exists in exists_now.items() if not exists and existed_before[k]}
+    return current, (upserted, removed)
+
+
+def sync_state(layer, since=None):
+    """
+    (current version, delta) for a map endpoint; delta is
+    (upserted_ids, removed_ids) or None when a full layer must be sent.
+    Hashing problems never fail the request, they just disable deltas.
+    """
+    if db.BACKEND == "postgres":
+        try:
+            state = recorded_state(layer, since)
+            if state is not None:
+                return state
+        except psycopg2.Error as e:
+            logger.debug(f"No recorded map history for {layer}: {e}")
+    try:
+        history = get_history(layer)
+    except Exception as e:
+        logger.warning(f"Delta sync unavailable for {layer}: {e}")
+        return None, None
+    delta = history.changes_since(since) if since else None
+    return history.version, delta
+
+
+def _on_map_refresh(views, version):
+    # Only in-process histories in use (already scanned) need updating.
+    for history in _HISTORIES.values():
+        if history.view in views and history.version is not None:
+            threading.Thread(
+                target=history.update, name=f"sync-{history.view}", daemon=True
+            ).start()
+
+
+on_refresh(_on_map_refresh, views=[view for view, _ in LAYERS.values()])
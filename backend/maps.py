@@ -1,80 +1,140 @@
 # maps.py - ADD THESE IMPORTS AT THE TOP
 import os
 import json
-from flask import Blueprint, jsonify, request, current_app
-import psycopg2
+from flask import Blueprint, jsonify, request, current_app, abort, make_response, send_file, url_for
 from psycopg2.extras import RealDictCursor
-from config import DB_CONFIG
+from db import get_conn
 from extensions import cache
+from admission import admit
+from wards import boundary_name, get_registry, normalized_cache_key, ward_arg, ward_id
+from pagination import page_args, page_meta
+from map_sync import sync_state
+from area_index import get_grid
+from geo import geometry_edges, validate_polygons
+from hexbins import get_points
+from accessibility import get_index as get_accessibility_index
+from photos import PhotoNotFound, photo_version, thumbnail_path
+from choropleth import METHODS as CLASSIFY_METHODS, ward_classes as choropleth_classes
+from data_version import current_version
+from tracing import span
+from json_encoding import FeatureEncoder, feature_collection
+from config import AREA_STATS_CONFIG, HEXBIN_CONFIG, ACCESSIBILITY_CONFIG, PHOTO_CONFIG
 
 # Blueprint
 maps_bp = Blueprint("maps", __name__, url_prefix="/api/maps")
 
-# Database helper
+# Database helper (plain tuple cursors unless a cursor_factory is passed)
 def get_db_conn():
-    return psycopg2.connect(**DB_CONFIG)
+    return get_conn(cursor_factory=None)
 
 # Utility helpers
 def normalize_ward(ward: str | None) -> str | None:
-    if not ward:
-        return None
-    ward = ward.strip().upper()
-    if ward == "ALL":
-        return None
-    return ward
+    """?ward= as spelled in mv_map_households (None = all wards)."""
+    return get_registry().stored_name(ward, "households")
+
+# Feature property -> mv_* column. Order is the output order.
+HOUSEHOLD_PROPERTIES = {
+    "plot_id": "plot_id",
+    "ward": "ward",
+    "settlement": "settlement",
+    "sub_county": "sub_county",
+    "sanitation_class": "sanitation_class",
+    "sanitation_type": "sanitation_type",
+    "is_shared": "is_shared",
+    "households_sharing": "households_sharing",
+    "has_handwashing": "has_handwashing",
+    "solid_waste_mgmt": "solid_waste_mgmt",
+    "total_persons": "total_persons",
+    "children_under_5": "children_under_5",
+    "financed_by": "financed_by",
+    "photo": "photo",
+}
+
+INSTITUTION_PROPERTIES = {
+    "institution_id": "institution_id",
+    "name": "institution_name",
+    "category": "institution_category",
+    "ward": "ward",
+    "location": "location",
+    "has_sanitation": "has_sanitation",
+    "handwashing_status": "handwashing_status",
+    "estimated_users": "estimated_users",
+    "photo": "institution_photo",
+}
+
+def parse_fields(properties: dict, id_property: str) -> list[str]:
+    """
+    Properties requested with ?fields=a,b (all of them when absent). The
+    id property is always included so clients can fetch the details.
+    """
+    raw = request.args.get("fields")
+    if not raw:
+        return list(properties)
+    fields = [f.strip() for f in raw.split(",") if f.strip()]
+    unknown = [f for f in fields if f not in properties]
+    if unknown:
+        abort(make_response(jsonify({
+            "error": f"Unknown fields: {', '.join(unknown)}",
+            "allowed": list(properties),
+        }), 400))
+    return [p for p in properties if p == id_property or p in fields]
+
+def select_columns(properties: dict, fields: list[str]) -> list[str]:
+    """Columns read for the requested properties plus coordinates."""
+    return list(dict.fromkeys([properties[f] for f in fields] + ["lat", "lon"]))
+
+def select_list(properties: dict, fields: list[str]) -> str:
+    """SQL select list for the requested properties plus coordinates."""
+    return ",\n            ".join(select_columns(properties, fields))
 
-def row_to_feature(row: dict) -> dict:
+def row_to_feature(row: dict, fields=None, properties=HOUSEHOLD_PROPERTIES) -> dict:
+    fields = fields or properties
     return {
         "type": "Feature",
         "geometry": {
             "type": "Point",
             "coordinates": [row["lon"], row["lat"]],
         },
-        "properties": {
-            "plot_id": row["plot_id"],
-            "ward": row["ward"],
-            "settlement": row["settlement"],
-            "sub_county": row["sub_county"],
-            "sanitation_class": row["sanitation_class"],
-            "sanitation_type": row["sanitation_type"],
-            "is_shared": row["is_shared"],
-            "households_sharing": row["households_sharing"],
-            "has_handwashing": row["has_handwashing"],
-            "solid_waste_mgmt": row["solid_waste_mgmt"],
-            "total_persons": row["total_persons"],
-            "children_under_5": row["children_under_5"],
-            "financed_by": row["financed_by"],
-            "photo": row["photo"],
-        },
+        "properties": {f: row[properties[f]] for f in fields},
     }
 
 # ============================================================
 # WARD BOUNDARIES FROM GEOJSON FILE
 # ============================================================
 
-def get_geojson_file_path():
-    """Get the path to the GeoJSON file."""
-    # Try different possible locations
-    possible_paths = [
+def candidate_geojson_paths():
+    """Locations probed for the ward boundary GeoJSON file, in order."""
+    return [
         os.path.join(os.path.dirname(__file__), 'data', 'geojson', 'naivasha_wards.geojson'),
         os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'geojson', 'naivasha_wards.geojson'),
         os.path.join(current_app.root_path, 'data', 'geojson', 'naivasha_wards.geojson'),
         'data/geojson/naivasha_wards.geojson',
         'naivasha_wards.geojson'
     ]
-    
-    for path in possible_paths:
-        if os.path.exists(path):
-            return path
-    
-    return None
+
+# Resolved once per process; "" means probed and not found.
+GEOJSON_FILE_PATH = None
+
+def get_geojson_file_path():
+    """
+    Get the path to the GeoJSON file. WARD_BOUNDARIES_PATH in the app
+    config wins; otherwise the candidate locations are probed once.
+    """
+    global GEOJSON_FILE_PATH
+    if GEOJSON_FILE_PATH is None:
+        configured = current_app.config.get("WARD_BOUNDARIES_PATH")
+        candidates = [configured] if configured else candidate_geojson_paths()
+        GEOJSON_FILE_PATH = next(
+            (path for path in candidates if os.path.exists(path)), ""
+        )
+    return GEOJSON_FILE_PATH or None
 
 def load_ward_boundaries():
     """Load ward boundaries from GeoJSON file."""
     file_path = get_geojson_file_path()
     
     if not file_path:
-        current_app.logger.warning(f"GeoJSON file not found. Tried: {get_geojson_file_path()}")
+        current_app.logger.warning(f"GeoJSON file not found. Tried: {candidate_geojson_paths()}")
         return {"type": "FeatureCollection", "features": []}
     
     try:
@@ -106,15 +166,39 @@ def get_cached_ward_boundaries():
         WARD_BOUNDARIES_CACHE = load_ward_boundaries()
     return WARD_BOUNDARIES_CACHE
 
+WARD_STATS_VIEW = "mv_household_sanitation_ward_summary"
+
+def ward_boundaries_cache_key(*args, **kwargs):
+    """Normalized key plus the stats data version, so a refresh is picked up."""
+    return f"{normalized_cache_key()}/{current_version([WARD_STATS_VIEW])}"
+
 @maps_bp.route("/ward-boundaries", methods=["GET"])
-@cache.cached(timeout=3600, query_string=True)  # Cache for 1 hour
+@cache.cached(timeout=3600, make_cache_key=ward_boundaries_cache_key)  # Cache for 1 hour
+@admit("maps")
 def ward_boundaries():
     """
     Returns ward boundaries as GeoJSON polygons from file.
     Optionally includes statistics for coloring.
+
+    With include_stats=true, ?classify=quantile|equal_interval|jenks adds
+    class breaks for ?metric= (default sanitation_pct) in ?classes= (default
+    5) classes to meta.classification and a class_index to each ward.
+    Breaks are computed over all wards, so a single-ward request gets the
+    same colour as on the full map.
     """
     ward = request.args.get("ward")
     include_stats = request.args.get("include_stats", "false").lower() == "true"
+    method = request.args.get("classify")
+    metric = request.args.get("metric", "sanitation_pct")
+    classes = request.args.get("classes", 5, type=int)
+    if method:
+        if method not in CLASSIFY_METHODS:
+            return jsonify({"error": f"classify must be one of {list(CLASSIFY_METHODS)}"}), 400
+        if metric not in WARD_STAT_METRICS:
+            return jsonify({"error": f"metric must be one of {list(WARD_STAT_METRICS)}"}), 400
+        if not 2 <= classes <= 9:
+            return jsonify({"error": "classes must be between 2 and 9"}), 400
+        include_stats = True
     
     # Get all ward boundaries
     data = get_cached_ward_boundaries()
@@ -122,45 +206,49 @@ def ward_boundaries():
     
     # If we need statistics, fetch them from the database
     ward_stats = {}
+    version = current_version([WARD_STATS_VIEW])
     if include_stats:
         try:
-            ward_stats = fetch_ward_statistics()
+            ward_stats = get_ward_statistics(version)
         except Exception as e:
             current_app.logger.warning(f"Could not fetch ward statistics: {e}")
+
+    classification = None
+    if method and ward_stats:
+        breaks, ward_classes = choropleth_classes(version, ward_stats, metric, method, classes)
+        classification = {
+            "method": method,
+            "metric": metric,
+            "classes": len(breaks) - 1 if breaks else 0,
+            "breaks": breaks,
+            "version": version,
+        }
+        ward_stats = {
+            w: {**stats, "class_index": ward_classes.get(w)}
+            for w, stats in ward_stats.items()
+        }
     
-    # Filter by ward if specified
-    if ward and ward.upper() != "ALL":
-        filtered_features = []
-        for feature in features:
-            props = feature.get("properties", {})
-            shape_name = props.get("shapeName", "")
-            ward_name = props.get("ward", "")
-            name = props.get("name", "")
-            
-            # Check if any of these match the requested ward
-            feature_ward = shape_name or ward_name or name
-            if feature_ward.lower() == ward.lower():
-                # Add statistics if available
-                if include_stats and ward_stats:
-                    stats = ward_stats.get(feature_ward.upper(), {})
-                    props.update(stats)
-                filtered_features.append(feature)
-        
-        features = filtered_features
-    else:
-        # Add statistics to all features if requested
-        if include_stats and ward_stats:
-            for feature in features:
-                props = feature.get("properties", {})
-                shape_name = props.get("shapeName", "")
-                ward_name = props.get("ward", "")
-                name = props.get("name", "")
-                feature_ward = shape_name or ward_name or name
-                
-                if feature_ward:
-                    stats = ward_stats.get(feature_ward.upper(), {})
-                    props.update(stats)
-    
+    # Filter by ward if specified (any spelling of the ward matches)
+    requested = ward_id(ward)
+    if requested:
+        features = [
+            f for f in features
+            if ward_id(boundary_name(f.get("properties", {}))) == requested
+        ]
+
+    # Add statistics if requested (to copies: the features are shared)
+    if include_stats and ward_stats:
+        features = [
+            {
+                **feature,
+                "properties": {
+                    **feature.get("properties", {}),
+                    **ward_stats.get(ward_id(boundary_name(feature.get("properties", {}))), {}),
+                },
+            }
+            for feature in features
+        ]
+
     return jsonify({
         "type": "FeatureCollection",
         "features": features,
@@ -168,17 +256,37 @@ def ward_boundaries():
             "count": len(features),
             "ward": ward or "ALL",
             "source": "geojson_file",
-            "include_stats": include_stats
+            "include_stats": include_stats,
+            "classification": classification,
         }
     })
 
+# Metrics returned by fetch_ward_statistics (choropleth-able).
+WARD_STAT_METRICS = (
+    "total_households", "sanitation_pct", "water_pct", "safety_pct", "no_sanitation_pct",
+)
+
+# (data version, stats) of the last successful fetch.
+WARD_STATS_CACHE = None
+
+def get_ward_statistics(version):
+    """fetch_ward_statistics(), fetched once per data version."""
+    global WARD_STATS_CACHE
+    if WARD_STATS_CACHE is not None and WARD_STATS_CACHE[0] == version:
+        return WARD_STATS_CACHE[1]
+    stats = fetch_ward_statistics()
+    if stats:
+        WARD_STATS_CACHE = (version, stats)
+    return stats
+
 def fetch_ward_statistics():
     """
-    Fetch statistics for each ward from the database for coloring.
+    Fetch statistics for each ward from the database for coloring,
+    keyed by canonical ward ID.
     """
     sql = """
         SELECT 
-            UPPER(ward) as ward,
+            ward,
             COALESCE(total_households, 0) as total_households,
             COALESCE(households_with_sanitation_pct, 0) as sanitation_pct,
             COALESCE(water_access_pct, 0) as water_pct,
@@ -197,7 +305,7 @@ def fetch_ward_statistics():
                 rows = cur.fetchall()
                 
                 for row in rows:
-                    ward_stats[row["ward"]] = {
+                    ward_stats[ward_id(row["ward"])] = {
                         "total_households": row["total_households"],
                         "sanitation_pct": row["sanitation_pct"],
                         "water_pct": row["water_pct"],
@@ -238,56 +346,67 @@ def ward_boundaries_debug():
 # ============================================================
 
 @maps_bp.route("/households", methods=["GET"])
-@cache.cached(timeout=300, query_string=True)
+@cache.cached(timeout=300, make_cache_key=normalized_cache_key)
+@admit("maps")
 def map_households():
+    """
+    Household plots as GeoJSON points.
+
+    meta.version identifies the layer contents. With ?since=<version> only
+    plots added or changed since then are returned as features, plus the
+    removed plot_ids in meta.removed; if that version is unknown the full
+    layer is returned with meta.delta = false.
+
+    ?fields=sanitation_class,... limits the properties (plot_id is always
+    sent); the rest can be loaded per plot from /households/<plot_id>.
+    """
     ward = normalize_ward(request.args.get("ward"))
-    sql = """
+    since = request.args.get("since")
+    fields = parse_fields(HOUSEHOLD_PROPERTIES, "plot_id")
+    version, delta = sync_state("households", since)
+    sql = f"""
         select
-            plot_id,
-            ward,
-            settlement,
-            sub_county,
-            lat,
-            lon,
-            sanitation_class,
-            sanitation_type,
-            is_shared,
-            households_sharing,
-            has_handwashing,
-            solid_waste_mgmt,
-            total_persons,
-            children_under_5,
-            financed_by,
-            photo
+            {select_list(HOUSEHOLD_PROPERTIES, fields)}
         from public.mv_map_households
+        where 1=1
     """
     params = []
     if ward:
-        sql += " where ward = %s"
+        sql += " and ward = %s"
         params.append(ward)
-    features: list[dict] = []
-    with get_db_conn() as conn:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute(sql, params)
-            rows = cur.fetchall()
-            for row in rows:
-                if row["lat"] is None or row["lon"] is None:
-                    continue
-                features.append(row_to_feature(row))
-    return jsonify(
-        {
-            "type": "FeatureCollection",
-            "features": features,
-            "meta": {
-                "category": "households",
-                "ward": ward or "ALL",
-                "count": len(features),
-            },
-        }
+    if delta is not None:
+        sql += " and plot_id = any(%s)"
+        params.append(list(delta[0]))
+    # Tuple rows are encoded straight to GeoJSON text (json_encoding.py)
+    encoder = FeatureEncoder(
+        HOUSEHOLD_PROPERTIES, fields, select_columns(HOUSEHOLD_PROPERTIES, fields)
     )
+    features: list[str] = []
+    if delta is None or delta[0]:
+        with get_db_conn() as conn:
+            with conn.cursor() as cur:
+                # The whole layer is over the memo's max_rows anyway; stream
+                # it into the encoder instead of fetching every row first.
+                cur.memoize = ward is not None or delta is not None
+                cur.execute(sql, params)
+                with span("reshape.features"):
+                    features = encoder.encode_rows(cur)
+    meta = {
+        "category": "households",
+        "ward": ward or "ALL",
+        "count": len(features),
+        "version": version,
+        "fields": fields,
+    }
+    if since:
+        meta["since"] = since
+        meta["delta"] = delta is not None
+        meta["removed"] = sorted(delta[1]) if delta is not None else []
+    return feature_collection(features, meta)
 
 @maps_bp.route("/wards", methods=["GET"])
 @cache.cached(timeout=3600)
+@admit("maps")
 def map_wards():
     sql = """
         select distinct ward
@@ -303,69 +422,325 @@ def map_wards():
     return jsonify(wards)
 
 @maps_bp.route("/institutions", methods=["GET"])
-@cache.cached(timeout=300, query_string=True)
+@cache.cached(timeout=300, make_cache_key=normalized_cache_key)
+@admit("maps")
 def map_institutions():
-    ward = request.args.get("ward")
+    """
+    Institutions as GeoJSON points.
+
+    Optional ?limit=&cursor= pages through them by institution_id; the
+    next page's cursor is returned as meta.next_cursor. ?since=<version>
+    returns only changes and ?fields= limits the properties, as for
+    /households.
+    """
+    ward = ward_arg("institutions")
     category = request.args.get("category")
-    sql = """
+    since = request.args.get("since")
+    limit, after = page_args()
+    fields = parse_fields(INSTITUTION_PROPERTIES, "institution_id")
+    version, delta = sync_state("institutions", since)
+    sql = f"""
         select
-            institution_id,
-            institution_name,
-            institution_category,
-            ward,
-            location,
-            lat,
-            lon,
-            has_sanitation,
-            handwashing_status,
-            estimated_users,
-            institution_photo
+            {select_list(INSTITUTION_PROPERTIES, fields)}
         from public.mv_map_institutions
         where 1=1
     """
     params = []
-    if ward and ward.upper() != "ALL":
+    if ward:
         sql += " and ward = %s"
-        params.append(ward.lower())
+        params.append(ward)
     if category:
         sql += " and institution_category = %s"
         params.append(category)
-    features = []
+    if delta is not None:
+        sql += " and institution_id = any(%s)"
+        params.append(list(delta[0]))
+    if limit is not None:
+        if after:
+            sql += " and institution_id > %s"
+            params.append(after[0])
+        # One extra row tells us whether there is a next page
+        sql += " order by institution_id limit %s"
+        params.append(limit + 1)
+    columns = select_columns(INSTITUTION_PROPERTIES, fields)
+    encoder = FeatureEncoder(INSTITUTION_PROPERTIES, fields, columns)
+    features: list[str] = []
+    has_more = False
+    last_id = None
     with get_db_conn() as conn:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute(sql, params)
-            rows = cur.fetchall()
-            for r in rows:
-                if r["lat"] is None or r["lon"] is None:
-                    continue
-                features.append({
-                    "type": "Feature",
-                    "geometry": {
-                        "type": "Point",
-                        "coordinates": [r["lon"], r["lat"]],
-                    },
-                    "properties": {
-                        "institution_id": r["institution_id"],
-                        "name": r["institution_name"],
-                        "category": r["institution_category"],
-                        "ward": r["ward"],
-                        "location": r["location"],
-                        "has_sanitation": r["has_sanitation"],
-                        "handwashing_status": r["handwashing_status"],
-                        "estimated_users": r["estimated_users"],
-                        "photo": r["institution_photo"],
-                    },
-                })
+        with conn.cursor() as cur:
+            rows = []
+            if delta is None or delta[0]:
+                cur.execute(sql, params)
+                rows = cur.fetchall()
+            if limit is not None:
+                has_more = len(rows) > limit
+                rows = rows[:limit]
+                last_id = rows[-1][columns.index("institution_id")] if rows else None
+            with span("reshape.features", rows=len(rows)):
+                features = encoder.encode_rows(rows)
+    meta = {
+        "ward": ward or "ALL",
+        "category": category or "ALL",
+        "count": len(features),
+        "version": version,
+        "fields": fields,
+    }
+    if since:
+        meta["since"] = since
+        meta["delta"] = delta is not None
+        meta["removed"] = sorted(delta[1]) if delta is not None else []
+    if limit is not None:
+        meta.update(page_meta(limit, has_more, [last_id]))
+    return feature_collection(features, meta)
+
+# ============================================================
+# HEXBIN LAYER
+# ============================================================
+
+@maps_bp.route("/hexbins", methods=["GET"])
+@cache.cached(timeout=300, make_cache_key=normalized_cache_key)
+@admit("maps")
+def map_hexbins():
+    """
+    Households aggregated into hexagons, for density / risk heatmaps.
+    ?resolution=0..max_resolution (higher is finer), optional ?ward=.
+    """
+    resolution = request.args.get("resolution", HEXBIN_CONFIG["default_resolution"], type=int)
+    if not 0 <= resolution <= HEXBIN_CONFIG["max_resolution"]:
+        return jsonify({
+            "error": f"resolution must be an integer 0-{HEXBIN_CONFIG['max_resolution']}"
+        }), 400
+    ward = normalize_ward(request.args.get("ward"))
+
+    points = get_points()
+    features = points.layer(resolution, ward)
     return jsonify({
         "type": "FeatureCollection",
         "features": features,
         "meta": {
+            "category": "hexbins",
             "ward": ward or "ALL",
-            "category": category or "ALL",
+            "resolution": resolution,
+            "radius_deg": HEXBIN_CONFIG["base_size_deg"] / 2 ** resolution,
             "count": len(features),
+            "version": points.version,
         },
     })
 
+# ============================================================
+# NEAREST SANITATION FACILITY (ACCESSIBILITY)
+# ============================================================
+
+def accessibility_category(index):
+    category = request.args.get("category")
+    if category and category not in index.categories:
+        abort(make_response(jsonify({
+            "error": f"Unknown category: {category}",
+            "allowed": index.categories,
+        }), 400))
+    return category
+
+@maps_bp.route("/accessibility", methods=["GET"])
+@cache.cached(timeout=300, make_cache_key=normalized_cache_key)
+@admit("summaries")
+def map_accessibility():
+    """
+    Distance from household plots to the nearest institution with
+    sanitation: distribution per category ("ALL" = any category), for one
+    ?ward= or overall, optionally limited to one ?category=.
+    """
+    index = get_accessibility_index()
+    ward = normalize_ward(request.args.get("ward"))
+    category = accessibility_category(index)
+    return jsonify({
+        "data": index.distribution(ward, category),
+        "meta": {
+            "ward": ward or "ALL",
+            "categories": index.categories,
+            "bands_m": ACCESSIBILITY_CONFIG["bands_m"],
+            "version": index.version,
+        },
+    })
+
+@maps_bp.route("/accessibility/plots", methods=["GET"])
+@cache.cached(timeout=300, make_cache_key=normalized_cache_key)
+@admit("maps")
+def map_accessibility_plots():
+    """Per-plot nearest-facility distances for one ?ward=, paginated by plot_id."""
+    index = get_accessibility_index()
+    ward = normalize_ward(request.args.get("ward"))
+    if not ward:
+        return jsonify({"error": "ward is required"}), 400
+    category = accessibility_category(index)
+    limit, after = page_args()
+    rows = index.ward_plots(
+        ward, category,
+        after=after[0] if after else None,
+        limit=limit + 1 if limit else None,
+    )
+    meta = {"ward": ward, "category": category or "ALL", "version": index.version}
+    if limit:
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        meta.update(page_meta(limit, has_more, (rows[-1]["plot_id"],) if rows else None))
+    meta["count"] = len(rows)
+    return jsonify({"data": rows, "meta": meta})
+
+@maps_bp.route("/accessibility/plots/<plot_id>", methods=["GET"])
+@cache.cached(timeout=300)
+@admit("summaries")
+def map_accessibility_plot(plot_id):
+    """Nearest facility with sanitation in each category for one plot."""
+    index = get_accessibility_index()
+    plot = index.plot(plot_id)
+    if plot is None:
+        return jsonify({"error": f"plot_id {plot_id} not found"}), 404
+    return jsonify({"data": plot, "meta": {"version": index.version}})
+
+# ============================================================
+# CUSTOM-AREA STATISTICS
+# ============================================================
+
+@maps_bp.route("/area-stats", methods=["POST"])
+@admit("maps")
+def area_stats():
+    """
+    Household statistics inside a drawn area. Body: a GeoJSON Polygon or
+    MultiPolygon, or a Feature wrapping one. Answered from the in-memory
+    grid in area_index.py, never by scanning mv_map_households.
+    """
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        body = {}
+    geometry = body.get("geometry") if body.get("type") == "Feature" else body
+    if not isinstance(geometry, dict) or geometry.get("type") not in ("Polygon", "MultiPolygon"):
+        return jsonify({"error": "Body must be a GeoJSON Polygon or MultiPolygon"}), 400
+    try:
+        validate_polygons(geometry)
+        vertices = len(geometry_edges(geometry))
+    except (TypeError, ValueError, IndexError, KeyError):
+        return jsonify({"error": "Invalid polygon coordinates"}), 400
+    if vertices > AREA_STATS_CONFIG["max_vertices"]:
+        return jsonify({
+            "error": f"Polygon has {vertices} vertices, "
+                     f"at most {AREA_STATS_CONFIG['max_vertices']} allowed"
+        }), 400
+
+    grid = get_grid()
+    stats, cells = grid.query(geometry)
+    return jsonify({
+        "data": stats.to_dict(),
+        "meta": {"version": grid.version, "cells": cells},
+    })
+
+# ============================================================
+# PHOTO THUMBNAILS
+# ============================================================
+
+PHOTO_KINDS = {
+    "plot": ("mv_map_households", "plot_id", "photo"),
+    "institution": ("mv_map_institutions", "institution_id", "institution_photo"),
+}
+
+def lookup_photo(kind: str, photo_id: str):
+    view, id_column, photo_column = PHOTO_KINDS[kind]
+    with get_db_conn() as conn:
+        with conn.cursor() as cur:
+            cur.execute(
+                f"select {photo_column} from public.{view} where {id_column} = %s",
+                (photo_id,),
+            )
+            row = cur.fetchone()
+    return row[0] if row else None
+
+@maps_bp.route("/photos/<photo_id>", methods=["GET"])
+@admit("maps")
+def map_photo(photo_id):
+    """
+    Resized photo of a plot (?kind=plot, default) or an institution
+    (?kind=institution), ?size= one of PHOTO_CONFIG["sizes"] (longest side
+    in pixels), served from the disk cache.
+
+    Content-Location is the URL with ?v=<version of the source photo>;
+    that URL is cached by clients for max_age as immutable, the plain one
+    is revalidated (ETag) so a replaced photo shows up.
+    """
+    kind = request.args.get("kind", "plot")
+    if kind not in PHOTO_KINDS:
+        return jsonify({"error": f"kind must be one of {list(PHOTO_KINDS)}"}), 400
+    size = request.args.get("size", PHOTO_CONFIG["default_size"], type=int)
+    if size not in PHOTO_CONFIG["sizes"]:
+        return jsonify({"error": f"size must be one of {PHOTO_CONFIG['sizes']}"}), 400
+
+    source = current_app.config.get("PHOTO_SOURCE") or PHOTO_CONFIG["source"]
+    photo = lookup_photo(kind, photo_id)
+    if not photo:
+        return jsonify({"error": "Photo not found", "details": f"{kind} {photo_id} has no photo"}), 404
+    version = photo_version(source, photo)
+    pinned = request.args.get("v") == version
+
+    # Another worker may evict the file between lookup and send: regenerate.
+    for attempt in range(2):
+        try:
+            path = thumbnail_path(kind, photo_id, size, photo, source, version)
+            response = send_file(
+                path, mimetype="image/jpeg", download_name=f"{kind}-{photo_id}-{size}.jpg",
+                conditional=True, max_age=PHOTO_CONFIG["max_age"] if pinned else 0,
+            )
+            break
+        except PhotoNotFound as e:
+            return jsonify({"error": "Photo not found", "details": str(e)}), 404
+        except FileNotFoundError:
+            if attempt:
+                raise
+    response.cache_control.public = True
+    if pinned:
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    response.headers["Content-Location"] = url_for(
+        "maps.map_photo", photo_id=photo_id, kind=kind, size=size, v=version
+    )
+    return response
+
+# ============================================================
+# SINGLE-FEATURE DETAILS (POPUPS)
+# ============================================================
+
+def feature_detail(view: str, properties: dict, id_column: str, feature_id: str):
+    sql = f"""
+        select
+            {select_list(properties, list(properties))}
+        from public.{view}
+        where {id_column} = %s
+    """
+    with get_db_conn() as conn:
+        with conn.cursor(cursor_factory=RealDictCursor) as cur:
+            cur.execute(sql, (feature_id,))
+            row = cur.fetchone()
+    if row is None:
+        return jsonify({"error": f"{id_column} {feature_id} not found"}), 404
+    return jsonify(row_to_feature(row, properties=properties))
+
+# Indexed single-row lookups: cheap, so they share the summaries class
+# rather than queueing behind whole-layer map requests.
+@maps_bp.route("/households/<plot_id>", methods=["GET"])
+@cache.cached(timeout=300)
+@admit("summaries")
+def map_household_detail(plot_id):
+    """All properties of one household plot, for map popups."""
+    return feature_detail("mv_map_households", HOUSEHOLD_PROPERTIES, "plot_id", plot_id)
+
+@maps_bp.route("/institutions/<institution_id>", methods=["GET"])
+@cache.cached(timeout=300)
+@admit("summaries")
+def map_institution_detail(institution_id):
+    """All properties of one institution, for map popups."""
+    return feature_detail(
+        "mv_map_institutions", INSTITUTION_PROPERTIES, "institution_id", institution_id
+    )
+
 @maps_bp.route("/health", methods=["GET"])
 def maps_health():
     return jsonify(
@@ -1,6 +1,8 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify
 from db import get_conn
 from extensions import cache
+from admission import admit
+from wards import normalized_cache_key, ward_arg
 from psycopg2.extras import RealDictCursor
 
 other_institutions_bp = Blueprint("other_institutions", __name__)
@@ -9,10 +11,10 @@ other_institutions_bp = Blueprint("other_institutions", __name__)
 # SUMMARY (KPI METRICS)
 # ============================================================
 @other_institutions_bp.route("/api/other-institutions/summary", methods=["GET"])
-@cache.cached(timeout=300, query_string=True)
+@cache.cached(timeout=300, make_cache_key=normalized_cache_key)
+@admit("summaries")
 def other_institutions_summary():
-    ward = request.args.get("ward")
-    ward = None if not ward or ward.upper() == "ALL" else ward.lower()
+    ward = ward_arg("summary")
 
     conn = get_conn()
     cur = conn.cursor(cursor_factory=RealDictCursor)
@@ -53,10 +55,10 @@ def other_institutions_summary():
 # CHART DATA
 # ============================================================
 @other_institutions_bp.route("/api/other-institutions/charts", methods=["GET"])
-@cache.cached(timeout=300, query_string=True)
+@cache.cached(timeout=300, make_cache_key=normalized_cache_key)
+@admit("summaries")
 def other_institutions_charts():
-    ward = request.args.get("ward")
-    ward = None if not ward or ward.upper() == "ALL" else ward.lower()
+    ward = ward_arg("summary")
 
     sql = """
         SELECT
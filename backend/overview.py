@@ -1,6 +1,8 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify
 from db import get_conn
 from extensions import cache
+from admission import admit
+from wards import normalized_cache_key, ward_arg
 from psycopg2.extras import RealDictCursor
 
 overview_bp = Blueprint("overview", __name__)
@@ -9,10 +11,10 @@ overview_bp = Blueprint("overview", __name__)
 # SUMMARY (UNCHANGED)
 # ============================================================
 @overview_bp.route("/api/overview/summary", methods=["GET"])
-@cache.cached(timeout=300, query_string=True)
+@cache.cached(timeout=300, make_cache_key=normalized_cache_key)
+@admit("summaries")
 def overview_summary():
-    ward = request.args.get("ward")
-    ward = None if not ward or ward.upper() == "ALL" else ward.lower()
+    ward = ward_arg("summary")
 
     conn = get_conn()
     cur = conn.cursor()
@@ -73,10 +75,10 @@ def group_water_source(label: str) -> str:
 # CHART DATA (SIMPLE & DIRECT)
 # ============================================================
 @overview_bp.route("/api/overview/charts", methods=["GET"])
-@cache.cached(timeout=300, query_string=True)
+@cache.cached(timeout=300, make_cache_key=normalized_cache_key)
+@admit("summaries")
 def overview_charts():
-    ward = request.args.get("ward")
-    ward = None if not ward or ward.upper() == "ALL" else ward.lower()
+    ward = ward_arg("summary")
 
     sql = """
         SELECT
@@ -149,6 +151,7 @@ def overview_charts():
 # ============================================================
 @overview_bp.route("/api/wards", methods=["GET"])
 @cache.cached(timeout=600)
+@admit("summaries")
 def wards():
     conn = get_conn()
     cur = conn.cursor(cursor_factory=RealDictCursor)
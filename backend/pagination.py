@@ -0,0 +1,58 @@
+import json
+import base64
+import binascii
+from flask import abort, jsonify, make_response, request
+from config import PAGINATION_CONFIG
+
+# ============================================================
+# KEYSET PAGINATION
+# ============================================================
+# Cursors are opaque to clients: the sort key of the last row of a page,
+# JSON-encoded and base64url'd. The next page starts strictly after it,
+# so pages stay stable and cheap however deep the client goes.
+#
+# Every key in this API is made of text columns (ward, category, ids), so
+# a cursor must decode to exactly `arity` strings or nulls; anything else
+# is a 400, never a comparison error deeper down.
+
+KEY_TYPES = (str, type(None))
+
+
+def encode_cursor(key) -> str:
+    raw = json.dumps(list(key), separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode()
+
+
+def decode_cursor(token: str, arity: int) -> tuple:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, binascii.Error):
+        abort(make_response(jsonify({"error": "Invalid cursor"}), 400))
+    if (not isinstance(key, list) or len(key) != arity
+            or not all(isinstance(k, KEY_TYPES) for k in key)):
+        abort(make_response(jsonify({"error": "Invalid cursor"}), 400))
+    return tuple(key)
+
+
+def page_args(arity=1):
+    """
+    (limit, cursor_key) from ?limit=&cursor=. limit is None when the
+    client asked for neither, i.e. the legacy unpaginated response.
+    arity is the number of sort-key columns of the endpoint.
+    """
+    limit = request.args.get("limit", type=int)
+    cursor = request.args.get("cursor")
+    if limit is None and cursor is None:
+        return None, None
+    if limit is None or limit <= 0:
+        limit = PAGINATION_CONFIG["default_limit"]
+    limit = min(limit, PAGINATION_CONFIG["max_limit"])
+    return limit, decode_cursor(cursor, arity) if cursor else None
+
+
+def page_meta(limit, has_more, last_key):
+    return {
+        "limit": limit,
+        "next_cursor": encode_cursor(last_key) if has_more else None,
+    }
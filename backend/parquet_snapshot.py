@@ -0,0 +1,231 @@
+"""
+Parquet snapshot of every mv_* relation, for the DuckDB backend.
+
+Each relation is copied out of Postgres as CSV and converted to Parquet
+with its column types (unconstrained numeric columns keep the largest
+scale found in the data, so values round-trip as the same decimals).
+A snapshot is a directory named after a new data version; it is written
+under a temporary name, renamed when complete, and only then published
+by rewriting CURRENT, so running API workers (see duckdb_backend.py)
+never see a half-written snapshot:
+
+    python parquet_snapshot.py                          # from DB_CONFIG
+    python parquet_snapshot.py --csv-dir /tmp/synth     # from synth_data.py CSVs
+    python parquet_snapshot.py --out /srv/edge/parquet --keep 2
+"""
+import os
+import re
+import sys
+import json
+import shutil
+import hashlib
+import argparse
+import tempfile
+from datetime import datetime, timezone
+
+import duckdb
+
+from data_version import new_version
+from duckdb_backend import current_snapshot, parquet_dir
+
+# ============================================================
+# TYPES
+# ============================================================
+# Postgres format_type() -> DuckDB type. "numeric" (no precision) is
+# resolved per column from the data; anything unknown is kept as text.
+
+PG_TYPES = {
+    "text": "VARCHAR",
+    "character varying": "VARCHAR",
+    "character": "VARCHAR",
+    "smallint": "SMALLINT",
+    "integer": "INTEGER",
+    "bigint": "BIGINT",
+    "real": "FLOAT",
+    "double precision": "DOUBLE",
+    "boolean": "BOOLEAN",
+    "date": "DATE",
+    "timestamp without time zone": "TIMESTAMP",
+    "timestamp with time zone": "TIMESTAMPTZ",
+}
+
+_NUMERIC = re.compile(r"numeric\((\d+),(\d+)\)")
+
+
+def duckdb_type(pg_type: str) -> str:
+    """DuckDB type for a Postgres one; None for unconstrained numeric."""
+    if pg_type == "numeric":
+        return None
+    match = _NUMERIC.fullmatch(pg_type.replace(" ", ""))
+    if match and int(match.group(1)) <= 38:
+        return f"DECIMAL({match.group(1)},{match.group(2)})"
+    base = re.sub(r"\(.*\)", "", pg_type).strip()
+    if base not in PG_TYPES:
+        print(f"  {pg_type}: stored as VARCHAR", file=sys.stderr)
+    return PG_TYPES.get(base, "VARCHAR")
+
+
+# ============================================================
+# SOURCES
+# ============================================================
+# Each yields (relation, [(column, postgres type)], csv path with header).
+
+COLUMNS_SQL = """
+    SELECT a.attname, format_type(a.atttypid, a.atttypmod)
+    FROM pg_attribute a
+    WHERE a.attrelid = %s::regclass AND a.attnum > 0 AND NOT a.attisdropped
+    ORDER BY a.attnum
+"""
+
+
+def postgres_relations(workdir):
+    import psycopg2
+    from config import DB_CONFIG
+    from refresh import MATERIALIZED_VIEWS
+
+    conn = psycopg2.connect(**DB_CONFIG)
+    try:
+        # One repeatable-read transaction: every relation from the same
+        # point in time.
+        conn.set_session(readonly=True, isolation_level="REPEATABLE READ")
+        with conn.cursor() as cur:
+            for relation in MATERIALIZED_VIEWS:
+                cur.execute(COLUMNS_SQL, (f"public.{relation}",))
+                columns = cur.fetchall()
+                path = os.path.join(workdir, f"{relation}.csv")
+                with open(path, "w", encoding="utf-8", newline="") as f:
+                    cur.copy_expert(
+                        f"COPY (SELECT * FROM public.{relation}) TO STDOUT WITH (FORMAT csv, HEADER)", f
+                    )
+                yield relation, columns, path
+    finally:
+        conn.close()
+
+
+def csv_relations(csv_dir):
+    from synth_data import TABLES
+
+    for relation, columns in TABLES.items():
+        path = os.path.join(csv_dir, f"{relation}.csv")
+        if os.path.exists(path):
+            yield relation, columns, path
+        else:
+            print(f"  {relation}: no {path}, skipped", file=sys.stderr)
+
+
+# ============================================================
+# CONVERSION
+# ============================================================
+
+def quote(identifier):
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def to_parquet(con, relation, columns, csv_path, target):
+    """Convert one CSV to Parquet; returns the manifest entry."""
+    types = {name: duckdb_type(pg_type) for name, pg_type in columns}
+    csv_types = {name: t or "VARCHAR" for name, t in types.items()}
+    spec = ", ".join(f"'{name}': '{t}'" for name, t in csv_types.items())
+    source = (
+        f"read_csv('{csv_path}', header = true, allow_quoted_nulls = false, "
+        f"columns = {{{spec}}})"
+    )
+    con.execute(f"CREATE OR REPLACE TEMP VIEW src AS SELECT * FROM {source}")
+
+    # Unconstrained numerics: widest scale in the column.
+    for name, t in types.items():
+        if t is None:
+            scale = con.execute(
+                f"SELECT COALESCE(MAX(LENGTH(SPLIT_PART({quote(name)}, '.', 2))), 0) FROM src"
+            ).fetchone()[0]
+            types[name] = f"DECIMAL(38,{min(int(scale), 37)})"
+
+    select = ", ".join(
+        quote(name) if csv_types[name] == types[name]
+        else f"CAST({quote(name)} AS {types[name]}) AS {quote(name)}"
+        for name in types
+    )
+    # Sorting by ward makes Parquet row-group statistics skip most of a
+    # file for the ward-filtered queries.
+    order = " ORDER BY ward" if "ward" in types else ""
+    con.execute(
+        f"COPY (SELECT {select} FROM src{order}) TO '{target}' (FORMAT parquet, COMPRESSION zstd)"
+    )
+    rows = con.execute(f"SELECT COUNT(*) FROM read_parquet('{target}')").fetchone()[0]
+
+    with open(target, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    return {
+        "file": os.path.basename(target),
+        "rows": rows,
+        "columns": [[name, t] for name, t in types.items()],
+        "sha256": digest,
+        "bytes": os.path.getsize(target),
+    }
+
+
+def prune(root, keep):
+    """Remove all but the newest `keep` snapshot directories."""
+    live, _ = current_snapshot(root)
+    versions = sorted(
+        d for d in os.listdir(root)
+        if os.path.isdir(os.path.join(root, d)) and not d.endswith(".tmp")
+    )
+    for version in versions[:-keep]:
+        if version != live:
+            shutil.rmtree(os.path.join(root, version), ignore_errors=True)
+
+
+def snapshot(args):
+    root = os.path.abspath(args.out or parquet_dir())
+    os.makedirs(root, exist_ok=True)
+    version = new_version()
+    tmp = os.path.join(root, f"{version}.tmp")
+    os.makedirs(tmp)
+
+    con = duckdb.connect()
+    relations = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        source = csv_relations(args.csv_dir) if args.csv_dir else postgres_relations(workdir)
+        for relation, columns, path in source:
+            relations[relation] = to_parquet(
+                con, relation, columns, path, os.path.join(tmp, f"{relation}.parquet")
+            )
+            print(f"{relation:<52} {relations[relation]['rows']:>10} rows")
+            if not args.csv_dir:
+                os.remove(path)
+    con.close()
+
+    manifest = {
+        "version": version,
+        "generated_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "source": "csv" if args.csv_dir else "postgres",
+        "relations": relations,
+    }
+    with open(os.path.join(tmp, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+
+    os.rename(tmp, os.path.join(root, version))
+    pointer = os.path.join(root, "CURRENT.tmp")
+    with open(pointer, "w", encoding="utf-8") as f:
+        f.write(version + "\n")
+    os.replace(pointer, os.path.join(root, "CURRENT"))
+    prune(root, args.keep)
+
+    total = sum(r["bytes"] for r in relations.values())
+    print(f"Snapshot {version}: {len(relations)} relations, {total / 1e6:.1f} MB in {root}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--out", help="snapshot root (default: DUCKDB_CONFIG parquet_dir)")
+    parser.add_argument("--csv-dir", help="convert synth_data.py CSVs instead of reading Postgres")
+    parser.add_argument("--keep", type=int, default=3,
+                        help="snapshot versions kept on disk (the live one always is)")
+    args = parser.parse_args(argv)
+    sys.exit(snapshot(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+import io
+import os
+import hashlib
+import logging
+import tempfile
+import time
+import threading
+import urllib.request
+from collections import OrderedDict
+from config import PHOTO_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# PHOTO THUMBNAILS + BOUNDED DISK CACHE
+# ============================================================
+# The photo / institution_photo columns hold paths relative to the photo
+# source: a local directory or an http(s) base URL (PHOTO_CONFIG["source"],
+# overridable per app with PHOTO_SOURCE). Thumbnails are produced on first
+# request and kept as JPEG files in cache_dir, evicted least recently used
+# once the directory exceeds max_cache_mb. Every worker tracks the shared
+# directory independently, so the bound is approximate across processes.
+#
+# Thumbnails are keyed by a version of the source photo (its path, plus
+# its mtime for a local file), so a re-surveyed plot's new photo gets a
+# new thumbnail and a new ?v= URL instead of the cached old one.
+#
+# Pillow is imported on the first thumbnail generated, not with the module.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def resolve_dir(path: str) -> str:
+    return path if os.path.isabs(path) else os.path.join(BASE_DIR, path)
+
+
+class PhotoNotFound(Exception):
+    pass
+
+
+class DiskLRU:
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()   # filename -> size, oldest first
+        self.total = 0
+        self.lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+        existing = []
+        for name in os.listdir(directory):
+            path = os.path.join(directory, name)
+            if name.endswith(".jpg") and os.path.isfile(path):
+                st = os.stat(path)
+                existing.append((st.st_atime, name, st.st_size))
+        for _, name, size in sorted(existing):
+            self.entries[name] = size
+            self.total += size
+
+    def path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def get(self, name: str) -> str | None:
+        """Path of a cached file (marking it recently used), or None."""
+        path = self.path(name)
+        if not os.path.exists(path):
+            with self.lock:
+                size = self.entries.pop(name, None)
+                if size is not None:
+                    self.total -= size
+            return None
+        with self.lock:
+            if name in self.entries:
+                self.entries.move_to_end(name)
+        # Recency lives in atime; mtime (and so the ETag) stays put.
+        try:
+            os.utime(path, (time.time(), os.stat(path).st_mtime))
+        except OSError:
+            pass
+        return path
+
+    def put(self, name: str, data: bytes) -> str:
+        # Write then rename so readers never see a partial file.
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        path = self.path(name)
+        os.replace(tmp, path)
+
+        evict = []
+        with self.lock:
+            self.total -= self.entries.pop(name, 0)
+            self.entries[name] = len(data)
+            self.total += len(data)
+            while self.total > self.max_bytes and len(self.entries) > 1:
+                old, size = self.entries.popitem(last=False)
+                self.total -= size
+                evict.append(old)
+        for old in evict:
+            try:
+                os.remove(self.path(old))
+            except OSError:
+                pass
+        return path
+
+    def stats(self):
+        with self.lock:
+            return {"files": len(self.entries), "bytes": self.total, "max_bytes": self.max_bytes}
+
+
+def is_remote(source: str) -> bool:
+    return source.startswith(("http://", "https://"))
+
+
+def local_path(source: str, photo: str) -> str:
+    """Path of a photo under a local source directory (never outside it)."""
+    root = os.path.realpath(resolve_dir(source))
+    path = os.path.realpath(os.path.join(root, photo))
+    if os.path.commonpath([root, path]) != root or not os.path.isfile(path):
+        raise PhotoNotFound(photo)
+    return path
+
+
+def read_source(source: str, photo: str) -> bytes:
+    """Original photo bytes from a local directory or http(s) base URL."""
+    if is_remote(source):
+        url = source.rstrip("/") + "/" + photo.lstrip("/")
+        try:
+            with urllib.request.urlopen(url, timeout=PHOTO_CONFIG["fetch_timeout"]) as resp:
+                return resp.read()
+        except OSError as e:
+            raise PhotoNotFound(f"{url}: {e}")
+
+    with open(local_path(source, photo), "rb") as f:
+        return f.read()
+
+
+def photo_version(source: str, photo: str) -> str:
+    """Short token that changes with the source photo's path (or mtime)."""
+    stamp = photo
+    if not is_remote(source):
+        try:
+            stamp += f"@{os.stat(local_path(source, photo)).st_mtime_ns}"
+        except (OSError, PhotoNotFound):
+            pass
+    return hashlib.sha1(stamp.encode()).hexdigest()[:12]
+
+
+def make_thumbnail(data: bytes, size: int) -> bytes:
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((size, size))
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        out = io.BytesIO()
+        image.save(out, "JPEG", quality=PHOTO_CONFIG["quality"], optimize=True, progressive=True)
+        return out.getvalue()
+
+
+def cache_name(kind: str, photo_id: str, size: int, version: str) -> str:
+    return hashlib.sha1(f"{kind}/{photo_id}/{size}/{version}".encode()).hexdigest() + ".jpg"
+
+
+_CACHE = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_disk_cache() -> DiskLRU:
+    global _CACHE
+    if _CACHE is None:
+        with _CACHE_LOCK:
+            if _CACHE is None:
+                _CACHE = DiskLRU(
+                    resolve_dir(PHOTO_CONFIG["cache_dir"]),
+                    PHOTO_CONFIG["max_cache_mb"] * 1024 * 1024,
+                )
+    return _CACHE
+
+
+def thumbnail_path(kind: str, photo_id: str, size: int, photo: str, source: str,
+                   version: str) -> str:
+    """
+    Path of the cached thumbnail of `photo` (the photo column of this id)
+    at `version` (photo_version()), generating it on a miss.
+    """
+    cache = get_disk_cache()
+    name = cache_name(kind, photo_id, size, version)
+    path = cache.get(name)
+    if path is not None:
+        return path
+
+    from PIL import Image
+
+    try:
+        thumb = make_thumbnail(read_source(source, photo), size)
+    except (OSError, Image.DecompressionBombError) as e:
+        raise PhotoNotFound(f"{photo}: not a readable image ({e})")
+    logger.info(f"Thumbnail {kind}/{photo_id}@{size}: {len(thumb)} bytes")
+    return cache.put(name, thumb)
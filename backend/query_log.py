@@ -0,0 +1,194 @@
+import re
+import time
+import queue
+import random
+import logging
+import threading
+from collections import deque
+from datetime import datetime, timezone
+
+import psycopg2.extensions
+from flask import has_request_context, request
+
+from config import SLOW_QUERY_CONFIG
+from query_memo import memo_cursor_class
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# SLOW-QUERY LOG
+# ============================================================
+# Every cursor handed out by db.get_conn / maps.get_db_conn is timed.
+# Executes at or above the threshold are kept in a bounded in-memory log
+# (per worker process) and a sample of them gets an EXPLAIN captured.
+#
+# EXPLAIN (ANALYZE) runs the query again, so it is done off the request
+# path by one background thread, on its own connection from the pool of
+# the node that ran the query: the request neither waits for it nor has
+# its transaction aborted when it fails. The log entry's "explain" is
+# filled in once it completes.
+
+_SLOW_QUERIES = deque(maxlen=SLOW_QUERY_CONFIG["max_entries"])
+_LOCK = threading.Lock()
+_WHITESPACE = re.compile(r"\s+")
+_EXPLAINABLE = ("select", "with")
+
+
+def normalize_sql(query) -> str:
+    if isinstance(query, bytes):
+        query = query.decode("utf-8", "replace")
+    return _WHITESPACE.sub(" ", str(query)).strip()
+
+
+def _json_safe(value):
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def _params_for_log(params):
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {k: _json_safe(v) for k, v in params.items()}
+    return [_json_safe(v) for v in params]
+
+
+_EXPLAIN_QUEUE = queue.Queue(maxsize=SLOW_QUERY_CONFIG["explain_queue_size"])
+_EXPLAIN_THREAD = None
+_EXPLAIN_LOCK = threading.Lock()
+
+
+def _capture_explain(node, statement):
+    """EXPLAIN (ANALYZE, BUFFERS) of a bound statement on a fresh connection to `node`."""
+    conn = node.connect(None)
+    try:
+        # A plain cursor: neither timed nor memoized.
+        with psycopg2.extensions.cursor(conn) as cur:
+            cur.execute(
+                "SET LOCAL statement_timeout = %s", (SLOW_QUERY_CONFIG["explain_timeout_ms"],)
+            )
+            cur.execute(b"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement)
+            return cur.fetchone()[0]
+    finally:
+        # Back to the pool, which rolls the transaction back.
+        conn.close()
+
+
+def _explain_forever():
+    while True:
+        node, statement, entry = _EXPLAIN_QUEUE.get()
+        try:
+            entry["explain"] = _capture_explain(node, statement)
+        except Exception as e:
+            logger.warning(f"EXPLAIN capture failed: {e}")
+
+
+def _queue_explain(conn, query, params, entry):
+    """Hand the EXPLAIN to the background thread; dropped when it is behind."""
+    global _EXPLAIN_THREAD
+    node = getattr(conn, "node", None)
+    if node is None:
+        return
+    # mogrify only binds the parameters client-side.
+    with psycopg2.extensions.cursor(conn) as cur:
+        statement = cur.mogrify(query, params)
+    if _EXPLAIN_THREAD is None or not _EXPLAIN_THREAD.is_alive():
+        with _EXPLAIN_LOCK:
+            if _EXPLAIN_THREAD is None or not _EXPLAIN_THREAD.is_alive():
+                _EXPLAIN_THREAD = threading.Thread(
+                    target=_explain_forever, name="slow-query-explain", daemon=True
+                )
+                _EXPLAIN_THREAD.start()
+    try:
+        _EXPLAIN_QUEUE.put_nowait((node, statement, entry))
+    except queue.Full:
+        logger.info("EXPLAIN capture skipped: queue full")
+
+
+def record_slow_query(conn, query, params, elapsed_ms: float):
+    sql = normalize_sql(query)
+    entry = {
+        "recorded_at": datetime.now(timezone.utc).isoformat(),
+        "duration_ms": round(elapsed_ms, 2),
+        "sql": sql,
+        "params": _params_for_log(params),
+        "endpoint": request.endpoint if has_request_context() else None,
+        "path": request.full_path if has_request_context() else None,
+        "explain": None,
+    }
+
+    if (
+        sql.lower().startswith(_EXPLAINABLE)
+        and random.random() < SLOW_QUERY_CONFIG["explain_sample_rate"]
+    ):
+        _queue_explain(conn, query, params, entry)
+
+    with _LOCK:
+        _SLOW_QUERIES.append(entry)
+
+    logger.warning(
+        f"Slow query ({entry['duration_ms']} ms) "
+        f"endpoint={entry['endpoint']} sql={sql} params={entry['params']}"
+    )
+
+
+def get_slow_queries(limit: int | None = None) -> list[dict]:
+    """Newest first."""
+    with _LOCK:
+        entries = list(_SLOW_QUERIES)
+    entries.reverse()
+    return entries[:limit] if limit else entries
+
+
+def clear_slow_queries():
+    with _LOCK:
+        _SLOW_QUERIES.clear()
+
+
+# ============================================================
+# TIMED CURSORS / CONNECTION
+# ============================================================
+
+class TimedCursorMixin:
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        result = super().execute(query, vars)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if elapsed_ms >= SLOW_QUERY_CONFIG["threshold_ms"]:
+            try:
+                record_slow_query(self.connection, query, vars, elapsed_ms)
+            except Exception as e:
+                logger.warning(f"Could not record slow query: {e}")
+        return result
+
+
+_TIMED_CURSOR_CLASSES = {}
+
+
+def timed_cursor_class(base):
+    """Return (and memoize) a timed subclass of the given cursor class."""
+    if issubclass(base, TimedCursorMixin):
+        return base
+    cls = _TIMED_CURSOR_CLASSES.get(base)
+    if cls is None:
+        cls = type(f"Timed{base.__name__}", (TimedCursorMixin, base), {})
+        _TIMED_CURSOR_CLASSES[base] = cls
+    return cls
+
+
+class TimedConnection(psycopg2.extensions.connection):
+    """
+    Connection whose cursors are all timed (and memoize SELECTs, see
+    query_memo.py), whatever cursor_factory the caller asks for (e.g.
+    RealDictCursor passed to conn.cursor()).
+    """
+
+    def cursor(self, *args, **kwargs):
+        base = (
+            kwargs.get("cursor_factory")
+            or self.cursor_factory
+            or psycopg2.extensions.cursor
+        )
+        kwargs["cursor_factory"] = memo_cursor_class(timed_cursor_class(base))
+        return super().cursor(*args, **kwargs)
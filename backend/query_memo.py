@@ -0,0 +1,274 @@
+import re
+import time
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from config import QUERY_MEMO_CONFIG
+from data_version import current_version, on_refresh
+from tracing import span
+
+# ============================================================
+# QUERY-RESULT MEMO
+# ============================================================
+# Below the HTTP cache, which keys on URLs: the same SELECT is issued by
+# several endpoints and by every query-string variant of one (cache
+# busters, ?fields= orders, extra params), and each of those misses the
+# response cache separately. Every cursor handed out by db.get_conn
+# (Postgres or DuckDB) memoizes SELECTs that read mv_* relations, keyed
+# by normalized SQL (whitespace, keyword case and the public. prefix do
+# not matter; literals do), parameters, row shape and the data version of
+# the relations read. A refresh of a relation drops its entries; the TTL
+# covers relations changed without a refresh notification.
+#
+# Results over max_rows (full-table loads for the in-memory indexes,
+# whole map layers) are not kept. The whole household layer bypasses the
+# memo altogether, so it is streamed from the cursor rather than fetched
+# first. Rows come back as fresh copies, so a view may modify what it
+# fetched.
+
+_LITERAL = re.compile(r"""('(?:[^']|'')*'|"(?:[^"]|"")*")""")
+_WHITESPACE = re.compile(r"\s+")
+_RELATION = re.compile(r"\bmv_\w+")
+_PUBLIC = re.compile(r"\bpublic\.")
+
+
+@lru_cache(maxsize=2048)
+def normalize_query(query: str):
+    """(normalized SQL, relations read), or None if not memoizable."""
+    parts = _LITERAL.split(query)
+    for i in range(0, len(parts), 2):
+        parts[i] = _PUBLIC.sub("", _WHITESPACE.sub(" ", parts[i]).lower())
+    sql = "".join(parts).strip().rstrip(";").strip()
+    if not sql.startswith(("select", "with")):
+        return None
+    views = frozenset(_RELATION.findall(sql))
+    if not views:
+        return None
+    return sql, views
+
+
+def freeze(value):
+    """Hashable form of query parameters (lists -> tuples, dicts sorted)."""
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, freeze(v)) for k, v in value.items()))
+    hash(value)
+    return value
+
+
+def memo_key(query, params, shape):
+    """(key, relations) for a memoizable query, else None."""
+    if not isinstance(query, str):
+        return None
+    normalized = normalize_query(query)
+    if normalized is None:
+        return None
+    sql, views = normalized
+    try:
+        frozen = freeze(params) if params is not None else ()
+    except TypeError:
+        return None
+    return (shape, sql, frozen, current_version(sorted(views))), views
+
+
+def _statement(query, limit=300):
+    if not isinstance(query, str):
+        return type(query).__name__
+    return _WHITESPACE.sub(" ", query).strip()[:limit]
+
+
+def _copy(rows):
+    return [dict(r) for r in rows] if rows and isinstance(rows[0], dict) else list(rows)
+
+
+class QueryMemo:
+    def __init__(self, ttl, max_entries, max_rows, max_total_rows):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self.max_total_rows = max_total_rows
+        self._entries = OrderedDict()   # key -> (expires, views, rows)
+        self._rows = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.too_large = self.evictions = self.invalidations = 0
+
+    def _remove(self, key):
+        _, _, rows = self._entries.pop(key)
+        self._rows -= len(rows)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            rows = entry[2]
+        return _copy(rows)
+
+    def put(self, key, views, rows):
+        if len(rows) > self.max_rows:
+            with self._lock:
+                self.too_large += 1
+            return
+        rows = _copy(rows)
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            while self._entries and (
+                len(self._entries) >= self.max_entries
+                or self._rows + len(rows) > self.max_total_rows
+            ):
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+            self._entries[key] = (time.monotonic() + self.ttl, views, rows)
+            self._rows += len(rows)
+
+    def invalidate(self, views):
+        views = set(views)
+        with self._lock:
+            stale = [k for k, (_, v, _) in self._entries.items() if v & views]
+            for key in stale:
+                self._remove(key)
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._rows = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": QUERY_MEMO_CONFIG["enabled"],
+                "entries": len(self._entries),
+                "rows": self._rows,
+                "max_entries": self.max_entries,
+                "max_total_rows": self.max_total_rows,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+                "too_large": self.too_large,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+MEMO = QueryMemo(
+    QUERY_MEMO_CONFIG["ttl_seconds"],
+    QUERY_MEMO_CONFIG["max_entries"],
+    QUERY_MEMO_CONFIG["max_rows"],
+    QUERY_MEMO_CONFIG["max_total_rows"],
+)
+
+
+def _invalidate(views, version):
+    MEMO.invalidate(views)
+
+
+on_refresh(_invalidate)
+
+
+# ============================================================
+# MEMOIZING CURSORS
+# ============================================================
+
+class MemoCursorMixin:
+    """
+    execute() of a memoizable query answers from the memo or runs it,
+    fetches every row and keeps them; fetch*() then read those rows.
+    Anything else goes straight to the cursor. description is not
+    replayed for memo hits. memoize = False on a cursor bypasses the
+    memo, for results that are read row by row instead of fetched whole.
+
+    This is the outermost layer of every API cursor, so it also records
+    the db.execute / db.fetch tracing spans.
+    """
+
+    memoize = True
+    _memo_rows = None
+    _memo_pos = 0
+
+    def memo_shape(self):
+        return type(self).__name__
+
+    def execute(self, query, vars=None):
+        self._memo_rows = None
+        memo = None
+        if self.memoize and QUERY_MEMO_CONFIG["enabled"]:
+            memo = memo_key(query, vars, self.memo_shape())
+        with span("db.execute") as s:
+            if s is not None:
+                s.attributes["db.statement"] = _statement(query)
+                s.attributes["db.memo"] = "bypass" if memo is None else "hit"
+            if memo is None:
+                return super().execute(query, vars)
+            key, views = memo
+            rows = MEMO.get(key)
+            if rows is None:
+                if s is not None:
+                    s.attributes["db.memo"] = "miss"
+                super().execute(query, vars)
+        if rows is None:
+            with span("db.fetch") as f:
+                rows = super().fetchall()
+                if f is not None:
+                    f.attributes["db.rows"] = len(rows)
+            MEMO.put(key, views, rows)
+        self._memo_rows = rows
+        self._memo_pos = 0
+
+    def fetchone(self):
+        if self._memo_rows is None:
+            with span("db.fetch"):
+                return super().fetchone()
+        if self._memo_pos >= len(self._memo_rows):
+            return None
+        self._memo_pos += 1
+        return self._memo_rows[self._memo_pos - 1]
+
+    def fetchmany(self, size=None):
+        if self._memo_rows is None:
+            with span("db.fetch"):
+                return super().fetchmany(size) if size is not None else super().fetchmany()
+        size = size or getattr(self, "arraysize", 1)
+        rows = self._memo_rows[self._memo_pos:self._memo_pos + size]
+        self._memo_pos += len(rows)
+        return rows
+
+    def fetchall(self):
+        if self._memo_rows is None:
+            with span("db.fetch") as f:
+                rows = super().fetchall()
+                if f is not None:
+                    f.attributes["db.rows"] = len(rows)
+                return rows
+        rows = self._memo_rows[self._memo_pos:] if self._memo_pos else self._memo_rows
+        # Drop the reference so a large result is freed with the caller's list
+        self._memo_rows, self._memo_pos = [], 0
+        return rows
+
+    def __iter__(self):
+        if self._memo_rows is None:
+            return super().__iter__()
+        return iter(self.fetchall())
+
+
+_MEMO_CURSOR_CLASSES = {}
+
+
+def memo_cursor_class(base):
+    """Return (and memoize) a memoizing subclass of the given cursor class."""
+    if issubclass(base, MemoCursorMixin):
+        return base
+    cls = _MEMO_CURSOR_CLASSES.get(base)
+    if cls is None:
+        cls = type(f"Memo{base.__name__}", (MemoCursorMixin, base), {})
+        _MEMO_CURSOR_CLASSES[base] = cls
+    return cls
@@ -0,0 +1,108 @@
+"""
+Materialized view refresh job.
+
+Always runs on the primary (replicas are read-only and receive the new
+contents through replication):
+
+    python refresh.py                      # every view
+    python refresh.py mv_map_households    # selected views
+"""
+import sys
+import time
+import logging
+import argparse
+import psycopg2
+from psycopg2 import sql
+from db import get_primary_conn
+from data_version import new_version, notify, publish
+from map_sync import LAYERS as MAP_LAYERS, record_versions
+
+logger = logging.getLogger(__name__)
+
+MATERIALIZED_VIEWS = [
+    "mv_overview_ward_summary",
+    "mv_overview_charts",
+    "mv_demographics_ward_summary",
+    "mv_demographics_charts",
+    "mv_household_sanitation_ward_summary",
+    "mv_household_sanitation_charts",
+    "mv_household_sanitation_safety_functionality_ward",
+    "mv_household_wash_governance_ward",
+    "mv_learning_institutions_ward_summary",
+    "mv_learning_institutions_charts",
+    "mv_health_facilities_ward_summary",
+    "mv_health_institutions_charts",
+    "mv_other_institutions_ward_summary",
+    "mv_other_institutions_charts",
+    "mv_institutions_chart_aggregates",
+    "mv_institutions_option_summary",
+    "mv_institutions_diagnostics",
+    "mv_map_households",
+    "mv_map_institutions",
+]
+
+
+def refresh_views(views=None, concurrently=True):
+    """
+    REFRESH each view on the primary. CONCURRENTLY keeps the view readable
+    during the refresh but needs a unique index on it.
+    Afterwards a new data version is announced to every API worker
+    (see data_version.py). Returns {view: seconds}.
+    """
+    views = views or MATERIALIZED_VIEWS
+    unknown = set(views) - set(MATERIALIZED_VIEWS)
+    if unknown:
+        raise ValueError(f"Unknown materialized views: {sorted(unknown)}")
+
+    statement = (
+        "REFRESH MATERIALIZED VIEW CONCURRENTLY {}"
+        if concurrently else
+        "REFRESH MATERIALIZED VIEW {}"
+    )
+    timings = {}
+    conn = get_primary_conn(cursor_factory=None)
+    try:
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            for view in views:
+                start = time.perf_counter()
+                cur.execute(sql.SQL(statement).format(sql.Identifier("public", view)))
+                timings[view] = round(time.perf_counter() - start, 3)
+        # Map layer delta history, before workers hear about the refresh
+        if any(view in views for view, _ in MAP_LAYERS.values()):
+            conn.autocommit = False
+            try:
+                record_versions(conn, views)
+            except psycopg2.Error as e:
+                # Workers then keep their own history; still announce.
+                conn.rollback()
+                logger.warning(f"Could not record map layer versions: {e}")
+            conn.autocommit = True
+        with conn.cursor() as cur:
+            version = new_version()
+            notify(cur, views, version)
+    finally:
+        if not conn.closed:
+            conn.autocommit = False
+        conn.close()
+
+    # Apply locally right away in case this process also serves requests;
+    # its listener thread will then ignore the same version.
+    publish(views, version)
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Refresh materialized views on the primary.")
+    parser.add_argument("views", nargs="*", help="views to refresh (default: all)")
+    parser.add_argument("--no-concurrently", action="store_true",
+                        help="plain REFRESH (locks readers, no unique index needed)")
+    args = parser.parse_args(argv)
+
+    timings = refresh_views(args.views, concurrently=not args.no_concurrently)
+    for view, seconds in timings.items():
+        print(f"{view:<52} {seconds:>8.3f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,739 @@
+"""
+Synthetic survey data generator for every mv_* relation the API reads.
+
+Plots and institutions are generated one by one inside the ward polygons
+of naivasha_wards.geojson (optionally tiled into more copies for county /
+national scale), streamed into mv_map_households / mv_map_institutions,
+and aggregated on the fly so every ward summary and chart relation agrees
+with the point layers. Relations are created as plain tables and loaded
+with COPY:
+
+    python synth_data.py --plots 1000000 --ward-copies 40 --replace
+    python synth_data.py --plots 50000 --csv-dir /tmp/synth   # no database
+
+Only point this at a scratch database: with --replace existing tables of
+the same names are dropped (real materialized views are never touched,
+DROP TABLE refuses them).
+"""
+import os
+import csv
+import json
+import math
+import random
+import argparse
+import tempfile
+from collections import Counter, defaultdict
+
+from geo import geometry_bbox, geometry_contains, translate_geometry
+
+DEFAULT_BOUNDARIES = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "data", "geojson", "naivasha_wards.geojson",
+)
+
+# ============================================================
+# RELATIONS (column order is the COPY order)
+# ============================================================
+TABLES = {
+    "mv_map_households": [
+        ("plot_id", "text"), ("ward", "text"), ("settlement", "text"),
+        ("sub_county", "text"), ("lat", "double precision"),
+        ("lon", "double precision"), ("sanitation_class", "text"),
+        ("sanitation_type", "text"), ("is_shared", "boolean"),
+        ("households_sharing", "integer"), ("has_handwashing", "boolean"),
+        ("solid_waste_mgmt", "text"), ("total_persons", "integer"),
+        ("children_under_5", "integer"), ("financed_by", "text"),
+        ("photo", "text"),
+    ],
+    "mv_map_institutions": [
+        ("institution_id", "text"), ("institution_name", "text"),
+        ("institution_category", "text"), ("ward", "text"),
+        ("location", "text"), ("lat", "double precision"),
+        ("lon", "double precision"), ("has_sanitation", "boolean"),
+        ("handwashing_status", "text"), ("estimated_users", "integer"),
+        ("institution_photo", "text"),
+    ],
+    "mv_overview_ward_summary": [
+        ("ward", "text"), ("plots_surveyed", "integer"),
+        ("total_households", "integer"), ("total_population", "integer"),
+        ("avg_household_size", "numeric"), ("water_access_pct", "numeric"),
+        ("sanitation_facilities_pct", "numeric"),
+        ("shared_facilities_pct", "numeric"),
+        ("handwashing_available_pct", "numeric"),
+        ("self_financed_pct", "numeric"), ("never_emptied_pct", "numeric"),
+    ],
+    "mv_demographics_ward_summary": [
+        ("ward", "text"), ("plots_surveyed", "integer"),
+        ("total_households", "integer"), ("total_population", "integer"),
+        ("avg_household_size", "numeric"),
+        ("avg_households_per_plot", "numeric"),
+        ("children_under_5_count", "integer"),
+        ("children_under_5_pct", "numeric"),
+        ("pwd_households_count", "integer"), ("pwd_households_pct", "numeric"),
+        ("male_population_pct", "numeric"),
+        ("female_population_pct", "numeric"),
+        ("male_owned_plots_pct", "numeric"),
+        ("female_owned_plots_pct", "numeric"),
+    ],
+    "mv_household_sanitation_ward_summary": [
+        ("ward", "text"), ("total_households", "integer"),
+        ("households_with_sanitation_pct", "numeric"),
+        ("households_without_sanitation_pct", "numeric"),
+        ("shared_facilities_pct", "numeric"), ("water_access_pct", "numeric"),
+        ("handwashing_available_pct", "numeric"),
+        ("pwd_accessible_pct", "numeric"), ("provides_privacy_pct", "numeric"),
+        ("safe_for_women_pct", "numeric"), ("adequate_lighting_pct", "numeric"),
+        ("safe_sanitation_pct", "numeric"),
+    ],
+    "mv_household_sanitation_safety_functionality_ward": [
+        ("ward", "text"), ("total_households", "integer"),
+        ("safe_households", "integer"), ("unsafe_households", "integer"),
+        ("safe_sanitation_pct", "numeric"), ("unsafe_sanitation_pct", "numeric"),
+        ("usable_year_round_pct", "numeric"), ("delayed_emptying_pct", "numeric"),
+        ("safe_emptying_pct", "numeric"), ("avg_emptying_cost_kes", "numeric"),
+        ("flood_affected_pct", "numeric"),
+    ],
+    "mv_household_wash_governance_ward": [
+        ("ward", "text"), ("total_households", "integer"),
+        ("organized_solid_waste_pct", "numeric"),
+        ("handwashing_with_soap_pct", "numeric"),
+        ("accessed_sanitation_financing_pct", "numeric"),
+    ],
+    "mv_learning_institutions_ward_summary": [
+        ("ward", "text"), ("total_learning_institutions", "integer"),
+        ("total_students", "integer"),
+        ("institutions_with_sanitation_pct", "numeric"),
+        ("handwashing_available_pct", "numeric"),
+        ("gender_segregated_pct", "numeric"),
+        ("continuous_water_supply_pct", "numeric"),
+        ("mhm_facilities_pct", "numeric"), ("pwd_accessible_pct", "numeric"),
+        ("toilets_per_student_ratio", "numeric"),
+    ],
+    "mv_health_facilities_ward_summary": [
+        ("ward", "text"), ("total_health_facilities", "integer"),
+        ("total_estimated_users", "integer"),
+        ("facilities_with_sanitation_pct", "numeric"),
+        ("handwashing_available_pct", "numeric"),
+        ("continuous_water_supply_pct", "numeric"),
+        ("proper_waste_management_pct", "numeric"),
+        ("pwd_accessible_pct", "numeric"),
+    ],
+    "mv_other_institutions_ward_summary": [
+        ("ward", "text"), ("total_other_institutions", "integer"),
+        ("total_estimated_users", "integer"),
+        ("institutions_with_sanitation_pct", "numeric"),
+        ("water_access_pct", "numeric"),
+        ("handwashing_available_pct", "numeric"),
+        ("regularly_cleaned_pct", "numeric"), ("pwd_accessible_pct", "numeric"),
+        ("toilets_per_user_ratio", "numeric"),
+    ],
+    "mv_institutions_option_summary": [
+        ("ward", "text"), ("institution_category", "text"),
+        ("institution_subcategory", "text"), ("total_institutions", "integer"),
+        ("ever_emptied_yes", "integer"), ("ever_emptied_no", "integer"),
+        ("safe_sludge_yes", "integer"), ("safe_sludge_no", "integer"),
+        ("solid_waste_open_dump", "integer"), ("solid_waste_burning", "integer"),
+        ("solid_waste_collected", "integer"),
+        ("water_access_yes", "integer"), ("water_access_no", "integer"),
+        ("water_continuous", "integer"),
+        ("handwashing_yes", "integer"), ("handwashing_no", "integer"),
+        ("soap_available_yes", "integer"), ("soap_available_no", "integer"),
+        ("maintenance_plan_yes", "integer"), ("maintenance_plan_no", "integer"),
+        ("flood_affected_yes", "integer"), ("flood_affected_no", "integer"),
+    ],
+}
+
+# ward / chart_type / category / value
+CHART_TABLES = [
+    "mv_overview_charts",
+    "mv_demographics_charts",
+    "mv_household_sanitation_charts",
+    "mv_learning_institutions_charts",
+    "mv_health_institutions_charts",
+    "mv_other_institutions_charts",
+]
+for _name in CHART_TABLES:
+    TABLES[_name] = [
+        ("ward", "text"), ("chart_type", "text"),
+        ("category", "text"), ("value", "integer"),
+    ]
+
+# ward / institution_category / institution_subcategory / metric / category / value
+for _name in ("mv_institutions_chart_aggregates", "mv_institutions_diagnostics"):
+    TABLES[_name] = [
+        ("ward", "text"), ("institution_category", "text"),
+        ("institution_subcategory", "text"), ("metric", "text"),
+        ("category", "text"), ("value", "integer"),
+    ]
+
+# ============================================================
+# CATEGORY DISTRIBUTIONS
+# ============================================================
+# (label, weight, sanitation_class, containment_type); labels cover every
+# branch of households.classify_sanitation_type.
+SANITATION_TYPES = [
+    ("Flush toilet to sewer", 8, "Safely managed", "Sewer"),
+    ("Flush toilet to septic tank", 14, "Safely managed", "Septic tank"),
+    ("Pit latrine with slab", 34, "Basic", "Lined pit"),
+    ("VIP latrine", 9, "Basic", "Lined pit"),
+    ("Pit latrine without slab", 18, "Unimproved", "Unlined pit"),
+    ("Open pit", 6, "Unimproved", "Unlined pit"),
+    ("Bucket / hanging toilet", 3, "Unimproved", "None"),
+    ("No facility (bush / open field)", 8, "Open defecation", None),
+]
+
+# Labels cover every branch of households.classify_water_source and
+# overview.group_water_source.
+WATER_SOURCES = [
+    ("Piped water (NAIVAWASCO)", 30, True),
+    ("Piped water - community/private operators", 15, True),
+    ("Borehole", 14, True),
+    ("Shallow well", 8, True),
+    ("Rain water harvesting", 6, True),
+    ("Water kiosk", 17, True),
+    ("Water vendor / bowser", 6, False),
+    ("River / lake", 4, False),
+]
+
+HANDWASHING = [("With soap and water", 40), ("Water only", 25), ("None", 35)]
+SOLID_WASTE = [
+    ("Collected by county", 20), ("Private collector", 25),
+    ("Burning", 25), ("Open dumping", 20), ("Burying", 10),
+]
+ORGANIZED_SOLID_WASTE = {"Collected by county", "Private collector"}
+EMPTYING_FREQUENCY = [
+    ("Within the last year", 20), ("1-5 years ago", 30),
+    ("More than 5 years ago", 15), ("Never emptied", 35),
+]
+FINANCED_BY = [
+    ("Self", 55), ("Landlord", 25), ("NGO / CBO", 8),
+    ("County government", 5), ("Microfinance loan", 7),
+]
+EXTERNAL_FINANCING = {"NGO / CBO", "County government", "Microfinance loan"}
+OWNER_GENDER = [("Male", 62), ("Female", 28), ("Joint", 10)]
+DISABILITY_TYPES = [("Physical", 45), ("Visual", 20), ("Hearing", 15), ("Intellectual", 20)]
+AGE_GROUPS = [("0-4", 14), ("5-17", 30), ("18-35", 32), ("36-59", 18), ("60+", 6)]
+
+INSTITUTION_CATEGORIES = {
+    "Learning Institution": (45, ["ECDE Centre", "Primary School", "Secondary School", "TVET College"]),
+    "Health Facility": (20, ["Dispensary", "Health Centre", "Hospital", "Private Clinic"]),
+    "Other Institution": (35, ["Market", "Place of Worship", "Bus Park", "Government Office"]),
+}
+INSTITUTION_HANDWASHING = [
+    ("Available with soap", 45), ("Available without soap", 30), ("Not available", 25),
+]
+INSTITUTION_CONTAINMENT = [
+    ("Sewer", 15), ("Septic tank", 35), ("Lined pit", 30), ("Unlined pit", 20),
+]
+INSTITUTION_SOLID_WASTE = [("Collected", 45), ("Burning", 35), ("Open dump", 20)]
+DIAGNOSTIC_INSIGHTS = {
+    "maintenance_challenges": [
+        "Lack of funds", "Blocked / full pits", "Broken doors or slabs",
+        "No water for flushing", "Vandalism",
+    ],
+    "emptying_barriers": [
+        "High cost", "Inaccessible for exhauster trucks",
+        "No service provider", "Not needed yet",
+    ],
+    "user_complaints": [
+        "Long queues", "Poor hygiene", "Lack of privacy", "No lighting at night",
+    ],
+}
+FLOOD_RISK = [("High", 20), ("Moderate", 35), ("Low", 45)]
+
+
+class Weighted:
+    """Reusable weighted choice over (label, weight, ...) tuples."""
+
+    def __init__(self, options):
+        self.options = options
+        self.cum_weights = []
+        total = 0
+        for option in options:
+            total += option[1]
+            self.cum_weights.append(total)
+
+    def pick(self, rng):
+        return rng.choices(self.options, cum_weights=self.cum_weights)[0]
+
+
+# ============================================================
+# WARDS
+# ============================================================
+
+def load_wards(boundaries_path, copies):
+    """
+    Ward polygons from the boundary file, tiled `copies` times side by
+    side (copy 1 keeps the real names) to reach county / national scale.
+    """
+    with open(boundaries_path, encoding="utf-8") as f:
+        base = json.load(f)["features"]
+
+    boxes = [geometry_bbox(f["geometry"]) for f in base]
+    min_x = min(b[0] for b in boxes)
+    min_y = min(b[1] for b in boxes)
+    width = max(b[2] for b in boxes) - min_x
+    height = max(b[3] for b in boxes) - min_y
+    cols = max(1, math.ceil(math.sqrt(copies)))
+
+    wards = []
+    for copy in range(copies):
+        dx = (copy % cols) * width * 1.05
+        dy = -(copy // cols) * height * 1.05
+        for feature in base:
+            props = feature.get("properties", {})
+            name = props.get("shapeName") or props.get("ward") or props.get("name")
+            if copy:
+                name = f"{name} {copy + 1}"
+            geometry = feature["geometry"]
+            if copy:
+                geometry = translate_geometry(geometry, dx, dy)
+            wards.append({
+                "name": name,
+                "geometry": geometry,
+                "bbox": geometry_bbox(geometry),
+                "settlements": [f"{name} Settlement {i + 1}" for i in range(4)],
+            })
+    return wards
+
+
+def ward_boundaries_geojson(wards):
+    return {
+        "type": "FeatureCollection",
+        "features": [
+            {
+                "type": "Feature",
+                "properties": {"shapeName": w["name"], "shapeType": "ADM3"},
+                "geometry": w["geometry"],
+            }
+            for w in wards
+        ],
+    }
+
+
+def random_point(rng, ward):
+    min_x, min_y, max_x, max_y = ward["bbox"]
+    while True:
+        lon = rng.uniform(min_x, max_x)
+        lat = rng.uniform(min_y, max_y)
+        if geometry_contains(ward["geometry"], lon, lat):
+            return round(lat, 6), round(lon, 6)
+
+
+def split_counts(rng, total, n):
+    """Split `total` into n uneven positive-ish shares."""
+    weights = [rng.uniform(0.5, 1.5) for _ in range(n)]
+    scale = total / sum(weights)
+    counts = [int(w * scale) for w in weights]
+    for i in range(total - sum(counts)):
+        counts[i % n] += 1
+    return counts
+
+
+# ============================================================
+# OUTPUT
+# ============================================================
+
+class TableWriter:
+    """Streams CSV rows for one relation to a CSV file or a temp file for COPY."""
+
+    def __init__(self, name, csv_dir=None):
+        self.name = name
+        self.columns = [c for c, _ in TABLES[name]]
+        if csv_dir:
+            self.file = open(os.path.join(csv_dir, f"{name}.csv"), "w", newline="")
+        else:
+            self.file = tempfile.TemporaryFile("w+", newline="")
+        self.writer = csv.writer(self.file)
+        if csv_dir:
+            self.writer.writerow(self.columns)
+        self.rows = 0
+
+    def row(self, values):
+        self.writer.writerow(["" if v is None else v for v in values])
+        self.rows += 1
+
+    def load(self, cur):
+        self.file.seek(0)
+        cur.copy_expert(
+            f"COPY public.{self.name} ({', '.join(self.columns)}) "
+            f"FROM STDIN WITH (FORMAT csv)",
+            self.file,
+        )
+
+    def close(self):
+        self.file.close()
+
+
+def pct(part, whole, digits=1):
+    return round(part * 100.0 / whole, digits) if whole else 0
+
+
+# ============================================================
+# GENERATION
+# ============================================================
+
+def generate_households(rng, wards, n_plots, out, stats, charts):
+    sanitation = Weighted(SANITATION_TYPES)
+    water = Weighted(WATER_SOURCES)
+    handwashing = Weighted(HANDWASHING)
+    solid_waste = Weighted(SOLID_WASTE)
+    emptying = Weighted(EMPTYING_FREQUENCY)
+    financing = Weighted(FINANCED_BY)
+    owner = Weighted(OWNER_GENDER)
+    disability = Weighted(DISABILITY_TYPES)
+    age = Weighted(AGE_GROUPS)
+
+    plot_no = 0
+    for ward, n_ward_plots in zip(wards, split_counts(rng, n_plots, len(wards))):
+        key = ward["name"].lower()
+        s = stats[key]
+        c = charts[key]
+        for _ in range(n_ward_plots):
+            plot_no += 1
+            plot_id = f"P{plot_no:08d}"
+            lat, lon = random_point(rng, ward)
+
+            san_label, _, san_class, containment = sanitation.pick(rng)
+            has_facility = containment is not None
+            is_shared = has_facility and rng.random() < 0.45
+            if is_shared and san_class in ("Safely managed", "Basic"):
+                san_class = "Limited"
+            sharing = rng.randint(2, 12) if is_shared else 1
+            water_label, _, water_access = water.pick(rng)
+            hw_label = handwashing.pick(rng)[0]
+            waste_label = solid_waste.pick(rng)[0]
+            financed = financing.pick(rng)[0] if has_facility else None
+
+            households = rng.choices(range(1, 9), weights=[30, 22, 15, 10, 8, 6, 5, 4])[0]
+            persons = sum(rng.randint(1, 7) for _ in range(households))
+            children = sum(1 for _ in range(persons) if rng.random() < 0.14)
+            males = sum(1 for _ in range(persons) if rng.random() < 0.49)
+            pwd = rng.random() < 0.06
+
+            out["mv_map_households"].row([
+                plot_id, ward["name"].upper(), rng.choice(ward["settlements"]),
+                "Naivasha", lat, lon, san_class, san_label, is_shared, sharing,
+                hw_label != "None", waste_label, persons, children, financed,
+                f"plots/{plot_id}.jpg",
+            ])
+
+            safe = san_class in ("Safely managed", "Basic")
+            s["plots"] += 1
+            s["households"] += households
+            s["persons"] += persons
+            s["children"] += children
+            s["males"] += males
+            s["water_access"] += households * water_access
+            s["with_sanitation"] += households * has_facility
+            s["shared"] += households * is_shared
+            s["handwashing"] += households * (hw_label != "None")
+            s["soap"] += households * (hw_label == "With soap and water")
+            s["self_financed"] += households * (financed == "Self")
+            s["external_financing"] += households * (financed in EXTERNAL_FINANCING)
+            s["organized_waste"] += households * (waste_label in ORGANIZED_SOLID_WASTE)
+            s["safe"] += households * safe
+            s["pwd_households"] += pwd
+            s["owner_" + owner.pick(rng)[0].lower()] += 1
+            for flag, p in (
+                ("pwd_accessible", 0.15), ("privacy", 0.7), ("safe_for_women", 0.6),
+                ("lighting", 0.35), ("usable_year_round", 0.8),
+                ("flood_affected", 0.18),
+            ):
+                s[flag] += households * (has_facility and rng.random() < p)
+
+            c[("mv_overview_charts", "water_source", water_label)] += households
+            c[("mv_overview_charts", "handwashing_status", hw_label)] += households
+            c[("mv_household_sanitation_charts", "water_source", water_label)] += households
+            if has_facility:
+                sharing_label = "Shared" if is_shared else "Not shared"
+                c[("mv_overview_charts", "sanitation_type", san_label)] += households
+                c[("mv_overview_charts", "toilet_sharing", sharing_label)] += households
+                c[("mv_overview_charts", "containment_type", containment)] += households
+                c[("mv_household_sanitation_charts", "sanitation_type", san_label)] += households
+                c[("mv_household_sanitation_charts", "toilet_sharing", sharing_label)] += households
+                if containment != "Sewer":
+                    freq = emptying.pick(rng)[0]
+                    c[("mv_overview_charts", "emptying_frequency", freq)] += households
+                    s["never_emptied"] += households * (freq == "Never emptied")
+                    s["delayed_emptying"] += households * (freq == "More than 5 years ago")
+                    if freq != "Never emptied":
+                        s["emptied"] += households
+                        s["safe_emptying"] += households * (rng.random() < 0.45)
+                        s["emptying_cost"] += rng.randint(1500, 12000)
+                        s["emptying_cost_n"] += 1
+            else:
+                c[("mv_household_sanitation_charts", "sanitation_type", san_label)] += households
+
+            for _ in range(persons):
+                c[("mv_demographics_charts", "population_age_group", age.pick(rng)[0])] += 1
+            c[("mv_demographics_charts", "gender_distribution", "Male")] += males
+            c[("mv_demographics_charts", "gender_distribution", "Female")] += persons - males
+            if pwd:
+                c[("mv_demographics_charts", "disability_type", disability.pick(rng)[0])] += 1
+
+
+def generate_institutions(rng, wards, n_institutions, out, stats, charts, options, cube, diagnostics):
+    categories = Weighted([(k, v[0]) for k, v in INSTITUTION_CATEGORIES.items()])
+    handwashing = Weighted(INSTITUTION_HANDWASHING)
+    containment = Weighted(INSTITUTION_CONTAINMENT)
+    solid_waste = Weighted(INSTITUTION_SOLID_WASTE)
+    flood_risk = Weighted(FLOOD_RISK)
+    emptying = Weighted(EMPTYING_FREQUENCY)
+    water = Weighted(WATER_SOURCES)
+    summary_prefix = {
+        "Learning Institution": "learning",
+        "Health Facility": "health",
+        "Other Institution": "other",
+    }
+    chart_table = {
+        "Learning Institution": "mv_learning_institutions_charts",
+        "Health Facility": "mv_health_institutions_charts",
+        "Other Institution": "mv_other_institutions_charts",
+    }
+
+    inst_no = 0
+    for ward, n_ward in zip(wards, split_counts(rng, n_institutions, len(wards))):
+        key = ward["name"].lower()
+        s = stats[key]
+        c = charts[key]
+        for _ in range(n_ward):
+            inst_no += 1
+            inst_id = f"I{inst_no:07d}"
+            lat, lon = random_point(rng, ward)
+            category = categories.pick(rng)[0]
+            subcategory = rng.choice(INSTITUTION_CATEGORIES[category][1])
+            location = rng.choice(ward["settlements"])
+            users = rng.randint(50, 1500)
+            has_sanitation = rng.random() < 0.85
+            hw_label = handwashing.pick(rng)[0]
+            cont_label = containment.pick(rng)[0] if has_sanitation else None
+            waste_label = solid_waste.pick(rng)[0]
+            water_access = rng.random() < 0.75
+            continuous = water_access and rng.random() < 0.6
+            toilets = max(1, users // rng.randint(25, 80)) if has_sanitation else 0
+
+            out["mv_map_institutions"].row([
+                inst_id, f"{location} {subcategory} {inst_no}", category, key,
+                location, lat, lon, has_sanitation, hw_label, users,
+                f"institutions/{inst_id}.jpg",
+            ])
+
+            p = summary_prefix[category]
+            s[f"{p}_total"] += 1
+            s[f"{p}_users"] += users
+            s[f"{p}_toilets"] += toilets
+            s[f"{p}_sanitation"] += has_sanitation
+            s[f"{p}_handwashing"] += hw_label != "Not available"
+            s[f"{p}_water"] += water_access
+            s[f"{p}_continuous_water"] += continuous
+            s[f"{p}_waste_mgmt"] += waste_label == "Collected"
+            for flag, prob in (
+                ("gender_segregated", 0.6), ("mhm", 0.35),
+                ("pwd_accessible", 0.25), ("regularly_cleaned", 0.6),
+            ):
+                value = rng.random() < prob
+                s[f"{p}_{flag}"] += value
+                if flag == "mhm" and category == "Learning Institution":
+                    c[(chart_table[category], "mhm_facilities",
+                       "Available" if value else "Not available")] += 1
+                if category == "Other Institution" and flag == "pwd_accessible":
+                    c[(chart_table[category], "pwd_accessibility",
+                       "Accessible" if value else "Not accessible")] += 1
+                if category == "Other Institution" and flag == "gender_segregated":
+                    c[(chart_table[category], "gender_segregation",
+                       "Segregated" if value else "Not segregated")] += 1
+            if cont_label:
+                c[(chart_table[category], "containment_type", cont_label)] += 1
+            if category != "Other Institution":
+                c[(chart_table[category], "handwashing_status", hw_label)] += 1
+            if category == "Health Facility":
+                c[(chart_table[category], "flood_risk", flood_risk.pick(rng)[0])] += 1
+
+            group = (key, category, subcategory)
+            o = options[group]
+            ever_emptied = has_sanitation and rng.random() < 0.6
+            o["total_institutions"] += 1
+            o["ever_emptied_yes" if ever_emptied else "ever_emptied_no"] += 1
+            o["safe_sludge_yes" if ever_emptied and rng.random() < 0.5 else "safe_sludge_no"] += 1
+            o[{"Collected": "solid_waste_collected", "Burning": "solid_waste_burning",
+               "Open dump": "solid_waste_open_dump"}[waste_label]] += 1
+            o["water_access_yes" if water_access else "water_access_no"] += 1
+            o["water_continuous"] += continuous
+            o["handwashing_yes" if hw_label != "Not available" else "handwashing_no"] += 1
+            o["soap_available_yes" if hw_label == "Available with soap" else "soap_available_no"] += 1
+            o["maintenance_plan_yes" if rng.random() < 0.4 else "maintenance_plan_no"] += 1
+            o["flood_affected_yes" if rng.random() < 0.2 else "flood_affected_no"] += 1
+
+            if cont_label:
+                cube[group + ("containment_type", cont_label)] += 1
+                cube[group + ("emptying_frequency", emptying.pick(rng)[0])] += 1
+            cube[group + ("handwashing_status", hw_label)] += 1
+            cube[group + ("solid_waste_disposal", waste_label)] += 1
+            cube[group + ("water_source", water.pick(rng)[0])] += 1
+            for metric, insights in DIAGNOSTIC_INSIGHTS.items():
+                for insight in rng.sample(insights, rng.randint(1, 2)):
+                    diagnostics[group + (metric, insight)] += 1
+
+
+def write_aggregates(out, stats, charts, options, cube, diagnostics):
+    for ward, s in sorted(stats.items()):
+        hh = s["households"]
+        out["mv_overview_ward_summary"].row([
+            ward, s["plots"], hh, s["persons"],
+            round(s["persons"] / hh, 1) if hh else 0,
+            pct(s["water_access"], hh), pct(s["with_sanitation"], hh),
+            pct(s["shared"], hh), pct(s["handwashing"], hh),
+            pct(s["self_financed"], hh), pct(s["never_emptied"], hh),
+        ])
+        out["mv_demographics_ward_summary"].row([
+            ward, s["plots"], hh, s["persons"],
+            round(s["persons"] / hh, 2) if hh else 0,
+            round(hh / s["plots"], 2) if s["plots"] else 0,
+            s["children"], pct(s["children"], s["persons"]),
+            s["pwd_households"], pct(s["pwd_households"], s["plots"]),
+            pct(s["males"], s["persons"]), pct(s["persons"] - s["males"], s["persons"]),
+            pct(s["owner_male"], s["plots"]), pct(s["owner_female"], s["plots"]),
+        ])
+        out["mv_household_sanitation_ward_summary"].row([
+            ward, hh, pct(s["with_sanitation"], hh),
+            pct(hh - s["with_sanitation"], hh), pct(s["shared"], hh),
+            pct(s["water_access"], hh), pct(s["handwashing"], hh),
+            pct(s["pwd_accessible"], hh), pct(s["privacy"], hh),
+            pct(s["safe_for_women"], hh), pct(s["lighting"], hh),
+            pct(s["safe"], hh),
+        ])
+        out["mv_household_sanitation_safety_functionality_ward"].row([
+            ward, hh, s["safe"], hh - s["safe"],
+            pct(s["safe"], hh), pct(hh - s["safe"], hh),
+            pct(s["usable_year_round"], hh), pct(s["delayed_emptying"], hh),
+            pct(s["safe_emptying"], s["emptied"]),
+            round(s["emptying_cost"] / s["emptying_cost_n"]) if s["emptying_cost_n"] else 0,
+            pct(s["flood_affected"], hh),
+        ])
+        out["mv_household_wash_governance_ward"].row([
+            ward, hh, pct(s["organized_waste"], hh), pct(s["soap"], hh),
+            pct(s["external_financing"], hh),
+        ])
+
+        n = s["learning_total"]
+        out["mv_learning_institutions_ward_summary"].row([
+            ward, n, s["learning_users"], pct(s["learning_sanitation"], n),
+            pct(s["learning_handwashing"], n), pct(s["learning_gender_segregated"], n),
+            pct(s["learning_continuous_water"], n), pct(s["learning_mhm"], n),
+            pct(s["learning_pwd_accessible"], n),
+            round(s["learning_toilets"] / s["learning_users"], 3) if s["learning_users"] else 0,
+        ])
+        n = s["health_total"]
+        out["mv_health_facilities_ward_summary"].row([
+            ward, n, s["health_users"], pct(s["health_sanitation"], n),
+            pct(s["health_handwashing"], n), pct(s["health_continuous_water"], n),
+            pct(s["health_waste_mgmt"], n), pct(s["health_pwd_accessible"], n),
+        ])
+        n = s["other_total"]
+        out["mv_other_institutions_ward_summary"].row([
+            ward, n, s["other_users"], pct(s["other_sanitation"], n),
+            pct(s["other_water"], n), pct(s["other_handwashing"], n),
+            pct(s["other_regularly_cleaned"], n), pct(s["other_pwd_accessible"], n),
+            round(s["other_toilets"] / s["other_users"], 3) if s["other_users"] else 0,
+        ])
+
+        for (table, chart_type, category), value in sorted(charts[ward].items()):
+            out[table].row([ward, chart_type, category, value])
+        for owner_label in ("Male", "Female", "Joint"):
+            out["mv_demographics_charts"].row([
+                ward, "plot_ownership_gender", owner_label,
+                s["owner_" + owner_label.lower()],
+            ])
+
+    option_columns = [c for c, _ in TABLES["mv_institutions_option_summary"]][3:]
+    for group, o in sorted(options.items()):
+        out["mv_institutions_option_summary"].row(
+            list(group) + [o[c] for c in option_columns]
+        )
+    for row, value in sorted(cube.items()):
+        out["mv_institutions_chart_aggregates"].row(list(row) + [value])
+    for row, value in sorted(diagnostics.items()):
+        out["mv_institutions_diagnostics"].row(list(row) + [value])
+
+
+def create_tables(cur, replace):
+    for name, columns in TABLES.items():
+        if replace:
+            cur.execute(f"DROP TABLE IF EXISTS public.{name}")
+        cols = ", ".join(f"{c} {t}" for c, t in columns)
+        cur.execute(f"CREATE TABLE public.{name} ({cols})")
+
+
+def create_indexes(cur):
+    cur.execute("CREATE INDEX ON public.mv_map_households (ward)")
+    cur.execute("CREATE INDEX ON public.mv_map_households (plot_id)")
+    cur.execute("CREATE INDEX ON public.mv_map_institutions (ward)")
+    cur.execute("CREATE INDEX ON public.mv_map_institutions (institution_id)")
+    for name in TABLES:
+        if name not in ("mv_map_households", "mv_map_institutions"):
+            cur.execute(f"CREATE INDEX ON public.{name} (ward)")
+        cur.execute(f"ANALYZE public.{name}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--plots", type=int, default=10000)
+    parser.add_argument("--institutions", type=int,
+                        help="defaults to one institution per 40 plots")
+    parser.add_argument("--ward-copies", type=int, default=1,
+                        help="tile the ward polygons this many times")
+    parser.add_argument("--boundaries", default=DEFAULT_BOUNDARIES)
+    parser.add_argument("--boundaries-out",
+                        help="write the (tiled) ward boundaries GeoJSON here")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--csv-dir", help="write CSV files instead of loading a database")
+    parser.add_argument("--replace", action="store_true",
+                        help="drop existing tables of the same names first")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    wards = load_wards(args.boundaries, args.ward_copies)
+    n_institutions = args.institutions or max(len(wards), args.plots // 40)
+
+    if args.boundaries_out:
+        with open(args.boundaries_out, "w", encoding="utf-8") as f:
+            json.dump(ward_boundaries_geojson(wards), f)
+
+    if args.csv_dir:
+        os.makedirs(args.csv_dir, exist_ok=True)
+    out = {name: TableWriter(name, args.csv_dir) for name in TABLES}
+    stats = defaultdict(Counter)
+    charts = defaultdict(Counter)
+    options = defaultdict(Counter)
+    cube = Counter()
+    diagnostics = Counter()
+
+    try:
+        generate_households(rng, wards, args.plots, out, stats, charts)
+        generate_institutions(rng, wards, n_institutions, out, stats, charts,
+                              options, cube, diagnostics)
+        write_aggregates(out, stats, charts, options, cube, diagnostics)
+
+        if not args.csv_dir:
+            import psycopg2
+            from config import DB_CONFIG
+            conn = psycopg2.connect(**DB_CONFIG)
+            try:
+                with conn, conn.cursor() as cur:
+                    create_tables(cur, args.replace)
+                    for writer in out.values():
+                        writer.load(cur)
+                    create_indexes(cur)
+            finally:
+                conn.close()
+    finally:
+        for writer in out.values():
+            writer.close()
+
+    for name, writer in out.items():
+        print(f"{name:<52} {writer.rows:>10} rows")
+
+
+if __name__ == "__main__":
+    main()
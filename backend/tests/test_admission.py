@@ -0,0 +1,109 @@
+import threading
+import time
+
+import pytest
+from flask import Flask, request
+
+import admission
+from admission import CLASSES, EndpointClass, StaleStore, admit
+
+
+def endpoint_class(max_concurrent=1, max_queue=0, queue_timeout=0.05):
+    return EndpointClass("test", max_concurrent, max_queue, queue_timeout,
+                         statement_timeout_ms=None, retry_after=7)
+
+
+def test_sheds_when_slots_and_queue_are_full():
+    c = endpoint_class()
+    assert c.acquire()
+    assert not c.acquire()
+    c.release()
+    assert c.acquire()
+    assert c.stats()["admitted"] == 2 and c.stats()["shed"] == 1
+
+
+def test_queued_request_gets_released_slot():
+    c = endpoint_class(max_queue=1, queue_timeout=2)
+    assert c.acquire()
+    threading.Timer(0.05, c.release).start()
+    assert c.acquire()
+    assert c.stats()["shed"] == 0
+
+
+def test_queue_timeout_sheds():
+    c = endpoint_class(max_queue=1, queue_timeout=0.05)
+    assert c.acquire()
+    start = time.monotonic()
+    assert not c.acquire()
+    assert time.monotonic() - start >= 0.05
+    assert c.stats()["waiting"] == 0
+
+
+def test_stale_store_evicts_least_recent_by_bytes():
+    store = StaleStore(max_bytes=10, max_age=60)
+    store.put("a", b"1234", "text/plain")
+    store.put("b", b"1234", "text/plain")
+    store.get("a")
+    store.put("c", b"1234", "text/plain")
+    assert store.get("b") is None
+    assert store.get("a")[0] == b"1234" and store.get("c")[0] == b"1234"
+    store.put("big", b"x" * 11, "text/plain")
+    assert store.get("big") is None
+    assert store.stats() == {"entries": 2, "bytes": 8, "max_bytes": 10}
+
+
+def test_stale_store_expires():
+    store = StaleStore(max_bytes=10, max_age=0)
+    store.put("a", b"1", "text/plain")
+    time.sleep(0.01)
+    assert store.get("a") is None
+
+
+@pytest.fixture
+def app(monkeypatch):
+    c = endpoint_class()
+    monkeypatch.setitem(CLASSES, "test", c)
+    monkeypatch.setattr(admission, "STALE", StaleStore(1024, 60))
+    app = Flask(__name__)
+    admission.init_app(app)
+
+    @app.route("/api/test/value")
+    @admit("test")
+    def value():
+        return {"value": 1}
+
+    @app.route("/api/test/echo", methods=["POST"])
+    @admit("test")
+    def echo():
+        return {"value": request.get_json()["value"]}
+
+    app.endpoint_class = c
+    return app
+
+
+def test_shed_request_gets_503_without_a_stale_copy(app):
+    app.endpoint_class.acquire()
+    response = app.test_client().get("/api/test/value")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "7"
+    assert response.get_json()["reason"] == "saturated"
+
+
+def test_shed_request_gets_stale_copy(app):
+    client = app.test_client()
+    assert client.get("/api/test/value").get_json() == {"value": 1}
+    app.endpoint_class.acquire()
+    response = client.get("/api/test/value")
+    assert response.status_code == 200
+    assert response.get_json() == {"value": 1}
+    assert "Stale" in response.headers["Warning"]
+    assert app.endpoint_class.stats()["served_stale"] == 1
+
+
+def test_post_is_never_served_a_stale_copy(app):
+    client = app.test_client()
+    assert client.post("/api/test/echo", json={"value": "A"}).get_json() == {"value": "A"}
+    app.endpoint_class.acquire()
+    response = client.post("/api/test/echo", json={"value": "B"})
+    assert response.status_code == 503
+    assert admission.STALE.stats()["entries"] == 0
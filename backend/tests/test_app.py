@@ -0,0 +1,12 @@
+from app import create_app
+
+
+def test_selected_blueprints_only():
+    app = create_app({"BLUEPRINTS": ["overview"], "CACHE_TYPE": "NullCache"})
+    assert set(app.blueprints) == {"overview"}
+
+
+def test_empty_blueprint_list_registers_none():
+    app = create_app({"BLUEPRINTS": [], "CACHE_TYPE": "NullCache"})
+    assert app.blueprints == {}
+    assert app.test_client().get("/api/health").status_code == 200
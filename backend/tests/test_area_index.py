@@ -0,0 +1,88 @@
+import math
+import random
+
+import pytest
+
+from area_index import AreaStats, HouseholdGrid
+from geo import geometry_contains
+
+
+def star(n, r=0.1, cx=36.45, cy=-0.65):
+    """Closed ring of n vertices with a wavy (non-convex) outline."""
+    ring = []
+    for k in range(n):
+        t = 2 * math.pi * k / n
+        radius = r * (1 + 0.3 * math.sin(7 * t))
+        ring.append([cx + radius * math.cos(t), cy + radius * math.sin(t)])
+    return ring + [ring[0]]
+
+
+@pytest.fixture(scope="module")
+def points():
+    rng = random.Random(7)
+    pts = [
+        (36.3 + rng.random() * 0.3, -0.8 + rng.random() * 0.3,
+         rng.choice(["Basic", "Limited", None]), rng.choice([True, False, None]),
+         rng.choice([True, None]), rng.randint(1, 9), rng.randint(0, 3))
+        for _ in range(5000)
+    ]
+    # Points on grid lines
+    pts += [(36.3 + k * 0.01, -0.8 + rng.random() * 0.3, "Basic", None, None, 1, 0) for k in range(30)]
+    return pts
+
+
+@pytest.fixture(scope="module")
+def grid(points):
+    return HouseholdGrid(points, "v1", cell_size=0.01)
+
+
+def brute_force(points, geometry):
+    stats = AreaStats()
+    for p in points:
+        if geometry_contains(geometry, p[0], p[1]):
+            stats.add(p)
+    return stats.to_dict()
+
+
+@pytest.mark.parametrize("geometry", [
+    {"type": "Polygon", "coordinates": [star(12)]},
+    {"type": "Polygon", "coordinates": [star(2000), star(40, r=0.02)[::-1]]},
+    {"type": "MultiPolygon", "coordinates": [[star(50, 0.03, 36.4, -0.7)], [star(50, 0.03, 36.5, -0.6)]]},
+    # Edges along grid lines
+    {"type": "Polygon", "coordinates": [[[36.33, -0.77], [36.57, -0.77], [36.57, -0.53], [36.33, -0.53], [36.33, -0.77]]]},
+])
+def test_query_matches_point_in_polygon(grid, points, geometry):
+    stats, info = grid.query(geometry)
+    assert stats.to_dict() == brute_force(points, geometry)
+    assert info["inside"] > 0 and info["boundary"] > 0
+
+
+def test_only_boundary_cells_are_tested(grid):
+    square = {"type": "Polygon", "coordinates": [[
+        [36.335, -0.765], [36.565, -0.765], [36.565, -0.535], [36.335, -0.535], [36.335, -0.765],
+    ]]}
+    _, info = grid.query(square)
+    # 24 x 24 cells touched, the outer ring of them cut by the edges
+    assert info["boundary"] == 4 * 23
+    assert info["inside"] == 22 * 22
+    assert info["points_tested"] < grid.size / 2
+
+
+def test_polygon_outside_the_data(grid):
+    stats, info = grid.query({"type": "Polygon", "coordinates": [star(8, 0.01, 30.0, 5.0)]})
+    assert stats.to_dict()["households"] == 0
+    assert info == {"inside": 0, "boundary": 0, "points_tested": 0}
+
+
+def test_area_stats_dict():
+    stats = AreaStats()
+    stats.add((0, 0, "Basic", True, None, 4, 1))
+    stats.add((0, 0, None, False, True, None, None))
+    assert stats.to_dict() == {
+        "households": 2,
+        "sanitation_class": {"Basic": 1, "Unknown": 1},
+        "shared_facilities_pct": 50.0,
+        "handwashing_available_pct": 100.0,
+        "total_persons": 4,
+        "children_under_5": 1,
+    }
@@ -0,0 +1,67 @@
+import time
+
+import pytest
+from flask import Flask
+
+import cache_backend
+from cache_backend import OTHER, SizedLRUCache
+
+
+@pytest.fixture
+def app():
+    app = Flask(__name__)
+    for name in ("maps.layer", "overview.summary"):
+        app.add_url_rule(f"/{name}", name, lambda: "")
+    return app
+
+
+VALUE = b"x" * 100
+SIZE = len(SizedLRUCache.serializer.dumps(VALUE))
+
+
+def test_lru_eviction_by_total_bytes():
+    cache = SizedLRUCache(max_bytes=3 * SIZE, default_quota_bytes=10_000)
+    for key in "abc":
+        assert cache.set(key, VALUE)
+    assert cache.get("a") == VALUE       # a becomes most recent
+    assert cache.set("d", VALUE)
+    assert not cache.has("b")
+    assert all(cache.has(k) for k in "acd")
+    stats = cache.stats()
+    assert stats["bytes"] == cache.max_bytes
+    assert stats["endpoints"][OTHER]["evictions"] == 1
+
+
+def test_quota_evicts_only_the_same_endpoint(app):
+    cache = SizedLRUCache(max_bytes=10_000, default_quota_bytes=10_000,
+                          quotas={"maps": 2 * SIZE})
+    with app.test_request_context("/overview.summary"):
+        assert cache.set("kpi", VALUE)
+    with app.test_request_context("/maps.layer"):
+        for key in ("l1", "l2", "l3"):
+            assert cache.set(key, VALUE)
+    assert cache.has("kpi")
+    assert not cache.has("l1") and cache.has("l2") and cache.has("l3")
+    endpoints = cache.stats()["endpoints"]
+    assert endpoints["maps.layer"]["evictions"] == 1
+    assert endpoints["maps.layer"]["quota_bytes"] == 2 * SIZE
+    assert endpoints["overview.summary"]["entries"] == 1
+
+
+def test_oversized_value_is_rejected_and_replaces_nothing():
+    cache = SizedLRUCache(max_bytes=10_000, default_quota_bytes=200)
+    assert cache.set("k", "small")
+    assert not cache.set("k", b"x" * 500)
+    assert not cache.has("k")
+    assert cache.stats()["endpoints"][OTHER]["rejected"] == 1
+
+
+def test_expiry_and_add(monkeypatch):
+    cache = SizedLRUCache()
+    assert cache.add("k", 1, timeout=1)
+    assert not cache.add("k", 2)
+    later = time.time() + 2
+    monkeypatch.setattr(cache_backend.time, "time", lambda: later)
+    assert cache.get("k") is None
+    assert cache.stats()["endpoints"][OTHER]["expirations"] == 1
+    assert cache.add("k", 3) and cache.get("k") == 3
@@ -0,0 +1,81 @@
+import itertools
+import random
+
+import pytest
+
+import choropleth
+from choropleth import (class_index, classify, distinct_breaks, equal_interval_breaks,
+                        jenks_breaks, quantile_breaks, ward_classes)
+
+
+def classes(values, breaks):
+    out = [[] for _ in range(len(breaks) - 1)]
+    for v in values:
+        out[class_index(v, breaks)].append(v)
+    return out
+
+
+def sdcm(groups):
+    return sum(sum((v - sum(g) / len(g)) ** 2 for v in g) for g in groups)
+
+
+def test_distinct_breaks_keeps_a_minimum_only_first_class():
+    assert distinct_breaks([1, 1, 1, 2, 2, 3]) == [1, 1, 2, 3]
+
+
+def test_quantile_classes_are_equal_sized():
+    values = list(range(1, 11))
+    breaks = quantile_breaks(values, 5)
+    assert breaks == [1, 2, 4, 6, 8, 10]
+    assert [len(c) for c in classes(values, breaks)] == [2] * 5
+
+
+def test_equal_interval():
+    assert equal_interval_breaks([0, 3, 10], 2) == [0, 5.0, 10]
+    assert class_index(5, [0, 5.0, 10]) == 0 and class_index(5.1, [0, 5.0, 10]) == 1
+
+
+def test_jenks_finds_clusters():
+    assert jenks_breaks([1, 1, 2, 10, 11, 12, 50, 52], 3) == [1, 2, 12, 52]
+
+
+def test_jenks_is_optimal():
+    rng = random.Random(7)
+    for _ in range(20):
+        values = sorted(rng.randint(0, 40) for _ in range(9))
+        k = 3
+        breaks = jenks_breaks(values, k)
+        best = min(
+            sdcm([values[a:b] for a, b in zip((0,) + cut, cut + (len(values),))])
+            for cut in itertools.combinations(range(1, len(values)), k - 1)
+        )
+        assert sdcm([c for c in classes(values, breaks) if c]) == pytest.approx(best)
+
+
+@pytest.mark.parametrize("method", choropleth.METHODS)
+def test_constant_and_missing_values(method):
+    breaks, by_key = classify({"a": 3.0, "b": 3.0, "c": None}, method, 5)
+    assert breaks == [3.0, 3.0]
+    assert by_key == {"a": 0, "b": 0, "c": None}
+    assert classify({"a": None}, method, 5) == (None, {"a": None})
+
+
+@pytest.mark.parametrize("method", choropleth.METHODS)
+def test_fewer_distinct_values_than_classes(method):
+    breaks, by_key = classify({"a": 1.0, "b": 2.0, "c": 2.0}, method, 5)
+    assert breaks[0] == 1.0 and breaks[-1] == 2.0
+    assert breaks == sorted(breaks) and len(set(breaks[1:])) == len(breaks) - 1
+    assert by_key["a"] != by_key["b"] == by_key["c"]
+
+
+def test_ward_classes_memoized_per_version(monkeypatch):
+    monkeypatch.setattr(choropleth, "_MEMO", choropleth.OrderedDict())
+    calls = []
+    real = choropleth.classify
+    monkeypatch.setattr(choropleth, "classify", lambda *a: calls.append(a) or real(*a))
+    stats = {"w1": {"pct": 10}, "w2": {"pct": 30}, "w3": {"pct": None}}
+    first = ward_classes(1, stats, "pct", "quantile", 2)
+    assert first == ([10.0, 10.0, 30.0], {"w1": 0, "w2": 1, "w3": None})
+    assert ward_classes(1, stats, "pct", "quantile", 2) is first
+    ward_classes(2, stats, "pct", "quantile", 2)
+    assert len(calls) == 2
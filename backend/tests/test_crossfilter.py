@@ -0,0 +1,62 @@
+import pytest
+
+import crossfilter
+import wards
+from app import create_app
+from crossfilter import DIMENSIONS, CrossfilterEngine
+from wards import WardRegistry
+
+
+def row(ward, sanitation_class, is_shared):
+    values = dict.fromkeys(DIMENSIONS)
+    values.update(ward=ward, sanitation_class=sanitation_class, is_shared=is_shared)
+    return tuple(values[d] for d in DIMENSIONS)
+
+
+ROWS = [
+    row("Hells Gate", "Basic", True),
+    row("HELLS GATE", "Unimproved", False),
+    row("LAKEVIEW", "Basic", None),
+    row("LAKEVIEW", "Basic", False),
+    row("LAKEVIEW", "Unimproved", True),
+]
+
+
+def test_each_dimension_ignores_its_own_filter():
+    engine = CrossfilterEngine(ROWS, "v1")
+    matched, charts = engine.query({"ward": ["LAKEVIEW"], "sanitation_class": ["Basic"]})
+    assert matched == 2
+    assert charts["sanitation_class"] == [("Basic", 2), ("Unimproved", 1)]
+    assert charts["ward"] == [("LAKEVIEW", 2), ("HELLS GATE", 1)]
+    assert charts["is_shared"] == [("No", 1), ("Unknown", 1)]
+
+
+def test_values_are_labelled_and_unknown_labels_match_none():
+    engine = CrossfilterEngine(ROWS, "v1")
+    assert engine.columns["ward"].labels == ["HELLS GATE", "LAKEVIEW"]
+    assert engine.query({"is_shared": ["Yes", "Unknown"]})[0] == 3
+    assert engine.query({"ward": ["Hells Gate"]})[0] == 0
+    assert engine.query({})[0] == len(ROWS)
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(crossfilter, "_ENGINE", CrossfilterEngine(ROWS, "v1"))
+    # The households MV spells this ward in mixed case.
+    registry = WardRegistry({"boundary": ["Lake View"], "households": ["LakeView"]})
+    monkeypatch.setattr(wards, "_REGISTRY", registry)
+    monkeypatch.setattr(wards, "_RETRY_AT", None)
+    app = create_app({"BLUEPRINTS": ["households"], "CACHE_TYPE": "NullCache"})
+    return app.test_client()
+
+
+def test_ward_filter_uses_column_labels(client):
+    body = client.get("/api/households/crossfilter?ward=lake%20view").get_json()
+    assert body["meta"]["filters"] == {"ward": ["LAKEVIEW"]}
+    assert body["meta"]["matched_households"] == 3
+
+
+def test_all_wards_is_no_filter(client):
+    body = client.get("/api/households/crossfilter?ward=ALL&is_shared=No").get_json()
+    assert body["meta"]["filters"] == {"is_shared": ["No"]}
+    assert body["meta"]["matched_households"] == 2
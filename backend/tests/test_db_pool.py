@@ -0,0 +1,122 @@
+import threading
+import time
+
+import psycopg2.extensions
+import pytest
+
+from db import ConnectionPool, PoolError, PoolTimeout, PooledConnection
+
+IDLE = psycopg2.extensions.TRANSACTION_STATUS_IDLE
+INTRANS = psycopg2.extensions.TRANSACTION_STATUS_INTRANS
+UNKNOWN = psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN
+
+
+class FakeConnection:
+    """Stands in for a PooledConnection, with its close() (return to the pool)."""
+
+    pool = None
+    lease = 0
+    close = PooledConnection.close
+
+    def __init__(self):
+        self.closed = 0
+        self.rollbacks = 0
+        self.info = type("Info", (), {"transaction_status": IDLE})()
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.info.transaction_status = IDLE
+
+    def discard(self):
+        self.pool = None
+        self.closed = 1
+
+
+class FakePool(ConnectionPool):
+    def __init__(self, minconn=0, maxconn=2, timeout=0.05):
+        self.opened = []
+        super().__init__(minconn, maxconn, timeout)
+
+    def _connect(self):
+        conn = FakeConnection()
+        self.opened.append(conn)
+        return conn
+
+
+def test_checkout_and_return_reuses_connection():
+    pool = FakePool()
+    conn = pool.getconn()
+    assert pool.stats() == {"size": 1, "idle": 0, "in_use": 1, "maxconn": 2}
+    conn.close()
+    assert pool.stats()["idle"] == 1
+    assert pool.getconn() is conn
+    assert len(pool.opened) == 1
+
+
+def test_repeated_close_does_not_return_twice():
+    pool = FakePool()
+    conn = pool.getconn()
+    conn.close()
+    conn.close()
+    assert pool.stats() == {"size": 1, "idle": 1, "in_use": 0, "maxconn": 2}
+
+
+def test_each_checkout_is_a_new_lease():
+    pool = FakePool()
+    conn = pool.getconn()
+    lease = conn.lease
+    conn.close()
+    assert pool.getconn() is conn
+    # An earlier holder can tell the connection is no longer its own.
+    assert conn.lease == lease + 1
+
+
+def test_checkout_blocks_then_times_out():
+    pool = FakePool(maxconn=1)
+    pool.getconn()
+    start = time.monotonic()
+    with pytest.raises(PoolTimeout):
+        pool.getconn()
+    assert time.monotonic() - start >= 0.05
+
+
+def test_waiter_gets_returned_connection():
+    pool = FakePool(maxconn=1, timeout=2)
+    conn = pool.getconn()
+    threading.Timer(0.05, conn.close).start()
+    assert pool.getconn() is conn
+
+
+def test_open_transaction_rolled_back_on_return():
+    pool = FakePool()
+    conn = pool.getconn()
+    conn.info.transaction_status = INTRANS
+    conn.close()
+    assert conn.rollbacks == 1 and not conn.closed
+    assert pool.getconn() is conn
+
+
+def test_broken_connection_discarded_and_replaced():
+    pool = FakePool(maxconn=1)
+    conn = pool.getconn()
+    conn.info.transaction_status = UNKNOWN
+    conn.close()
+    assert conn.closed and pool.stats()["size"] == 0
+    assert pool.getconn() is not conn
+
+
+def test_closed_idle_connection_replaced():
+    pool = FakePool(minconn=1, maxconn=1)
+    pool.opened[0].closed = 1
+    assert pool.getconn() is not pool.opened[0]
+    assert pool.stats()["size"] == 1
+
+
+def test_closeall():
+    pool = FakePool()
+    conn = pool.getconn()
+    conn.close()
+    pool.closeall()
+    assert conn.closed
+    with pytest.raises(PoolError):
+        pool.getconn()
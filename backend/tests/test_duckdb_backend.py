@@ -0,0 +1,46 @@
+from decimal import Decimal
+from types import SimpleNamespace
+
+import duckdb
+
+from duckdb_backend import DuckDBConnection, numeric_rounds, translate_sql
+
+
+def test_placeholders():
+    assert translate_sql("select * from t where a = %s and b = any(%s)") == \
+        "select * from t where a = ? and b = any(?)"
+    assert translate_sql("where a = %(ward)s and b like 'x%%'") == "where a = $ward and b like 'x%'"
+
+
+def test_round_cast_to_numeric():
+    assert numeric_rounds("ROUND(AVG(x), 1) AS x") == "CAST(ROUND(AVG(x), 1) AS DECIMAL(38,1)) AS x"
+    assert numeric_rounds("round(avg(y))") == "CAST(ROUND(avg(y), 0) AS DECIMAL(38,0))"
+
+
+def test_round_nested_and_multiline():
+    sql = """ROUND(
+        SUM(a)::numeric / NULLIF(SUM(round(b, 2)), 0) * 100,
+        1
+    )"""
+    assert numeric_rounds(sql) == (
+        "CAST(ROUND(\n        SUM(a)::numeric / NULLIF(SUM(CAST(ROUND(b, 2) AS DECIMAL(38,2))), 0) * 100, 1)"
+        " AS DECIMAL(38,1))"
+    )
+
+
+def test_round_left_alone():
+    for sql in ("round(x, %s)", "ground(x, 1)", "round(x", "round(a, 1, 2)"):
+        assert numeric_rounds(sql) == sql
+
+
+def test_round_returns_decimal():
+    conn = DuckDBConnection(SimpleNamespace(con=duckdb.connect()))
+    try:
+        cur = conn.cursor()
+        cur.execute(
+            "SELECT ROUND(AVG(x), 1), ROUND(SUM(x)::numeric / NULLIF(COUNT(*), 0) * 100, 1)"
+            " FROM (VALUES (36.41), (36.43)) t(x)"
+        )
+        assert cur.fetchone() == (Decimal("36.4"), Decimal("3642.0"))
+    finally:
+        conn.close()
@@ -0,0 +1,30 @@
+from duckdb_parity import compare
+
+
+def test_equal_within_tolerance():
+    assert compare({"a": 1.0, "b": [1, 2]}, {"a": 1.0 + 1e-12, "b": [1, 2]}) == []
+    assert compare(12, 12.0) == []
+
+
+def test_numeric_string_differs_from_number():
+    assert compare({"pct": "36.4"}, {"pct": 36.4}) == [("$.pct", "36.4", 36.4)]
+
+
+def test_bool_is_not_a_number():
+    assert compare(True, 1) == [("$", True, 1)]
+
+
+def test_missing_keys_and_ignored_version():
+    assert compare({"a": 1, "version": "x"}, {"version": "y"}) == [("$.a", 1, "<missing>")]
+
+
+def test_object_lists_compare_in_any_order():
+    a = [{"ward": "a", "n": 1}, {"ward": "b", "n": 2}]
+    assert compare(a, list(reversed(a))) == []
+    diffs = compare(a, [{"ward": "b", "n": 2}, {"ward": "a", "n": 1.5}])
+    assert diffs == [("$[~0].n", 1, 1.5)]
+
+
+def test_scalar_lists_keep_order():
+    assert compare([1, 2], [2, 1]) == [("$[0]", 1, 2), ("$[1]", 2, 1)]
+    assert compare([1], [1, 2]) == [("$.length", 1, 2)]
@@ -0,0 +1,64 @@
+import math
+import random
+
+import numpy as np
+
+from geo import geometry_contains
+from hexbins import SQRT3, HouseholdPoints, hex_cells, hex_polygon
+
+
+def centre(col, row, radius):
+    return (col + (row % 2) / 2) * radius * SQRT3, row * radius * 1.5
+
+
+def test_points_go_to_the_nearest_hex_centre():
+    rng = random.Random(3)
+    radius = 0.01
+    x = np.array([rng.uniform(-1, 1) for _ in range(5000)])
+    y = np.array([rng.uniform(-1, 1) for _ in range(5000)])
+    cols, rows = hex_cells(x, y, radius)
+    for px, py, col, row in zip(x, y, cols.tolist(), rows.tolist()):
+        cx, cy = centre(col, row, radius)
+        best = math.dist((px, py), (cx, cy))
+        for dc in (-1, 0, 1):
+            for dr in (-1, 0, 1):
+                assert best <= math.dist((px, py), centre(col + dc, row + dr, radius)) + 1e-12
+
+
+def household_rows():
+    rng = random.Random(5)
+    return [
+        (36.3 + rng.random() * 0.2, -0.8 + rng.random() * 0.2,
+         rng.choice(["HELLS GATE", "LAKEVIEW"]), rng.choice(["Basic", "Unimproved"]),
+         rng.choice([True, False]), rng.randint(1, 6))
+        for _ in range(2000)
+    ]
+
+
+def test_layer_totals_and_geometry():
+    rows = household_rows()
+    points = HouseholdPoints(rows, "v1")
+    layer = points.layer(4)
+    props = [f["properties"] for f in layer]
+    assert sum(p["households"] for p in props) == len(rows)
+    assert sum(p["unsafe_households"] for p in props) == sum(r[3] == "Unimproved" for r in rows)
+    assert sum(p["population"] for p in props) == sum(r[5] for r in rows)
+    assert len({p["hex_id"] for p in props}) == len(props)
+
+    # Every point lies in the hexagon of its own feature.
+    by_id = {f["properties"]["hex_id"]: f for f in layer}
+    radius = 0.2 / 2 ** 4
+    cols, hex_rows = hex_cells(points.lon * points.lon_scale, points.lat, radius)
+    for lon, lat, col, row in list(zip(points.lon, points.lat, cols.tolist(), hex_rows.tolist()))[:200]:
+        geometry = by_id[f"4:{col}:{row}"]["geometry"]
+        assert geometry == {"type": "Polygon", "coordinates": hex_polygon(col, row, radius, points.lon_scale)}
+        assert geometry_contains(geometry, lon, lat)
+
+
+def test_ward_layers_and_cache():
+    rows = household_rows()
+    points = HouseholdPoints(rows, "v1")
+    ward = points.layer(4, "LAKEVIEW")
+    assert sum(f["properties"]["households"] for f in ward) == sum(r[2] == "LAKEVIEW" for r in rows)
+    assert points.layer(4, "NOWHERE") == []
+    assert points.layer(4, "LAKEVIEW") is ward
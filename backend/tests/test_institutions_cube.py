@@ -0,0 +1,67 @@
+from institutions_cube import ALL, OPTION_COLUMNS, InstitutionsCube, OptionRow
+
+CHART_ROWS = [
+    # (ward, category, subcategory, metric, label, value)
+    ("a", "School", "Primary", "water", "Yes", 3),
+    ("a", "School", "Secondary", "water", "Yes", 2),
+    ("a", "Clinic", None, "water", "No", 4),
+    ("b", "School", "Primary", "water", "No", 1),
+    ("b", "School", "Primary", "soap", "Yes", None),
+]
+
+
+def option_row(ward, category, subcategory, total):
+    values = dict.fromkeys(OPTION_COLUMNS, 0)
+    values.update(ward=ward, institution_category=category,
+                  institution_subcategory=subcategory, total_institutions=total)
+    return OptionRow(**values)
+
+
+OPTION_ROWS = [
+    option_row("b", "School", "Primary", 5),
+    option_row("a", "School", None, 1),
+    option_row("a", "Clinic", "Primary", 2),
+    option_row("a", "School", "Primary", 3),
+]
+
+
+def cube():
+    return InstitutionsCube(CHART_ROWS, OPTION_ROWS, [], "v1")
+
+
+def test_rollup_totals():
+    cells = InstitutionsCube._rollup(CHART_ROWS)
+    assert cells[(ALL, ALL, ALL, ALL)] == {"water": {"Yes": 5, "No": 5}, "soap": {"Yes": 0}}
+    assert cells[("a", ALL, ALL, "water")] == {"water": {"Yes": 5, "No": 4}}
+    assert cells[(ALL, "School", "Primary", ALL)] == {"water": {"Yes": 3, "No": 1}, "soap": {"Yes": 0}}
+
+
+def test_null_only_unfiltered():
+    cells = InstitutionsCube._rollup(CHART_ROWS)
+    assert cells[("a", "Clinic", None, "water")] == {"water": {"No": 4}}
+    assert ("a", "Clinic", "Primary", "water") not in cells
+
+
+def test_chart_counts_ordered_by_value():
+    assert cube().chart_counts("a", None, None, "water") == {"water": [("Yes", 5), ("No", 4)]}
+    assert cube().chart_counts("c", None, None, None) == {}
+
+
+def test_options_in_sql_order():
+    rows, _ = cube().option_page(None, None, None)
+    keys = [(r.ward, r.institution_subcategory, r.institution_category) for r in rows]
+    # ward, then subcategory with NULLs last, then category
+    assert keys == [("a", "Primary", "Clinic"), ("a", "Primary", "School"),
+                    ("a", None, "School"), ("b", "Primary", "School")]
+
+
+def test_option_keyset_pages():
+    c = cube()
+    first, _ = c.option_page(None, "School", None, limit=2)
+    assert [r.total_institutions for r in first] == [3, 1]
+    last = first[-1]
+    rest, _ = c.option_page(
+        None, "School", None,
+        after=(last.ward, last.institution_subcategory, last.institution_category), limit=2,
+    )
+    assert [r.total_institutions for r in rest] == [5]
@@ -0,0 +1,45 @@
+import base64
+import json
+
+import pytest
+from flask import Flask
+from werkzeug.exceptions import HTTPException
+
+from config import PAGINATION_CONFIG
+from pagination import decode_cursor, encode_cursor, page_args, page_meta
+
+app = Flask(__name__)
+
+
+def token(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).rstrip(b"=").decode()
+
+
+def test_cursor_round_trip():
+    key = ("hells gate", None, "I0000125")
+    assert decode_cursor(encode_cursor(key), 3) == key
+    assert "=" not in encode_cursor(key)
+
+
+@pytest.mark.parametrize("bad", [
+    "not base64!", token({"a": 1}), token(["a", "b"]), token(["a", 1, "c"]), token(["a", ["b"], "c"]),
+])
+def test_invalid_cursor_is_400(bad):
+    with app.test_request_context():
+        with pytest.raises(HTTPException) as e:
+            decode_cursor(bad, 3)
+    assert e.value.response.status_code == 400
+
+
+def test_page_args():
+    with app.test_request_context("/?x=1"):
+        assert page_args() == (None, None)
+    with app.test_request_context("/?limit=0"):
+        assert page_args() == (PAGINATION_CONFIG["default_limit"], None)
+    with app.test_request_context(f"/?limit=999999&cursor={encode_cursor(['a', 'b'])}"):
+        assert page_args(2) == (PAGINATION_CONFIG["max_limit"], ("a", "b"))
+
+
+def test_page_meta():
+    assert page_meta(2, False, ("a",)) == {"limit": 2, "next_cursor": None}
+    assert decode_cursor(page_meta(2, True, ("a",))["next_cursor"], 1) == ("a",)
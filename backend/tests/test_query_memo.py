@@ -0,0 +1,69 @@
+import pytest
+
+import query_memo
+from query_memo import QueryMemo, memo_cursor_class
+
+
+class FakeCursor:
+    """Rows of the last execute(); counts how they were read."""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.executes = self.fetchalls = 0
+
+    def execute(self, query, vars=None):
+        self.executes += 1
+        self._pending = list(self.rows)
+
+    def fetchall(self):
+        self.fetchalls += 1
+        rows, self._pending = self._pending, []
+        return rows
+
+    def __iter__(self):
+        return iter(self._pending)
+
+
+SQL = "select plot_id from public.mv_map_households where ward = %s"
+
+
+@pytest.fixture(autouse=True)
+def memo(monkeypatch):
+    memo = QueryMemo(ttl=60, max_entries=10, max_rows=100, max_total_rows=1000)
+    monkeypatch.setattr(query_memo, "MEMO", memo)
+    monkeypatch.setattr(query_memo, "current_version", lambda views: "v1")
+    return memo
+
+
+def cursor(rows):
+    return memo_cursor_class(FakeCursor)(rows)
+
+
+def test_same_query_runs_once():
+    first = cursor([(1,), (2,)])
+    first.execute(SQL, ["A"])
+    assert first.fetchall() == [(1,), (2,)]
+    second = cursor([(9,)])
+    second.execute("SELECT plot_id FROM mv_map_households WHERE ward = %s", ("A",))
+    assert list(second) == [(1,), (2,)]
+    assert second.executes == 0
+    other = cursor([(3,)])
+    other.execute(SQL, ["B"])
+    assert other.fetchall() == [(3,)] and other.executes == 1
+
+
+def test_memoize_false_streams_from_the_cursor(memo):
+    cur = cursor([(1,), (2,)])
+    cur.memoize = False
+    cur.execute(SQL, ["A"])
+    assert list(cur) == [(1,), (2,)]
+    assert cur.fetchalls == 0
+    assert memo.stats()["entries"] == 0 and memo.stats()["misses"] == 0
+
+
+def test_non_select_and_non_mv_queries_bypass(memo):
+    for sql in ("update mv_x set a = 1", "select 1"):
+        cur = cursor([(1,)])
+        cur.execute(sql)
+        assert list(cur) == [(1,)] and cur.fetchalls == 0
+    assert memo.stats()["misses"] == 0
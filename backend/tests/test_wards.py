@@ -0,0 +1,83 @@
+import pytest
+from flask import Flask
+
+import wards
+from wards import WardRegistry, alias_key, normalized_cache_key
+
+
+NAMES = {
+    "boundary": ["Hells Gate", "Lake View"],
+    "summary": ["hells gate", "lakeview", "maiella"],
+    "households": ["HELLS GATE", "LAKEVIEW", "MAIELLA"],
+    "institutions": ["hell's gate"],
+}
+
+
+def test_alias_key_ignores_case_spaces_and_punctuation():
+    assert alias_key("Hells Gate") == alias_key("HELLS-GATE") == alias_key("Hell's gate")
+
+
+def test_spellings_resolve_to_one_ward():
+    registry = WardRegistry(NAMES)
+    assert registry.resolve("hells-gate") == registry.resolve("HELL'S GATE") == "hells-gate"
+    assert registry.wards["hells-gate"].name == "Hells Gate"
+    # Wards missing from the boundaries get a title-cased display name.
+    assert registry.wards["maiella"].name == "Maiella"
+    assert registry.resolve("ALL") is None and registry.resolve(" ") is None
+    assert registry.resolve("Nowhere") is None
+
+
+def test_stored_name_per_source():
+    registry = WardRegistry(NAMES)
+    assert registry.stored_name("Lake View", "summary") == "lakeview"
+    assert registry.stored_name("lake view", "households") == "LAKEVIEW"
+    assert registry.stored_name("Hells Gate", "institutions") == "hell's gate"
+    # Known ward absent from a source, then unknown wards: per-source casing.
+    assert registry.stored_name("Lake View", "institutions") == "lake view"
+    assert registry.stored_name("Nowhere ", "households") == "NOWHERE"
+    assert registry.stored_name("all", "summary") is None
+
+
+def test_cache_key_normalizes_ward(monkeypatch):
+    monkeypatch.setattr(wards, "_REGISTRY", WardRegistry(NAMES))
+    monkeypatch.setattr(wards, "_RETRY_AT", None)
+    app = Flask(__name__)
+
+    def key(query):
+        with app.test_request_context(f"/api/x?{query}"):
+            return normalized_cache_key()
+
+    assert key("ward=Lake View&x=1") == key("x=1&ward=LAKEVIEW") == key("x=1&ward=lake-view")
+    assert key("ward=ALL&x=1") == key("x=1") != key("x=1&ward=LAKEVIEW")
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(wards.time, "monotonic", lambda: now[0])
+    monkeypatch.setattr(wards, "_REGISTRY", None)
+    monkeypatch.setattr(wards, "_RETRY_AT", None)
+    monkeypatch.setattr(wards, "boundary_names", lambda: ["Hells Gate"])
+    return now
+
+
+def test_falls_back_to_boundaries_and_retries_later(monkeypatch, clock):
+    calls = []
+
+    def unavailable():
+        calls.append(1)
+        raise RuntimeError("database down")
+
+    monkeypatch.setattr(wards, "load_registry", unavailable)
+    fallback = wards.get_registry()
+    assert list(fallback.wards) == ["hells-gate"]
+    assert wards.get_registry() is fallback and len(calls) == 1
+
+    full = WardRegistry(NAMES)
+    monkeypatch.setattr(wards, "load_registry", lambda: full)
+    clock[0] += wards.RETRY_SECONDS - 1
+    assert wards.get_registry() is fallback
+    clock[0] += 1
+    assert wards.get_registry() is full
+    clock[0] += wards.RETRY_SECONDS
+    assert wards.get_registry() is full
@@ -0,0 +1,343 @@
+import os
+import json
+import time
+import queue
+import random
+import logging
+import threading
+from contextlib import contextmanager
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+from config import TRACING_CONFIG
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# REQUEST-STAGE TRACING
+# ============================================================
+# Every request gets a trace: a root span plus nested spans for the
+# stages that matter for latency (response-cache lookup, admission wait,
+# pool checkout, execute, fetch, reshaping loops, jsonify), recorded with
+# span("name") wherever the work happens. Recording is cheap and always
+# on; a finished trace is exported when it was sampled (sample_rate, or
+# the sampled flag of an incoming W3C traceparent from a trusted_clients
+# address) or took at least slow_ms, so slow requests are never lost to
+# sampling. Other clients continue their trace ID but cannot force
+# exports: their sampled flag is ignored.
+#
+# Traces go to a local file per process (path with the pid before the
+# extension, so workers never rotate each other's files), one line per
+# trace, written by a background thread: "jsonl" (a compact span list)
+# or "otlp" (an OTLP/JSON
+# ExportTraceServiceRequest, as written by the OpenTelemetry file
+# exporter). Each response carries traceparent and X-Trace-Id headers so a
+# client report can be matched to its trace.
+#
+# Spans are per thread (one request per thread under the threaded server
+# and gthread workers); outside a request span() does nothing.
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class Span:
+    __slots__ = ("name", "span_id", "parent_id", "start", "end", "attributes", "error")
+
+    def __init__(self, name, span_id, parent_id, attributes):
+        self.name = name
+        self.span_id = span_id
+        self.parent_id = parent_id
+        self.start = time.perf_counter_ns()
+        self.end = None
+        self.attributes = attributes
+        self.error = None
+
+
+class Trace:
+    def __init__(self, trace_id, parent_id, sampled):
+        self.trace_id = trace_id
+        self.parent_id = parent_id   # remote parent from traceparent
+        self.sampled = sampled
+        self.wall_start = time.time_ns()
+        self.perf_start = time.perf_counter_ns()
+        self.spans = []
+        self.stack = []
+        self.dropped = 0
+
+    def start_span(self, name, attributes):
+        parent = self.stack[-1].span_id if self.stack else self.parent_id
+        s = Span(name, os.urandom(8).hex(), parent, attributes)
+        if len(self.spans) < TRACING_CONFIG["max_spans"]:
+            self.spans.append(s)
+        else:
+            self.dropped += 1
+        self.stack.append(s)
+        return s
+
+    def end_span(self, s):
+        s.end = time.perf_counter_ns()
+        if self.stack and self.stack[-1] is s:
+            self.stack.pop()
+
+    @property
+    def root(self):
+        return self.spans[0]
+
+    def unix_ns(self, perf_ns):
+        return self.wall_start + (perf_ns - self.perf_start)
+
+
+_LOCAL = threading.local()
+
+
+def current_trace():
+    return getattr(_LOCAL, "trace", None)
+
+
+@contextmanager
+def span(name, **attributes):
+    """Record a child span of the current one; yields the Span (or None)."""
+    trace = getattr(_LOCAL, "trace", None)
+    if trace is None:
+        yield None
+        return
+    s = trace.start_span(name, attributes)
+    try:
+        yield s
+    except Exception as e:
+        s.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        trace.end_span(s)
+
+
+# ============================================================
+# TRACE CONTEXT (W3C traceparent)
+# ============================================================
+
+def parse_traceparent(header):
+    """(trace_id, parent span id, sampled) or None if absent/invalid."""
+    if not header:
+        return None
+    parts = header.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16 or len(parts[3]) != 2:
+        return None
+    try:
+        flags = int(parts[3], 16)
+        int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    if parts[1] == "0" * 32 or parts[2] == "0" * 16:
+        return None
+    return parts[1].lower(), parts[2].lower(), bool(flags & 1)
+
+
+def traceparent(trace):
+    return f"00-{trace.trace_id}-{trace.root.span_id}-{'01' if trace.sampled else '00'}"
+
+
+# ============================================================
+# EXPORT
+# ============================================================
+
+def _attribute_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(trace):
+    spans = []
+    for s in trace.spans:
+        entry = {
+            "traceId": trace.trace_id,
+            "spanId": s.span_id,
+            "name": s.name,
+            "kind": 2 if s is trace.root else 1,   # SERVER / INTERNAL
+            "startTimeUnixNano": str(trace.unix_ns(s.start)),
+            "endTimeUnixNano": str(trace.unix_ns(s.end or s.start)),
+            "attributes": [{"key": k, "value": _attribute_value(v)} for k, v in s.attributes.items()],
+            "status": {"code": 2, "message": s.error} if s.error else {},
+        }
+        if s.parent_id:
+            entry["parentSpanId"] = s.parent_id
+        spans.append(entry)
+    return {"resourceSpans": [{
+        "resource": {"attributes": [
+            {"key": "service.name", "value": {"stringValue": TRACING_CONFIG["service_name"]}},
+            {"key": "process.pid", "value": {"intValue": str(os.getpid())}},
+        ]},
+        "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}],
+    }]}
+
+
+def to_jsonl(trace):
+    root = trace.root
+    return {
+        "trace_id": trace.trace_id,
+        "pid": os.getpid(),
+        "start": trace.unix_ns(root.start) / 1e9,
+        "duration_ms": round((root.end - root.start) / 1e6, 3),
+        "sampled": trace.sampled,
+        "dropped_spans": trace.dropped,
+        "spans": [
+            {
+                "name": s.name,
+                "span_id": s.span_id,
+                "parent_id": s.parent_id,
+                "offset_ms": round((s.start - root.start) / 1e6, 3),
+                "duration_ms": round(((s.end or s.start) - s.start) / 1e6, 3),
+                "attributes": s.attributes,
+                "error": s.error,
+            }
+            for s in trace.spans
+        ],
+    }
+
+
+FORMATS = {"jsonl": to_jsonl, "otlp": to_otlp}
+
+
+def process_path(path, pid=None):
+    """data/traces.jsonl -> data/traces.<pid>.jsonl"""
+    root, ext = os.path.splitext(path)
+    return f"{root}.{pid or os.getpid()}{ext}"
+
+
+class FileExporter:
+    """
+    Appends one JSON line per trace to this process's file for `path`
+    (process_path()) from a daemon thread; the file is rotated to
+    file + ".1" past max_bytes. Traces are dropped, not waited for, when
+    the queue is full.
+    """
+
+    def __init__(self, path, fmt, max_bytes, queue_size):
+        self.path = path
+        self.encode = FORMATS[fmt]
+        self.max_bytes = max_bytes
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.exported = 0
+        self.dropped = 0
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def export(self, trace):
+        if self._thread is None or not self._thread.is_alive():
+            with self._lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(
+                        target=self._write_forever, name="trace-exporter", daemon=True
+                    )
+                    self._thread.start()
+        try:
+            self.queue.put_nowait(trace)
+        except queue.Full:
+            self.dropped += 1
+
+    def _write_forever(self):
+        # Resolved here, in the process that writes (the thread does not
+        # survive a fork; a forked worker starts its own).
+        path = process_path(self.path)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        while True:
+            trace = self.queue.get()
+            try:
+                line = json.dumps(self.encode(trace), separators=(",", ":"), default=str)
+                with open(path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+                    size = f.tell()
+                if size > self.max_bytes:
+                    os.replace(path, path + ".1")
+                self.exported += 1
+            except Exception as e:
+                logger.warning(f"Trace export failed: {e}")
+
+    def stats(self):
+        return {
+            "path": process_path(self.path),
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "queued": self.queue.qsize(),
+        }
+
+
+EXPORTER = FileExporter(
+    os.path.join(BASE_DIR, TRACING_CONFIG["path"]),
+    TRACING_CONFIG["format"],
+    int(TRACING_CONFIG["max_mb"] * 1024 * 1024),
+    TRACING_CONFIG["queue_size"],
+)
+
+
+# ============================================================
+# FLASK INTEGRATION
+# ============================================================
+
+class TracedJSONProvider(DefaultJSONProvider):
+    """jsonify() inside a "jsonify" span."""
+
+    def response(self, *args, **kwargs):
+        with span("jsonify"):
+            return super().response(*args, **kwargs)
+
+
+def _start_request():
+    incoming = parse_traceparent(request.headers.get("traceparent"))
+    sampled = None
+    if incoming:
+        trace_id, parent_id, flag = incoming
+        if request.remote_addr in TRACING_CONFIG["trusted_clients"]:
+            sampled = flag
+    else:
+        trace_id, parent_id = os.urandom(16).hex(), None
+    if sampled is None:
+        sampled = random.random() < TRACING_CONFIG["sample_rate"]
+    trace = Trace(trace_id, parent_id, sampled)
+    rule = request.url_rule.rule if request.url_rule else request.path
+    trace.start_span(f"{request.method} {rule}", {
+        "http.method": request.method,
+        "http.route": rule,
+        "http.target": request.full_path.rstrip("?"),
+        "endpoint": request.endpoint or "",
+    })
+    _LOCAL.trace = trace
+
+
+def _finish_response(response):
+    trace = current_trace()
+    if trace is not None:
+        trace.root.attributes["http.status_code"] = response.status_code
+        response.headers["traceparent"] = traceparent(trace)
+        response.headers["X-Trace-Id"] = trace.trace_id
+    return response
+
+
+def _end_request(exc=None):
+    trace = current_trace()
+    _LOCAL.trace = None
+    if trace is None:
+        return
+    root = trace.root
+    if exc is not None:
+        root.error = f"{type(exc).__name__}: {exc}"
+    while trace.stack:
+        trace.end_span(trace.stack[-1])
+    slow_ms = TRACING_CONFIG["slow_ms"]
+    slow = slow_ms is not None and (root.end - root.start) >= slow_ms * 1e6
+    if trace.sampled or slow:
+        root.attributes["slow"] = slow
+        EXPORTER.export(trace)
+
+
+def init_app(app):
+    """Register the per-request hooks (before other before_request hooks)."""
+    if not TRACING_CONFIG["enabled"]:
+        return
+    app.json = TracedJSONProvider(app)
+    app.before_request(_start_request)
+    app.after_request(_finish_response)
+    app.teardown_request(_end_request)
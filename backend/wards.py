@@ -0,0 +1,209 @@
+import os
+import re
+import json
+import hashlib
+import logging
+import threading
+import time
+from flask import current_app, has_app_context, request
+from db import get_conn
+from data_version import on_refresh
+
+logger = logging.getLogger(__name__)
+
+# ============================================================
+# CANONICAL WARD REGISTRY
+# ============================================================
+# Ward names are spelled differently per source: the summary and chart
+# MVs and mv_map_institutions store them lowercase, mv_map_households
+# uppercase, and the boundary GeoJSON in shapeName / ward / name. The
+# registry, loaded once from all of them, maps every spelling (compared
+# by alias_key: case, spaces and punctuation ignored) to one canonical ID
+# and knows the exact stored name per source, so a view asks for
+# ward_arg("summary") instead of lower()-ing the query parameter itself.
+#
+# Wards the registry does not know fall back to the old per-source casing,
+# so an unknown ward still returns an empty result rather than an error.
+
+SOURCES = {
+    # source: (relation, fallback casing for unknown wards)
+    "summary": ("mv_overview_ward_summary", str.lower),
+    "households": ("mv_map_households", str.upper),
+    "institutions": ("mv_map_institutions", str.lower),
+}
+
+REGISTRY_VIEWS = [relation for relation, _ in SOURCES.values()]
+
+DEFAULT_BOUNDARIES = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    "data", "geojson", "naivasha_wards.geojson",
+)
+
+
+def alias_key(name: str) -> str:
+    """'Hells Gate', 'HELLS-GATE' and "Hell's gate" -> 'hellsgate'."""
+    return re.sub(r"[^a-z0-9]+", "", name.lower())
+
+
+def slug(name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+def boundary_name(props: dict) -> str:
+    """Ward name of a boundary feature (first of shapeName, ward, name)."""
+    return props.get("shapeName") or props.get("ward") or props.get("name") or ""
+
+
+class Ward:
+    def __init__(self, ward_id, name):
+        self.id = ward_id
+        self.name = name
+        self.names = {}   # source -> stored spelling
+
+    def to_dict(self):
+        return {"id": self.id, "name": self.name, "names": self.names}
+
+
+class WardRegistry:
+    def __init__(self, names_by_source):
+        """names_by_source: {source: [stored name, ...]}, incl. "boundary"."""
+        self.wards = {}
+        self.aliases = {}
+        # Boundary names first: they are the display spellings.
+        order = ["boundary"] + [s for s in names_by_source if s != "boundary"]
+        for source in order:
+            for name in names_by_source.get(source, []):
+                if not name or not alias_key(name):
+                    continue
+                key = alias_key(name)
+                ward_id = self.aliases.get(key)
+                if ward_id is None:
+                    display = name if source == "boundary" else name.title()
+                    ward_id = slug(display)
+                    self.wards[ward_id] = Ward(ward_id, display)
+                    self.aliases[key] = ward_id
+                self.wards[ward_id].names.setdefault(source, name)
+
+    def resolve(self, raw):
+        """Canonical ward ID; None for no filter ("" / ALL) or an unknown ward."""
+        if raw is None or not raw.strip() or raw.strip().upper() == "ALL":
+            return None
+        return self.aliases.get(alias_key(raw))
+
+    def stored_name(self, raw, source):
+        """Spelling of ward `raw` in `source`, or None for no filter."""
+        if raw is None or not raw.strip() or raw.strip().upper() == "ALL":
+            return None
+        fallback = SOURCES[source][1] if source in SOURCES else str
+        ward_id = self.aliases.get(alias_key(raw))
+        if ward_id is None:
+            return fallback(raw.strip())
+        ward = self.wards[ward_id]
+        return ward.names.get(source) or fallback(ward.name)
+
+
+def boundary_names():
+    path = DEFAULT_BOUNDARIES
+    if has_app_context() and current_app.config.get("WARD_BOUNDARIES_PATH"):
+        path = current_app.config["WARD_BOUNDARIES_PATH"]
+    try:
+        with open(path, encoding="utf-8") as f:
+            features = json.load(f).get("features", [])
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ward registry: no boundary names from {path}: {e}")
+        return []
+    return [boundary_name(f.get("properties") or {}) for f in features]
+
+
+def load_registry():
+    names = {"boundary": boundary_names()}
+    conn = get_conn(cursor_factory=None)
+    try:
+        with conn.cursor() as cur:
+            for source, (relation, _) in SOURCES.items():
+                cur.execute(
+                    f"SELECT DISTINCT ward FROM public.{relation} WHERE ward IS NOT NULL"
+                )
+                names[source] = sorted(r[0] for r in cur.fetchall())
+    finally:
+        conn.close()
+
+    registry = WardRegistry(names)
+    logger.info(f"Loaded ward registry: {len(registry.wards)} wards, {len(registry.aliases)} aliases")
+    return registry
+
+
+_REGISTRY = None
+_RETRY_AT = None      # set while running on a boundary-only fallback
+_LOCK = threading.Lock()
+
+RETRY_SECONDS = 30
+
+
+def get_registry() -> WardRegistry:
+    """
+    Current registry, loaded on first use. If the database is unavailable
+    a registry of the boundary names alone is used, and the full load is
+    retried at most every RETRY_SECONDS.
+    """
+    global _REGISTRY, _RETRY_AT
+    if _REGISTRY is None or (_RETRY_AT is not None and time.monotonic() >= _RETRY_AT):
+        with _LOCK:
+            if _REGISTRY is None or (_RETRY_AT is not None and time.monotonic() >= _RETRY_AT):
+                try:
+                    _REGISTRY = load_registry()
+                    _RETRY_AT = None
+                except Exception as e:
+                    logger.warning(f"Ward registry unavailable, using boundary names only: {e}")
+                    _REGISTRY = WardRegistry({"boundary": boundary_names()})
+                    _RETRY_AT = time.monotonic() + RETRY_SECONDS
+    return _REGISTRY
+
+
+def _reload(views, version):
+    def build():
+        global _REGISTRY, _RETRY_AT
+        with _LOCK:
+            try:
+                _REGISTRY = load_registry()
+                _RETRY_AT = None
+            except Exception as e:
+                logger.error(f"Ward registry reload failed: {e}")
+
+    threading.Thread(target=build, name="ward-registry", daemon=True).start()
+
+
+on_refresh(_reload, views=REGISTRY_VIEWS)
+
+
+# ============================================================
+# REQUEST HELPERS
+# ============================================================
+
+def ward_arg(source: str, name: str = "ward"):
+    """Stored spelling in `source` of the ?ward= parameter (None = all wards)."""
+    return get_registry().stored_name(request.args.get(name), source)
+
+
+def ward_id(raw):
+    """Canonical ID for cache keys and responses; unknown wards by alias key."""
+    if raw is None or not raw.strip() or raw.strip().upper() == "ALL":
+        return None
+    return get_registry().resolve(raw) or alias_key(raw)
+
+
+def normalized_cache_key(*args, **kwargs) -> str:
+    """
+    Flask-Caching make_cache_key: the path plus the sorted query string
+    with ward normalized, so ?ward=Hells Gate, ?ward=hells gate and
+    ?ward=HELLS%20GATE (and ?ward=ALL vs. no ward) share one entry.
+    """
+    pairs = []
+    for key, value in request.args.items(multi=True):
+        if key == "ward":
+            value = ward_id(value)
+            if value is None:
+                continue
+        pairs.append((key, value))
+    digest = hashlib.md5(str(sorted(pairs)).encode()).hexdigest()
+    return f"view/{request.path}/{digest}"